@@ -1,9 +1,13 @@
 from rest_framework import viewsets, permissions
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import SearchFilter
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import AuditLog
 from .serializers import AuditLogSerializer
 from authentication.permissions import IsAdminOrManager
+from core.pagination import TimestampCursorPagination, StableOrderingFilter
+
+class AuditLogPagination(TimestampCursorPagination):
+    ordering = ('-timestamp', '-id')
 
 class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
     """
@@ -13,11 +17,12 @@ class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = AuditLog.objects.all().select_related('user', 'content_type')
     serializer_class = AuditLogSerializer
     permission_classes = [IsAdminOrManager]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, SearchFilter, StableOrderingFilter]
     filterset_fields = ['action', 'status', 'user']
     search_fields = ['user__username', 'ip_address', 'details']
     ordering_fields = ['timestamp', 'action']
-    ordering = ['-timestamp']
+    ordering = ['-timestamp', '-id']
+    pagination_class = AuditLogPagination
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -0,0 +1,96 @@
+"""
+Menu search latency as the menu grows.
+
+Seeds menus of increasing size and times kitchen.search against the
+substring scan it replaced (name, description or category icontains), for
+whole words, prefixes typed so far and misspellings. Runs on the test
+database of the configured engine, so DB_ENGINE=postgres measures the GIN
+indexes and the default SQLite run measures FTS5.
+"""
+import argparse
+import random
+import time
+from decimal import Decimal
+
+from common import setup_django, test_database
+
+# A small vocabulary, so each query matches a large share of the menu: the
+# worst case for ranking
+WORDS = [
+    'chicken', 'beef', 'pork', 'tofu', 'salmon', 'shrimp', 'mushroom', 'spinach',
+    'tomato', 'basil', 'garlic', 'lemon', 'chili', 'ginger', 'curry', 'teriyaki',
+    'alfredo', 'carbonara', 'pesto', 'marinara', 'smoked', 'grilled', 'crispy', 'roasted',
+]
+CATEGORIES = ['Pizza', 'Pasta', 'Salads', 'Burgers', 'Bowls', 'Desserts', 'Drinks', 'Sides']
+
+QUERIES = {
+    'word': 'chicken',
+    'prefix': 'carbo',
+    'two words': 'grilled salm',
+    'misspelled': 'carbonra',
+}
+
+def grow(count, brands):
+    """
+    Add menu items until there are `count`
+    """
+    from kitchen.models import MenuItem
+
+    rng = random.Random(count)
+    start = MenuItem.objects.count()
+    MenuItem.objects.bulk_create([
+        MenuItem(
+            name=f"{' '.join(rng.sample(WORDS, 2)).title()} {rng.choice(CATEGORIES)} #{index}",
+            description=f"{rng.choice(brands)}: {' '.join(rng.sample(WORDS, 6))}",
+            price=Decimal('10.00'),
+            category=rng.choice(CATEGORIES),
+            preparation_time=10,
+        )
+        for index in range(start, count)
+    ], batch_size=1000)
+
+def scan(query):
+    from django.db.models import Q
+    from kitchen.models import MenuItem
+
+    return list(MenuItem.objects.filter(
+        Q(name__icontains=query) | Q(description__icontains=query) | Q(category__icontains=query)
+    ).values_list('pk', flat=True))
+
+def indexed(query):
+    from kitchen.models import MenuItem
+    from kitchen.search import search
+
+    return list(search(MenuItem.objects.all(), query).values_list('pk', flat=True))
+
+def best_of(function, query, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(query)
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=lambda value: [int(size) for size in value.split(',')],
+                        default=[100, 1000, 5000, 20000])
+    parser.add_argument('--brands', type=int, default=5, help='Kitchens sharing the menu table')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+
+    with test_database():
+        print(f"engine: {connection.vendor}")
+        print(f"{'items':>7} {'query':<12} {'scan ms':>9} {'indexed ms':>11} {'matches':>8}")
+        brands = [f'Brand {index}' for index in range(args.brands)]
+        for size in args.sizes:
+            grow(size, brands)
+            for label, query in QUERIES.items():
+                print(f"{size:>7} {label:<12} {best_of(scan, query, args.repeat):>9.2f} "
+                      f"{best_of(indexed, query, args.repeat):>11.2f} {len(indexed(query)):>8}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Throughput of order status transitions.
+
+Compares the state machine's single conditional UPDATE against the
+full-row save (set the fields, save every column, re-count items) it
+replaced. The state machine also estimates from the preparation
+statistics, takes stock and keeps the kitchen ticket and outbox in step,
+so the two are not like for like: the figure is the price of that work.
+Each path is checked to have moved every order to 'preparing'.
+"""
+import argparse
+from decimal import Decimal
+
+from common import setup_django, test_database, timer
+
+def seed_orders(count):
+    from authentication.models import User
+    from kitchen.models import MenuItem
+    from orders.models import Order, OrderItem
+
+    chef = User.objects.create_user(username='bench-chef', password='bench', role='chef')
+    menu_item = MenuItem.objects.bulk_create([
+        MenuItem(name='Bench Burger', description='', price=Decimal('10.00'),
+                 category='Burgers', preparation_time=10)
+    ])[0]
+
+    orders = Order.objects.bulk_create([Order(total_amount=Decimal('20.00')) for _ in range(count)])
+    OrderItem.objects.bulk_create([
+        OrderItem(order=order, menu_item=menu_item, quantity=2, price=menu_item.price)
+        for order in orders
+    ])
+    return chef, [order.pk for order in orders]
+
+def full_row_path(order_ids, chef):
+    from django.utils import timezone
+    from orders.models import Order
+
+    for order_id in order_ids:
+        order = Order.objects.get(pk=order_id)
+        order.status = 'preparing'
+        order.chef = chef
+        order.started_preparing_at = timezone.now()
+        order.save()
+        order.estimated_preparation_time = max(5, order.items.count() * 5)
+        order.save(update_fields=['estimated_preparation_time'])
+
+def state_machine_path(order_ids, chef):
+    from django.db.models import Prefetch
+    from orders.models import Order, OrderItem
+    from orders.state_machine import apply_transition
+
+    for order_id in order_ids:
+        order = Order.objects.prefetch_related(
+            Prefetch('items', queryset=OrderItem.objects.select_related('menu_item'))
+        ).get(pk=order_id)
+        apply_transition(order, 'preparing', user=chef)
+
+def check_transitioned(order_ids):
+    from orders.models import Order
+
+    left = Order.objects.filter(pk__in=order_ids).exclude(status='preparing').count()
+    if left:
+        raise SystemExit(f"{left} orders were not moved to 'preparing'; the timing above is meaningless")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--orders', type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        chef, order_ids = seed_orders(args.orders * 2)
+        legacy_ids, state_machine_ids = order_ids[:args.orders], order_ids[args.orders:]
+
+        with timer('full-row save (legacy)', len(legacy_ids)):
+            full_row_path(legacy_ids, chef)
+        check_transitioned(legacy_ids)
+
+        with timer('state machine conditional UPDATE', len(state_machine_ids)):
+            state_machine_path(state_machine_ids, chef)
+        check_transitioned(state_machine_ids)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Cold start cost of each settings profile.
+
+Starts fresh interpreters, as a new or recycled worker would, and times
+django.setup(), loading the ASGI or WSGI application and serving the first
+request. Each profile is started --runs times; the mean and best are shown.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from common import BACKEND_DIR
+
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+setup = time.perf_counter()
+
+import importlib
+importlib.import_module(sys.argv[1])
+application = time.perf_counter()
+
+from django.test import Client
+Client().get('/api/orders/orders/', HTTP_HOST='localhost')
+first_request = time.perf_counter()
+
+print(json.dumps({
+    'setup': setup - start,
+    'application': application - setup,
+    'first_request': first_request - application,
+}))
+"""
+
+PROFILES = ['core.settings.development', 'core.settings.production', 'core.settings.test']
+
+def start_worker(profile, app_module):
+    env = dict(os.environ)
+    env.update({
+        'DJANGO_SETTINGS_MODULE': profile,
+        'DJANGO_SECRET_KEY': env.get('DJANGO_SECRET_KEY', 'bench-secret-key'),
+        'DJANGO_ALLOWED_HOSTS': env.get('DJANGO_ALLOWED_HOSTS', 'localhost'),
+    })
+
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-c', CHILD, app_module],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    elapsed = time.perf_counter() - start
+    if result.returncode:
+        raise RuntimeError(f'{profile} failed to start:\n{result.stderr}')
+
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings['total'] = elapsed
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--app', choices=['asgi', 'wsgi'], default='asgi')
+    parser.add_argument('--profile', action='append', choices=PROFILES,
+                        help='Profile to measure (repeatable; default all)')
+    args = parser.parse_args()
+
+    app_module = f'core.{args.app}'
+    columns = ['setup', 'application', 'first_request', 'total']
+    print(f"{'profile':<28}" + ''.join(f"{column:>22}" for column in columns))
+    print(f"{'':<28}" + ''.join(f"{'mean / best (ms)':>22}" for _ in columns))
+
+    for profile in args.profile or PROFILES:
+        runs = [start_worker(profile, app_module) for _ in range(args.runs)]
+        cells = []
+        for column in columns:
+            values = [run[column] * 1000 for run in runs]
+            cells.append(f"{statistics.mean(values):>13.1f} / {min(values):>6.1f}")
+        print(f"{profile:<28}" + ''.join(cells))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+"""
+WebSocket fan-out under load.
+
+Opens many RestaurantConsumer connections against the ASGI application in
+core/asgi.py (in process, no sockets), drives order status changes through
+the REST API and the outbox dispatcher, and reports:
+  - latency from the REST call to each socket receiving the frame
+  - memory allocated per open connection
+  - the highest event rate sustained within the latency budget
+
+Runs offline with the in-memory channel layer; pass --redis-url to fan out
+through a local Redis instead (needs channels-redis).
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import tracemalloc
+from decimal import Decimal
+
+from common import setup_django, test_database
+
+def configure(args):
+    from channels.layers import channel_layers
+    from django.conf import settings
+
+    if args.redis_url:
+        settings.CHANNEL_LAYERS = {'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {'hosts': [args.redis_url], 'capacity': 10000},
+        }}
+    else:
+        settings.CHANNEL_LAYERS = {'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+            'CONFIG': {'capacity': 10000},
+        }}
+    channel_layers.backends.clear()
+
+    settings.WEBSOCKET_COALESCE_WINDOW = args.window
+    settings.WEBSOCKET_MAX_PENDING = 100000
+
+def seed(count):
+    from authentication.models import User
+    from kitchen.models import MenuItem
+    from orders.models import Order, OrderItem
+    from orders import kitchen_queue
+    from tables.models import Table
+
+    chef = User.objects.create_user(username='bench-chef', password='bench', role='chef')
+    table = Table.objects.create(table_number=1, capacity=4, location='Main Floor')
+    menu_item = MenuItem.objects.bulk_create([
+        MenuItem(name='Bench Burger', description='', price=Decimal('10.00'),
+                 category='Burgers', preparation_time=10)
+    ])[0]
+
+    orders = Order.objects.bulk_create([
+        Order(table=table, total_amount=Decimal('20.00')) for _ in range(count)
+    ])
+    OrderItem.objects.bulk_create([
+        OrderItem(order=order, menu_item=menu_item, quantity=2, price=menu_item.price)
+        for order in orders
+    ])
+    kitchen_queue.rebuild()
+    return chef, [order.pk for order in orders]
+
+def percentile(values, fraction):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+class Fleet:
+    """
+    Open connections and what they have received
+    """
+    def __init__(self):
+        self.communicators = []
+        self.readers = []
+        self.sent_at = {}
+        self.latencies = []
+
+    async def open(self, application, token, count, chunk=100):
+        from channels.testing import WebsocketCommunicator
+
+        for start in range(0, count, chunk):
+            batch = [
+                WebsocketCommunicator(application, f'/ws/restaurant/?token={token}')
+                for _ in range(min(chunk, count - start))
+            ]
+            results = await asyncio.gather(*[communicator.connect() for communicator in batch])
+            if not all(connected for connected, _ in results):
+                raise RuntimeError('A connection was refused')
+            # Drop the connected frame
+            await asyncio.gather(*[communicator.receive_from() for communicator in batch])
+            self.communicators.extend(batch)
+
+    def start_reading(self):
+        self.readers = [asyncio.ensure_future(self.read(communicator)) for communicator in self.communicators]
+
+    async def read(self, communicator):
+        while True:
+            frame = json.loads(await communicator.receive_from(timeout=3600))
+            received = time.perf_counter()
+            payload = frame.get('payload', {})
+            orders = payload.get('orders') or [payload.get('order') or {}]
+            for order in orders:
+                sent = self.sent_at.get(order.get('id'))
+                if sent is not None:
+                    self.latencies.append(received - sent)
+
+    async def close(self):
+        for reader in self.readers:
+            reader.cancel()
+        await asyncio.gather(*self.readers, return_exceptions=True)
+        await asyncio.gather(*[communicator.disconnect() for communicator in self.communicators])
+
+def drive(chef, order_ids, rate, sent_at):
+    """
+    POST status changes at `rate` per second, dispatching the outbox after
+    each one; returns the rate achieved
+    """
+    from rest_framework.test import APIClient
+    from orders import outbox
+
+    client = APIClient()
+    client.force_authenticate(user=chef)
+
+    start = time.perf_counter()
+    for index, order_id in enumerate(order_ids):
+        delay = start + index / rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+        sent_at[order_id] = time.perf_counter()
+        response = client.post(f'/api/orders/orders/{order_id}/status/', {'status': 'preparing'})
+        if response.status_code != 200:
+            raise RuntimeError(f'Status update failed: {response.status_code} {response.data}')
+        outbox.dispatch_pending()
+
+    return len(order_ids) / (time.perf_counter() - start)
+
+async def wait_for(fleet, expected, timeout):
+    deadline = time.perf_counter() + timeout
+    while len(fleet.latencies) < expected and time.perf_counter() < deadline:
+        await asyncio.sleep(0.05)
+
+async def run(args, chef, order_ids):
+    from asgiref.sync import sync_to_async
+    from rest_framework_simplejwt.tokens import AccessToken
+    from core.asgi import application
+
+    token = str(AccessToken.for_user(chef))
+    fleet = Fleet()
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    await fleet.open(application, token, args.connections)
+    opened = time.perf_counter() - started
+    per_connection = (tracemalloc.get_traced_memory()[0] - before) / args.connections
+    tracemalloc.stop()
+
+    print(f"{'connections opened':<28} {args.connections:>8}  {opened:8.3f}s")
+    print(f"{'memory per connection':<28} {per_connection / 1024:8.1f} KiB")
+    print(f"{'coalesce window':<28} {args.window * 1000:8.1f} ms")
+    print()
+    print(f"{'target/s':>9} {'achieved/s':>11} {'frames':>9} {'lost':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+
+    fleet.start_reading()
+    sustained = 0
+    remaining = list(order_ids)
+    for rate in args.rates:
+        count = max(1, int(rate * args.duration))
+        step, remaining = remaining[:count], remaining[count:]
+        if len(step) < count:
+            print('Ran out of seeded orders; raise --duration or lower --rates')
+            break
+
+        fleet.latencies = []
+        achieved = await sync_to_async(drive)(chef, step, rate, fleet.sent_at)
+        expected = len(step) * args.connections
+        await wait_for(fleet, expected, args.drain_timeout)
+
+        latencies = [latency * 1000 for latency in fleet.latencies]
+        lost = expected - len(latencies)
+        p99 = percentile(latencies, 0.99)
+        print(f"{rate:>9} {achieved:>11.1f} {len(latencies):>9} {lost:>7} "
+              f"{statistics.median(latencies) if latencies else float('nan'):>8.1f} "
+              f"{percentile(latencies, 0.95):>8.1f} {p99:>8.1f}")
+
+        if lost or p99 > args.max_p99 or achieved < rate * 0.95:
+            break
+        sustained = rate
+
+    print()
+    print(f"max sustained rate: {sustained} events/s "
+          f"(p99 <= {args.max_p99:.0f} ms, no lost frames, {args.connections} connections)")
+
+    await fleet.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--connections', type=int, default=1000)
+    parser.add_argument('--rates', type=lambda value: [int(rate) for rate in value.split(',')],
+                        default=[10, 25, 50, 100, 200, 400],
+                        help='Event rates (per second) to step through')
+    parser.add_argument('--duration', type=float, default=2.0, help='Seconds per rate step')
+    parser.add_argument('--max-p99', type=float, default=250.0, help='Latency budget in milliseconds')
+    parser.add_argument('--window', type=float, default=0.0,
+                        help='WEBSOCKET_COALESCE_WINDOW in seconds (0 sends each event at once)')
+    parser.add_argument('--drain-timeout', type=float, default=10.0)
+    parser.add_argument('--redis-url', default=None, help='e.g. redis://127.0.0.1:6379/0')
+    args = parser.parse_args()
+
+    setup_django()
+    configure(args)
+    with test_database():
+        chef, order_ids = seed(int(sum(args.rates) * args.duration) + len(args.rates))
+        asyncio.run(run(args, chef, order_ids))
+
+if __name__ == '__main__':
+    main()
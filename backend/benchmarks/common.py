@@ -0,0 +1,46 @@
+"""
+Shared setup for the standalone benchmarks in this directory.
+
+Run a benchmark from the backend directory, e.g.
+    python benchmarks/bench_order_transitions.py
+Every benchmark runs against a throwaway test database.
+"""
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def setup_django(settings_module='core.settings.test'):
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+
+    import django
+    django.setup()
+
+@contextmanager
+def test_database():
+    """
+    Create the test database for the duration of the block
+    """
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+def report(label, count, elapsed):
+    print(f"{label:<40} {count:>7} ops  {elapsed:8.3f}s  {count / elapsed:10.1f} ops/s")
+
+@contextmanager
+def timer(label, count):
+    start = time.perf_counter()
+    yield
+    report(label, count, time.perf_counter() - start)
@@ -1,10 +1,9 @@
 from __future__ import absolute_import, unicode_literals
 import os
 from celery import Celery
-from celery.schedules import crontab
 
 # Set the default Django settings module for the 'celery' program.
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings.development')
 
 app = Celery('restaurant_management')
 
@@ -19,8 +18,16 @@ app.autodiscover_tasks()
 
 # Periodic tasks
 app.conf.beat_schedule = {
-    'sync-menu-items-hourly': {
+    'sync-menu-items': {
         'task': 'menu.tasks.sync_menu_items_task',
-        'schedule': crontab(hour='*'),  # Run every hour
+        'schedule': 10.0,  # Only items changed since the last run are visited
+    },
+    'escalate-order-priorities': {
+        'task': 'orders.tasks.escalate_order_priorities_task',
+        'schedule': 60.0,  # Run every minute
+    },
+    'dispatch-outbox': {
+        'task': 'orders.tasks.dispatch_outbox_task',
+        'schedule': 5.0,  # Fallback when the dispatch_outbox command is not running
     },
 }
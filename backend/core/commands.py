@@ -0,0 +1,80 @@
+"""
+Commands a WebSocket client may send.
+
+Each handler validates the payload and applies it through the same
+service as the REST API (orders.commands, tables.commands), which records
+one authoritative event in the outbox; nothing the client sends is relayed
+to other sockets as is. Handlers take the user and the payload and return
+the result for the sender, raising CommandError when the command is
+rejected.
+"""
+from types import SimpleNamespace
+from orders.commands import get_order, create_order, change_order_status
+from orders.models import Order
+from orders.serializers import OrderSerializer
+from orders.state_machine import TransitionError
+from tables.commands import change_table_status, TableStatusError
+from tables.models import Table
+
+class CommandError(Exception):
+    """
+    Raised when a command is invalid or cannot be applied; the argument is
+    sent back to the client
+    """
+
+def order_status_update(user, payload):
+    """
+    {'order_id': 1, 'status': 'preparing', 'expected_status': 'pending'}
+    """
+    order_id = payload.get('order_id')
+    new_status = payload.get('status')
+    if not order_id or not new_status:
+        raise CommandError('order_id and status are required')
+
+    try:
+        order = get_order(order_id, user)
+    except (Order.DoesNotExist, TypeError, ValueError):
+        raise CommandError('Order not found')
+
+    try:
+        change_order_status(order, new_status, user, expected_status=payload.get('expected_status'))
+    except TransitionError as e:
+        raise CommandError(str(e))
+
+    return {'id': order.pk, 'status': order.status}
+
+def table_status_update(user, payload):
+    """
+    {'id': 1, 'status': 'occupied'}
+    """
+    try:
+        table = Table.objects.get(pk=payload.get('id'))
+    except (Table.DoesNotExist, TypeError, ValueError):
+        raise CommandError('Table not found')
+
+    try:
+        change_table_status(table, payload.get('status'))
+    except TableStatusError as e:
+        raise CommandError(str(e))
+
+    return {'id': table.pk, 'status': table.status}
+
+def new_order(user, payload):
+    """
+    The same body as POST /orders/: {'table': 1, 'items': [{'menu_item': 1, 'quantity': 2}]}
+    """
+    serializer = OrderSerializer(data=payload, context={
+        'request': SimpleNamespace(user=user),
+        'items': payload.get('items', [])
+    })
+    if not serializer.is_valid():
+        raise CommandError(serializer.errors)
+
+    order = create_order(serializer, user)
+    return {'id': order.pk, 'status': order.status}
+
+COMMANDS = {
+    'order_status_update': order_status_update,
+    'table_status_update': table_status_update,
+    'new_order': new_order,
+}
@@ -1,137 +1,429 @@
-import json
+import asyncio
+import time
+from collections import deque
+from urllib.parse import parse_qs
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from django.contrib.auth import get_user_model
-from rest_framework_simplejwt.tokens import AccessToken
-from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from django.conf import settings
+from orders import events
+from . import frames, replay, topics
+from .commands import COMMANDS, CommandError
 
-User = get_user_model()
+# Event types that describe new orders; later updates are folded into them
+CREATE_EVENTS = ['order.create', 'order.bulk_create']
+
+# Type of a frame merged from events of different types; clients apply it
+# as a partial update of any order fields
+MERGED_EVENT = 'order.update'
+
+class OutboundQueue:
+    """
+    Order events waiting to be flushed to one connection.
+
+    Holds one entry per order: a later event for the same order is merged
+    into the pending one (field by field, so deltas stack), which drops the
+    superseded frame; entries merged from different update types go out as
+    MERGED_EVENT. At most `limit` orders are held; past that the
+    queue gives up on the individual events and the connection is resent a
+    snapshot instead. Each entry remembers the outbox events it was built
+    from, which names the frame in the shared frame cache.
+    """
+    def __init__(self, limit):
+        self.limit = limit
+        self.entries = {}
+        self.shapes = {}
+        self.seq = None
+        self.overflowed = False
+
+    def __bool__(self):
+        return bool(self.entries) or self.overflowed
+
+    def add(self, event):
+        event_type = event['type']
+        if 'orders' in event:
+            self.shapes[event_type] = 'orders'
+            orders = event['orders']
+        else:
+            self.shapes[event_type] = 'order'
+            orders = [event['order']]
+
+        if event.get('seq') is not None:
+            self.seq = max(self.seq or 0, event['seq'])
+
+        if self.overflowed:
+            return
+
+        for data in orders:
+            entry = self.entries.get(data['id'])
+            if entry is None:
+                if len(self.entries) >= self.limit:
+                    self.entries.clear()
+                    self.overflowed = True
+                    return
+                self.entries[data['id']] = [event_type, dict(data), [event.get('event_id')]]
+                continue
+
+            if entry[0] not in CREATE_EVENTS and entry[0] != event_type:
+                # Keep the merged fields under a type every client applies
+                # in full, not the narrower type of the latest event
+                entry[0] = MERGED_EVENT
+                self.shapes.setdefault(MERGED_EVENT, 'order')
+            entry[1].update(data)
+            entry[2].append(event.get('event_id'))
+
+    def drain(self):
+        """
+        (frame, cache key) pairs for everything queued, in the shape of their
+        event type, then reset. Only the last frame carries the sequence
+        number, so a client that loses the connection mid-flush resumes from
+        before the batch. Frames built from events without an outbox id get
+        no cache key.
+        """
+        grouped = {}
+        for event_type, data, event_ids in self.entries.values():
+            grouped.setdefault(event_type, []).append((data, tuple(event_ids)))
+
+        drained = []
+        for event_type, entries in grouped.items():
+            if self.shapes[event_type] == 'orders':
+                parts = [entries]
+            else:
+                parts = [[entry] for entry in entries]
+
+            for part in parts:
+                frame = {'type': event_type, 'seq': None}
+                if self.shapes[event_type] == 'orders':
+                    frame['payload'] = {'orders': [data for data, _ in part]}
+                else:
+                    frame['payload'] = {'order': part[0][0]}
+
+                sources = tuple((data['id'], event_ids) for data, event_ids in part)
+                cacheable = all(None not in event_ids for _, event_ids in sources)
+                drained.append([frame, (event_type, sources) if cacheable else None])
+
+        if drained:
+            frame, key = drained[-1]
+            frame['seq'] = self.seq
+            if key is not None:
+                drained[-1][1] = key + (self.seq,)
+
+        self.entries = {}
+        self.seq = None
+        return [tuple(pair) for pair in drained]
+
+class RateLimiter:
+    """
+    Token bucket allowing `rate` messages per second in bursts of up to `burst`
+    """
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def allow(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
 
 class RestaurantConsumer(AsyncWebsocketConsumer):
+    # Recent outbox event ids, to drop an event seen through several groups
+    SEEN_EVENTS = 256
+
     async def connect(self):
         try:
-            # Get token from query string
-            token = self.scope['query_string'].decode().split('=')[1]
+            # Last sequence number seen, when resuming, from query string
+            query = parse_qs(self.scope['query_string'].decode())
             
-            # Validate token and get user
-            user = await self.get_user_from_token(token)
-            if not user:
+            # User authenticated by JWTAuthMiddleware (core.middleware)
+            user = self.scope.get('user')
+            if not user or not user.is_authenticated:
                 await self.close()
                 return
 
             self.user = user
-            self.room_group_name = 'restaurant_updates'
+            self.topic_groups = set()
+            self.seen_events = deque(maxlen=self.SEEN_EVENTS)
 
-            # Join room group
-            await self.channel_layer.group_add(
-                self.room_group_name,
-                self.channel_name
+            # Order events are coalesced per order for this long (seconds)
+            # before being flushed; 0 sends every event as it arrives
+            self.coalesce_window = getattr(settings, 'WEBSOCKET_COALESCE_WINDOW', 0.1)
+            self.outbound = OutboundQueue(getattr(settings, 'WEBSOCKET_MAX_PENDING', 1000))
+            self.flush_task = None
+
+            # Messages a client may send per second, and in one burst
+            self.rate_limiter = RateLimiter(
+                getattr(settings, 'WEBSOCKET_RATE_LIMIT', 5),
+                getattr(settings, 'WEBSOCKET_RATE_BURST', 20)
             )
+            self.throttled = False
+
+            # Join the topic groups for the user's role (including the
+            # restaurant_updates group for tables and reservations)
+            for group in topics.default_groups(user):
+                await self.join_topic(group)
+
+            # Binary MessagePack frames for clients offering the subprotocol
+            self.encoding = frames.negotiate(self.scope.get('subprotocols'))
+            await self.accept(subprotocol=frames.MSGPACK if self.encoding == frames.MSGPACK else None)
 
-            await self.accept()
+            resume_from = query.get('resume_from', [None])[0]
+            if resume_from is not None:
+                await self.resume(resume_from)
+            else:
+                await self.send_frame({
+                    'type': 'connected',
+                    'seq': replay.current_sequence(),
+                    'payload': {'topics': sorted(self.topic_groups)}
+                })
         except Exception as e:
             print(f"WebSocket connection error: {str(e)}")
             await self.close()
 
     async def disconnect(self, close_code):
-        # Leave room group
+        flush_task = getattr(self, 'flush_task', None)
+        if flush_task is not None:
+            flush_task.cancel()
+
+        # Leave topic groups
         try:
-            await self.channel_layer.group_discard(
-                self.room_group_name,
-                self.channel_name
-            )
+            for group in list(getattr(self, 'topic_groups', [])):
+                await self.leave_topic(group)
         except Exception as e:
             print(f"WebSocket disconnection error: {str(e)}")
 
-    async def receive(self, text_data):
+    async def receive(self, text_data=None, bytes_data=None):
         try:
-            text_data_json = json.loads(text_data)
-            message_type = text_data_json.get('type')
-            payload = text_data_json.get('payload', {})
+            if not self.rate_limiter.allow():
+                # Tell the client once per throttled stretch, then drop silently
+                if not self.throttled:
+                    self.throttled = True
+                    await self.send_frame({
+                        'type': 'error',
+                        'payload': {'error': 'Rate limit exceeded'}
+                    })
+                return
+            self.throttled = False
+
+            message = frames.decode(text_data if text_data is not None else bytes_data)
+            message_type = message.get('type')
+            payload = message.get('payload', {})
+            if not isinstance(payload, dict):
+                payload = {}
 
             # Handle different message types
-            if message_type == 'order_status_update':
-                await self.channel_layer.group_send(
-                    self.room_group_name,
-                    {
-                        'type': 'order_status_update',
-                        'payload': payload
-                    }
-                )
-            elif message_type == 'table_status_update':
-                await self.channel_layer.group_send(
-                    self.room_group_name,
-                    {
-                        'type': 'table_status_update',
-                        'payload': payload
-                    }
-                )
-            elif message_type == 'new_order':
-                await self.channel_layer.group_send(
-                    self.room_group_name,
-                    {
-                        'type': 'new_order',
-                        'payload': payload
-                    }
-                )
-            elif message_type == 'reservation_update':
-                await self.channel_layer.group_send(
-                    self.room_group_name,
-                    {
-                        'type': 'reservation_update',
-                        'payload': payload
-                    }
-                )
-        except json.JSONDecodeError:
-            print("Invalid JSON format received")
+            if message_type == 'subscribe':
+                await self.subscribe(payload.get('topics', []))
+            elif message_type == 'unsubscribe':
+                await self.unsubscribe(payload.get('topics', []))
+            elif message_type == 'resume':
+                await self.resume(payload.get('seq'))
+            else:
+                await self.run_command(message_type, payload, message.get('request_id'))
+        except ValueError:
+            print("Invalid message format received")
         except Exception as e:
             print(f"Error processing WebSocket message: {str(e)}")
 
-    # Message handlers
-    async def order_status_update(self, event):
+    async def run_command(self, message_type, payload, request_id=None):
+        """
+        Apply a client command (see core.commands) and answer the sender.
+        Other sockets hear about it from the event the command records.
+        """
+        result = {'command': message_type, 'request_id': request_id}
+
+        command = COMMANDS.get(message_type)
+        if command is None:
+            result.update(ok=False, error=f"Unknown message type: {message_type}")
+        else:
+            try:
+                result.update(ok=True, result=await database_sync_to_async(command)(self.user, payload))
+            except CommandError as e:
+                result.update(ok=False, error=e.args[0])
+
+        await self.send_frame({
+            'type': 'command_result',
+            'payload': result
+        })
+
+    async def join_topic(self, group):
+        await self.channel_layer.group_add(group, self.channel_name)
+        self.topic_groups.add(group)
+
+    async def leave_topic(self, group):
+        await self.channel_layer.group_discard(group, self.channel_name)
+        self.topic_groups.discard(group)
+
+    async def subscribe(self, requested):
+        """
+        Join the requested topic groups the user is allowed to see
+        """
+        if not isinstance(requested, list):
+            requested = []
+
+        joined, rejected = [], []
+        for topic in requested:
+            if topic in self.topic_groups:
+                joined.append(topic)
+            elif len(self.topic_groups) < topics.MAX_TOPICS and topics.can_subscribe(self.user, topic):
+                await self.join_topic(topic)
+                joined.append(topic)
+            else:
+                rejected.append(topic)
+
+        await self.send_frame({
+            'type': 'subscribed',
+            'payload': {'topics': sorted(self.topic_groups), 'joined': joined, 'rejected': rejected}
+        })
+
+    async def unsubscribe(self, requested):
+        if not isinstance(requested, list):
+            requested = []
+
+        for topic in requested:
+            if topic in self.topic_groups:
+                await self.leave_topic(topic)
+
+        await self.send_frame({
+            'type': 'subscribed',
+            'payload': {'topics': sorted(self.topic_groups), 'joined': [], 'rejected': []}
+        })
+
+    async def resume(self, seq):
+        """
+        Send the events missed since `seq` for this connection's topics, or
+        a snapshot of their open orders when the replay buffer no longer
+        reaches back that far
+        """
         try:
-            await self.send(text_data=json.dumps({
-                'type': 'order_status_update',
-                'payload': event['payload']
-            }))
-        except Exception as e:
-            print(f"Error sending order status update: {str(e)}")
+            seq = int(seq)
+        except (TypeError, ValueError):
+            seq = -1
+
+        current = replay.current_sequence()
+        missed = replay.since(seq, self.topic_groups) if seq >= 0 else None
+        if missed is None:
+            await self.send_snapshot(current)
+            return
+
+        for event in missed:
+            await self.dispatch(event)
+
+    async def send_snapshot(self, seq):
+        orders = await database_sync_to_async(events.snapshot)(self.topic_groups)
+        await self.send_frame({
+            'type': 'snapshot',
+            'seq': seq,
+            'payload': {'orders': orders}
+        })
+
+    async def send_frame(self, frame, key=None):
+        """
+        Send `frame` in this connection's encoding. Frames with a `key` are
+        encoded once per process and encoding (see core.frames).
+        """
+        data = frames.frame_cache.encoded(frame, self.encoding, key)
+        if isinstance(data, bytes):
+            await self.send(bytes_data=data)
+        else:
+            await self.send(text_data=data)
 
-    async def table_status_update(self, event):
+    @staticmethod
+    def event_key(event):
+        """
+        Cache key for a frame carrying one outbox event unchanged
+        """
+        if event.get('event_id') is None:
+            return None
+        return ('event', event['event_id'], event.get('seq'))
+
+    def is_repeat(self, event):
+        """
+        Whether this outbox event was already sent to this connection
+        """
+        event_id = event.get('event_id')
+        if event_id is None:
+            return False
+        if event_id in self.seen_events:
+            return True
+        self.seen_events.append(event_id)
+        return False
+
+    async def forward_event(self, event):
+        """
+        Send an order event from the outbox once, however many of this
+        connection's groups it was published to
+        """
+        if self.is_repeat(event):
+            return
+
+        if self.coalesce_window > 0:
+            self.outbound.add(event)
+            if self.flush_task is None:
+                self.flush_task = asyncio.ensure_future(self.flush_later())
+            return
+
+        payload = {key: value for key, value in event.items() if key not in ['type', 'event_id', 'seq']}
         try:
-            await self.send(text_data=json.dumps({
-                'type': 'table_status_update',
-                'payload': event['payload']
-            }))
+            await self.send_frame({
+                'type': event['type'],
+                'seq': event.get('seq'),
+                'payload': payload
+            }, self.event_key(event))
         except Exception as e:
-            print(f"Error sending table status update: {str(e)}")
+            print(f"Error sending {event['type']}: {str(e)}")
 
-    async def new_order(self, event):
+    async def flush_later(self):
+        """
+        Flush the outbound queue once per window until it stays empty.
+        Events arriving while a slow client is still being sent the last
+        flush are merged into the queue rather than piling up behind it.
+        """
         try:
-            await self.send(text_data=json.dumps({
-                'type': 'new_order',
-                'payload': event['payload']
-            }))
+            while self.outbound:
+                await asyncio.sleep(self.coalesce_window)
+
+                if self.outbound.overflowed:
+                    self.outbound = OutboundQueue(self.outbound.limit)
+                    await self.send_snapshot(replay.current_sequence())
+                    continue
+
+                for frame, key in self.outbound.drain():
+                    await self.send_frame(frame, key)
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
-            print(f"Error sending new order notification: {str(e)}")
+            print(f"Error flushing order events: {str(e)}")
+        finally:
+            self.flush_task = None
+
+    # Order events published by orders.events
+    order_create = forward_event
+    order_update = forward_event
+    order_bulk_create = forward_event
+    order_bulk_update = forward_event
+    order_priority_update = forward_event
+
+    async def floor_event(self, event):
+        """
+        Send a table or reservation event from the outbox as is
+        """
+        if self.is_repeat(event):
+            return
 
-    async def reservation_update(self, event):
         try:
-            await self.send(text_data=json.dumps({
-                'type': 'reservation_update',
+            await self.send_frame({
+                'type': event['type'],
+                'seq': event.get('seq'),
                 'payload': event['payload']
-            }))
+            }, self.event_key(event))
         except Exception as e:
-            print(f"Error sending reservation update: {str(e)}")
+            print(f"Error sending {event['type']}: {str(e)}")
 
-    @database_sync_to_async
-    def get_user_from_token(self, token):
-        try:
-            # Validate token
-            access_token = AccessToken(token)
-            user_id = access_token['user_id']
-            
-            # Get user from database
-            return User.objects.get(id=user_id)
-        except (InvalidToken, TokenError, User.DoesNotExist):
-            return None
+    # Table and reservation events published by tables.events
+    table_status_update = floor_event
+    reservation_update = floor_event
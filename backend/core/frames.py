@@ -0,0 +1,74 @@
+"""
+Frame encoding for WebSocket connections.
+
+Frames are JSON text by default. A client that offers the `msgpack`
+subprotocol gets binary MessagePack frames instead. Frames built from
+outbox events are cached per process under a key naming those events, so
+an event fanned out to every socket in the process is encoded once per
+encoding instead of once per socket.
+"""
+import json
+from collections import OrderedDict
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK = 'msgpack'
+JSON = 'json'
+
+# Encoded frames kept per process
+CACHE_SIZE = 1024
+
+def negotiate(subprotocols):
+    """
+    The encoding for a connection offering `subprotocols`
+    """
+    if msgpack is not None and MSGPACK in (subprotocols or []):
+        return MSGPACK
+    return JSON
+
+def encode(frame, encoding):
+    if encoding == MSGPACK:
+        return msgpack.packb(frame, use_bin_type=True)
+    return json.dumps(frame)
+
+def decode(data):
+    """
+    A client message: text frames are JSON, binary frames MessagePack
+    """
+    if isinstance(data, bytes):
+        if msgpack is None:
+            raise ValueError('Binary frames are not supported')
+        return msgpack.unpackb(data, raw=False)
+    return json.loads(data)
+
+class FrameCache:
+    """
+    Least recently used encoded frames by (key, encoding)
+    """
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self.entries = OrderedDict()
+
+    def encoded(self, frame, encoding, key=None):
+        if key is None:
+            return encode(frame, encoding)
+
+        cache_key = (key, encoding)
+        data = self.entries.get(cache_key)
+        if data is not None:
+            self.entries.move_to_end(cache_key)
+            return data
+
+        data = encode(frame, encoding)
+        self.entries[cache_key] = data
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+        return data
+
+    def clear(self):
+        self.entries.clear()
+
+frame_cache = FrameCache()
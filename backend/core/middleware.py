@@ -0,0 +1,113 @@
+"""
+JWT authentication for WebSocket connections.
+
+`JWTAuthMiddleware` reads `?token=<access token>` from the query string,
+validates it and puts the user in `scope['user']`. Sockets have no
+session fallback: without a valid token the user is anonymous and the
+consumer refuses the connection. Users are served from a
+small per-process cache keyed by user id, so when every screen reconnects
+at once after a network blip the handshakes are answered without touching
+the database; concurrent misses for the same user share one lookup.
+"""
+import asyncio
+import time
+from urllib.parse import parse_qs
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.db.models.signals import post_delete, post_save
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+User = get_user_model()
+
+class UserCache:
+    """
+    Active users by id for `ttl` seconds, holding at most `size` entries
+    """
+    def __init__(self, ttl=60, size=1000):
+        self.ttl = ttl
+        self.size = size
+        self.entries = {}
+        self.pending = {}
+
+    async def get(self, user_id):
+        entry = self.entries.get(user_id)
+        if entry is not None and entry[1] > time.monotonic():
+            return entry[0]
+
+        # Another connection is already loading this user: wait for it
+        if user_id in self.pending:
+            return await asyncio.shield(self.pending[user_id])
+
+        future = asyncio.ensure_future(load_user(user_id))
+        self.pending[user_id] = future
+        try:
+            user = await future
+        finally:
+            del self.pending[user_id]
+
+        if len(self.entries) >= self.size:
+            self.evict()
+        self.entries[user_id] = (user, time.monotonic() + self.ttl)
+        return user
+
+    def evict(self):
+        now = time.monotonic()
+        self.entries = {key: entry for key, entry in self.entries.items() if entry[1] > now}
+        while len(self.entries) >= self.size:
+            # Oldest insertion first
+            del self.entries[next(iter(self.entries))]
+
+    def invalidate(self, user_id):
+        self.entries.pop(user_id, None)
+
+    def clear(self):
+        self.entries.clear()
+
+user_cache = UserCache(
+    ttl=getattr(settings, 'WEBSOCKET_USER_CACHE_TTL', 60),
+    size=getattr(settings, 'WEBSOCKET_USER_CACHE_SIZE', 1000)
+)
+
+@database_sync_to_async
+def load_user(user_id):
+    """
+    The active user with `user_id`, or None
+    """
+    return User.objects.filter(pk=user_id, is_active=True).first()
+
+def drop_cached_user(sender, instance, **kwargs):
+    # Role changes and deactivations apply to new connections in this process at once
+    user_cache.invalidate(instance.pk)
+
+post_save.connect(drop_cached_user, sender=User, dispatch_uid='websocket_user_cache_save')
+post_delete.connect(drop_cached_user, sender=User, dispatch_uid='websocket_user_cache_delete')
+
+def token_from_scope(scope):
+    query = parse_qs(scope.get('query_string', b'').decode())
+    return query.get('token', [None])[0]
+
+async def get_user_from_token(token):
+    try:
+        access_token = AccessToken(token)
+        user_id = access_token['user_id']
+    except (InvalidToken, TokenError, KeyError):
+        return None
+    return await user_cache.get(user_id)
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """
+    Authenticate a WebSocket from its `token` query parameter; a missing or
+    invalid token leaves the connection anonymous
+    """
+    async def __call__(self, scope, receive, send):
+        token = token_from_scope(scope)
+        user = await get_user_from_token(token) if token else None
+        scope = dict(scope, user=user or AnonymousUser())
+        return await super().__call__(scope, receive, send)
+
+def JWTAuthMiddlewareStack(inner):
+    return JWTAuthMiddleware(inner)
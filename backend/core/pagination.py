@@ -0,0 +1,29 @@
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import CursorPagination
+
+class TimestampCursorPagination(CursorPagination):
+    """
+    Keyset pagination for ever-growing, time-ordered tables.
+
+    Pages are addressed by an opaque cursor holding the last timestamp seen
+    rather than a page number, so no COUNT(*) is run and the database seeks
+    straight to the page through the timestamp index instead of using OFFSET.
+    The id tie-breaker keeps the order stable for rows sharing a timestamp.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+
+class StableOrderingFilter(OrderingFilter):
+    """
+    OrderingFilter for cursor-paginated views: whatever ordering the client
+    picks, `id` is appended as a tie-breaker (in the direction of the first
+    field), so rows sharing a value are neither skipped nor repeated across
+    pages
+    """
+    def get_ordering(self, request, queryset, view):
+        ordering = list(super().get_ordering(request, queryset, view) or [])
+        if ordering and not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            ordering.append('-id' if ordering[0].startswith('-') else 'id')
+        return ordering
@@ -0,0 +1,67 @@
+"""
+Stream sequence numbers and the replay buffer for WebSocket resume.
+
+The outbox dispatcher stamps every event with the next number of one
+deployment-wide sequence and keeps the most recent WEBSOCKET_REPLAY_BUFFER
+events in the cache (Redis in production), one key per sequence number.
+A client that reconnects with `resume_from=<seq>` is sent only the events
+it missed for its topics; when those have already left the buffer it gets
+a snapshot instead.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+SEQUENCE_KEY = 'ws:sequence'
+
+def buffer_size():
+    return getattr(settings, 'WEBSOCKET_REPLAY_BUFFER', 500)
+
+def entry_key(seq):
+    return f'ws:replay:{seq}'
+
+def current_sequence():
+    return cache.get(SEQUENCE_KEY, 0)
+
+def reserve(count):
+    """
+    Reserve `count` consecutive sequence numbers; returns the first
+    """
+    try:
+        last = cache.incr(SEQUENCE_KEY, count)
+    except ValueError:
+        cache.add(SEQUENCE_KEY, 0, timeout=None)
+        last = cache.incr(SEQUENCE_KEY, count)
+    return last - count + 1
+
+def record(entries):
+    """
+    Buffer (seq, groups, message) entries with one cache round trip.
+    A reserved number that was not sent is recorded with no groups, so it
+    does not read as a hole in the buffer.
+    """
+    cache.set_many(
+        {entry_key(seq): (groups, message) for seq, groups, message in entries},
+        timeout=getattr(settings, 'WEBSOCKET_REPLAY_TTL', 600)
+    )
+
+def since(seq, groups):
+    """
+    Buffered messages after `seq` for any of `groups`, oldest first, or
+    None when the buffer no longer reaches back to `seq`
+    """
+    current = current_sequence()
+    if seq > current or seq < current - buffer_size():
+        return None
+
+    keys = [entry_key(n) for n in range(seq + 1, current + 1)]
+    entries = cache.get_many(keys)
+    if len(entries) < len(keys):
+        # Evicted or expired before the client came back
+        return None
+
+    groups = set(groups)
+    return [
+        message
+        for entry_groups, message in (entries[key] for key in keys)
+        if groups.intersection(entry_groups)
+    ]
@@ -0,0 +1,10 @@
+"""
+Settings profiles. Point DJANGO_SETTINGS_MODULE at one of
+
+    core.settings.development   local work; the default for manage.py,
+                                wsgi.py, asgi.py and celery
+    core.settings.production    deployments
+    core.settings.test          the test suite and benchmarks
+
+Each profile starts from core.settings.base and only overrides what differs.
+"""
@@ -1,20 +1,24 @@
+"""
+Settings shared by every profile; see core/settings/__init__.py.
+"""
 import os
+from datetime import timedelta
 from pathlib import Path
+from .database import database
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
-BASE_DIR = Path(__file__).resolve().parent.parent
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-your-secret-key-here'
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', 'django-insecure-your-secret-key-here')
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = False
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',') if host]
 
 # Application definition
 INSTALLED_APPS = [
-    'daphne',  # Must be listed before django.contrib.staticfiles
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -24,6 +28,7 @@ INSTALLED_APPS = [
     
     # Third party apps
     'rest_framework',
+    'rest_framework_simplejwt',
     'corsheaders',
     'django_filters',
     'channels',
@@ -33,7 +38,7 @@ INSTALLED_APPS = [
     'kitchen',
     'orders',
     'tables',
-    'menu',  # Add this line
+    'menu',
 ]
 
 MIDDLEWARE = [
@@ -66,13 +71,11 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'core.wsgi.application'
+ASGI_APPLICATION = 'core.asgi.application'
 
-# Database
+# Database; see database.py for the environment variables
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': database(BASE_DIR),
 }
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -115,14 +118,15 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
     ],
+    'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
 # CORS settings
-CORS_ALLOW_ALL_ORIGINS = True  # Only for development
+CORS_ALLOW_ALL_ORIGINS = False
+CORS_ALLOWED_ORIGINS = [origin for origin in os.environ.get('CORS_ALLOWED_ORIGINS', '').split(',') if origin]
 CORS_ALLOW_CREDENTIALS = True
 
 # JWT settings
-from datetime import timedelta
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=30),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
@@ -164,17 +168,41 @@ DEFAULT_FROM_EMAIL = 'Restaurant Management System <noreply@yourrestaurant.com>'
 FRONTEND_URL = os.environ.get('FRONTEND_URL', 'http://localhost:3000')
 
 # Channels Configuration
-ASGI_APPLICATION = 'core.asgi.application'
 CHANNEL_LAYERS = {
     'default': {
         'BACKEND': 'channels_redis.core.RedisChannelLayer',
         'CONFIG': {
-            "hosts": [('127.0.0.1', 6379)],
+            "hosts": [os.environ.get('REDIS_CHANNEL_URL', 'redis://127.0.0.1:6379/0')],
         },
     },
 }
 
-# Add logging for email
+# Shared cache; also holds the WebSocket stream sequence and replay buffer.
+# Order and menu writes only touch it after commit and tolerate it being down
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('REDIS_CACHE_URL', 'redis://127.0.0.1:6379/1'),
+    },
+}
+
+# Events kept for clients reconnecting with resume_from, and for how long (seconds)
+WEBSOCKET_REPLAY_BUFFER = 500
+WEBSOCKET_REPLAY_TTL = 600
+
+# Order updates per connection are coalesced for this long (seconds), holding
+# at most WEBSOCKET_MAX_PENDING orders before falling back to a snapshot
+WEBSOCKET_COALESCE_WINDOW = 0.1
+WEBSOCKET_MAX_PENDING = 1000
+
+# Users authenticated on WebSocket connect are cached per process (seconds, entries)
+WEBSOCKET_USER_CACHE_TTL = 60
+WEBSOCKET_USER_CACHE_SIZE = 1000
+
+# Messages a WebSocket client may send per second, and in one burst
+WEBSOCKET_RATE_LIMIT = 5
+WEBSOCKET_RATE_BURST = 20
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
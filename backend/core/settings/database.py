@@ -0,0 +1,72 @@
+"""
+The default database, read from the environment:
+
+    DB_ENGINE           sqlite or postgres (the default in production)
+    DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT
+    DB_POOL             persistent (the default) or pgbouncer
+    DB_CONN_MAX_AGE     seconds a connection is kept for reuse
+    DB_ATOMIC_REQUESTS  wrap every request in a transaction (off by default)
+
+Django 4.2 has no connection pool of its own. `persistent` keeps each
+worker thread's connection open for DB_CONN_MAX_AGE seconds and checks it
+before reuse. `pgbouncer` is for connecting through PgBouncer in
+transaction pooling mode: the pool lives in PgBouncer and consecutive
+transactions may land on different server connections, so server-side
+cursors, which outlive their transaction, are turned off.
+
+Requests are not atomic by default. Views that write already open their
+own transaction around the change and its outbox event (orders.commands),
+and a per-request transaction would hold row locks while the response is
+serialized.
+"""
+import os
+from django.core.exceptions import ImproperlyConfigured
+
+ENGINES = {
+    'sqlite': 'django.db.backends.sqlite3',
+    'postgres': 'django.db.backends.postgresql',
+}
+
+POOLS = ['persistent', 'pgbouncer']
+
+def flag(value):
+    return str(value).lower() in ['1', 'true', 'yes', 'on']
+
+def database(base_dir, engine='sqlite', conn_max_age=0, environ=os.environ):
+    """
+    DATABASES['default']; DB_ENGINE and DB_CONN_MAX_AGE override `engine`
+    and `conn_max_age`
+    """
+    engine = environ.get('DB_ENGINE', engine)
+    if engine not in ENGINES:
+        raise ImproperlyConfigured(f"DB_ENGINE must be one of {', '.join(ENGINES)}, not {engine!r}")
+
+    pool = environ.get('DB_POOL', 'persistent')
+    if pool not in POOLS:
+        raise ImproperlyConfigured(f"DB_POOL must be one of {', '.join(POOLS)}, not {pool!r}")
+
+    if engine == 'sqlite':
+        config = {
+            'ENGINE': ENGINES[engine],
+            'NAME': environ.get('DB_NAME') or base_dir / 'db.sqlite3',
+        }
+    else:
+        config = {
+            'ENGINE': ENGINES[engine],
+            'NAME': environ.get('DB_NAME', 'restaurant'),
+            'USER': environ.get('DB_USER', 'restaurant'),
+            'PASSWORD': environ.get('DB_PASSWORD', ''),
+            'HOST': environ.get('DB_HOST', 'localhost'),
+            'PORT': environ.get('DB_PORT', '5432'),
+            'OPTIONS': {
+                'connect_timeout': 5,
+                'application_name': 'restaurant-management',
+            },
+        }
+        if pool == 'pgbouncer':
+            config['DISABLE_SERVER_SIDE_CURSORS'] = True
+
+    config['CONN_MAX_AGE'] = int(environ.get('DB_CONN_MAX_AGE', conn_max_age))
+    config['CONN_HEALTH_CHECKS'] = config['CONN_MAX_AGE'] != 0
+    config['ATOMIC_REQUESTS'] = flag(environ.get('DB_ATOMIC_REQUESTS', ''))
+    return config
@@ -0,0 +1,11 @@
+from .base import *  # noqa: F401,F403
+
+DEBUG = True
+
+# Serves runserver over ASGI; it must come before django.contrib.staticfiles.
+# Only here because loading it installs the Twisted reactor, which costs
+# every other process half a second at startup.
+INSTALLED_APPS = ['daphne', *INSTALLED_APPS]
+
+# Only for development
+CORS_ALLOW_ALL_ORIGINS = True
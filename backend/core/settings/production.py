@@ -0,0 +1,79 @@
+"""
+Deployment settings. DJANGO_SECRET_KEY and DJANGO_ALLOWED_HOSTS must be set;
+base.py lists the other environment variables it reads.
+"""
+import os
+from django.core.exceptions import ImproperlyConfigured
+from .base import *  # noqa: F401,F403
+from .database import database
+
+DEBUG = False
+
+if 'DJANGO_SECRET_KEY' not in os.environ:
+    raise ImproperlyConfigured('DJANGO_SECRET_KEY must be set in production')
+
+SESSION_COOKIE_SECURE = True
+CSRF_COOKIE_SECURE = True
+
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# Keep database connections open between requests instead of connecting for
+# each one, and check them before reuse so a dropped connection is replaced
+DATABASES = {
+    'default': database(BASE_DIR, engine='postgres', conn_max_age=60),
+}
+
+CACHES = {
+    'default': {
+        **CACHES['default'],
+        'OPTIONS': {
+            'socket_connect_timeout': 1,
+            'socket_timeout': 1,
+            'health_check_interval': 30,
+        },
+    },
+}
+
+# A connection's channel holds at most `capacity` messages; past that the
+# socket is stuck and further events are dropped. Undelivered messages expire
+# after `expiry` seconds since a client that far behind resumes from the
+# replay buffer (WEBSOCKET_REPLAY_TTL) instead. Groups outlive any socket.
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels_redis.core.RedisChannelLayer',
+        'CONFIG': {
+            'hosts': CHANNEL_LAYERS['default']['CONFIG']['hosts'],
+            'capacity': 1500,
+            'expiry': 10,
+            'group_expiry': 86400,
+        },
+    },
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'plain': {
+            'format': '%(asctime)s %(levelname)s %(process)d %(name)s %(message)s',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'plain',
+        },
+    },
+    'root': {
+        'handlers': ['console'],
+        'level': os.environ.get('DJANGO_LOG_LEVEL', 'WARNING'),
+    },
+    'loggers': {
+        'django.request': {
+            'level': 'ERROR',
+        },
+        'django.security.DisallowedHost': {
+            'level': 'ERROR',
+        },
+    },
+}
@@ -0,0 +1,88 @@
+"""
+Channel-layer group names for WebSocket topics.
+
+Every connection joins the groups for its role on connect and can narrow or
+widen what it receives by subscribing to topics:
+
+    restaurant_updates   table and reservation events (everyone)
+    orders               every order event (admins and managers)
+    role.<role>          events relevant to a role (chef, cashier)
+    user.<id>            orders a waiter is serving
+    station.<category>   orders with items from a kitchen station
+    section.<location>   orders at tables in a floor section
+    table.<id>           orders at one table
+    order.<id>           one order
+
+Publishers send each event only to the groups it belongs to (see
+orders.events.order_groups), so a socket is only woken for its topics.
+"""
+from django.utils.text import slugify
+
+ALL_ORDERS = 'orders'
+
+# Table and reservation events; every connection joins it
+FLOOR = 'restaurant_updates'
+
+# Topic kinds each role may subscribe to; admins and managers may use any
+SUBSCRIBABLE_KINDS = {
+    'chef': {'station', 'order', 'table'},
+    'waiter': {'section', 'table', 'order'},
+    'cashier': {'section', 'table', 'order'},
+}
+
+# Subscriptions a single connection may hold
+MAX_TOPICS = 50
+
+def group_name(kind, key):
+    """
+    Build a valid channel-layer group name, or None when `key` is empty.
+    Group names may only hold ASCII letters, digits, '-', '_' and '.'.
+    """
+    key = slugify(str(key)) if key is not None else ''
+    if not key:
+        return None
+    return f"{kind}.{key}"[:99]
+
+def role_group(role):
+    return group_name('role', role)
+
+def user_group(user_id):
+    return group_name('user', user_id)
+
+def station_group(category):
+    return group_name('station', category)
+
+def section_group(location):
+    return group_name('section', location)
+
+def table_group(table_id):
+    return group_name('table', table_id)
+
+def order_group(order_id):
+    return group_name('order', order_id)
+
+def default_groups(user):
+    """
+    Groups a connection joins on connect, based on the user's role
+    """
+    if user.role in ['admin', 'manager']:
+        return [FLOOR, ALL_ORDERS]
+    if user.role == 'waiter':
+        return [FLOOR, user_group(user.pk)]
+    return [FLOOR, role_group(user.role)]
+
+def can_subscribe(user, topic):
+    """
+    Whether `user` may join the group for `topic`
+    """
+    if topic in default_groups(user):
+        return True
+    if not isinstance(topic, str) or '.' not in topic:
+        return topic == ALL_ORDERS and user.role in ['admin', 'manager']
+
+    kind, key = topic.split('.', 1)
+    if group_name(kind, key) != topic:
+        return False
+    if user.role in ['admin', 'manager']:
+        return True
+    return kind in SUBSCRIBABLE_KINDS.get(user.role, set())
@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+class KitchenConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'kitchen'
+
+    def ready(self):
+        import kitchen.signals  # Keeps menu item availability up to date
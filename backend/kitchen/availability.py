@@ -0,0 +1,60 @@
+"""
+Materialized menu item availability.
+
+MenuItem.portions_available is how many portions current stock allows (the
+scarcest ingredient decides) and ingredient_availability whether at least
+one can be made. Both are stored on the menu item and recomputed only for
+the items whose recipe uses an ingredient that changed, so menu and order
+listings read them as plain columns.
+"""
+from collections import defaultdict
+from django.db.models import Q
+from menu import catalog
+from .models import MenuItem, MenuItemIngredient
+
+def portions(recipe):
+    """
+    Portions that `recipe`, a list of (stock, quantity per portion), allows;
+    None for an item without ingredients
+    """
+    counts = [max(0, int(stock // quantity)) for stock, quantity in recipe if quantity > 0]
+    return min(counts) if counts else None
+
+def refresh(menu_item_ids=(), ingredient_ids=()):
+    """
+    Recompute availability for `menu_item_ids` and for every menu item
+    using one of `ingredient_ids`: one query for the recipes, one UPDATE
+    of the items whose values changed
+    """
+    users = MenuItemIngredient.objects.filter(ingredient_id__in=list(ingredient_ids)).values('menu_item_id')
+    rows = MenuItemIngredient.objects.filter(
+        Q(menu_item_id__in=list(menu_item_ids)) | Q(menu_item_id__in=users)
+    ).values_list(
+        'menu_item_id', 'ingredient__quantity', 'quantity',
+        'menu_item__portions_available', 'menu_item__ingredient_availability'
+    )
+
+    recipes = defaultdict(list)
+    stored = {}
+    for menu_item_id, stock, quantity, portions_available, ingredient_availability in rows:
+        recipes[menu_item_id].append((stock, quantity))
+        stored[menu_item_id] = (portions_available, ingredient_availability)
+
+    items = []
+    for menu_item_id in set(menu_item_ids) | set(recipes):
+        count = portions(recipes[menu_item_id])
+        values = (count, count is None or count > 0)
+        if stored.get(menu_item_id) == values:
+            continue
+        items.append(MenuItem(pk=menu_item_id, portions_available=values[0], ingredient_availability=values[1]))
+
+    if items:
+        MenuItem.objects.bulk_update(items, ['portions_available', 'ingredient_availability'])
+
+    # The kitchen catalog shows stock and portions; the menu only whether
+    # an item can be made
+    if items or ingredient_ids:
+        catalog.invalidate(catalog.KITCHEN)
+    if any(stored.get(item.pk, (None, None))[1] != item.ingredient_availability for item in items):
+        catalog.invalidate(catalog.MENU)
+    return len(items)
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.3 on 2026-10-17 06:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("kitchen", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="inventorytransaction",
+            index=models.Index(
+                fields=["timestamp", "id"], name="inventory_t_timesta_451494_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="inventorytransaction",
+            index=models.Index(
+                fields=["ingredient", "timestamp"],
+                name="inventory_t_ingredi_874bee_idx",
+            ),
+        ),
+    ]
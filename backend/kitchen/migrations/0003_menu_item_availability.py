@@ -0,0 +1,47 @@
+# Generated by Django 4.2.3 on 2026-10-17 07:22
+
+from collections import defaultdict
+from django.db import migrations, models
+
+
+def compute_availability(apps, schema_editor):
+    MenuItem = apps.get_model("kitchen", "MenuItem")
+    MenuItemIngredient = apps.get_model("kitchen", "MenuItemIngredient")
+
+    recipes = defaultdict(list)
+    for menu_item_id, stock, quantity in MenuItemIngredient.objects.values_list(
+        "menu_item_id", "ingredient__quantity", "quantity"
+    ):
+        if quantity > 0:
+            recipes[menu_item_id].append(max(0, int(stock // quantity)))
+
+    items = [
+        MenuItem(pk=menu_item_id, portions_available=min(counts), ingredient_availability=min(counts) > 0)
+        for menu_item_id, counts in recipes.items()
+    ]
+    MenuItem.objects.bulk_update(items, ["portions_available", "ingredient_availability"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("kitchen", "0002_inventory_transaction_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="menuitem",
+            name="ingredient_availability",
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name="menuitem",
+            name="portions_available",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="Portions current stock allows; empty when the item has no ingredients",
+                null=True,
+            ),
+        ),
+        migrations.RunPython(compute_availability, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,118 @@
+# Generated by Django 4.2.3 on 2026-10-17 09:05
+
+from django.db import migrations
+
+# The search index as this migration creates it; kitchen.search keeps the
+# current definition, which the post_migrate signal applies on top
+
+POSTGRES_DOCUMENT = (
+    "setweight(to_tsvector('simple'::regconfig, name), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, category), 'B') || "
+    "setweight(to_tsvector('simple'::regconfig, description), 'C')"
+)
+
+SQLITE_INSTALL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS kitchen_menu_item_search USING fts5(
+        name, category, description,
+        content='kitchen_menu_items', content_rowid='id', prefix='2 3'
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS kitchen_menu_item_trigrams USING fts5(
+        name, content='kitchen_menu_items', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS kitchen_menu_item_search_insert
+    AFTER INSERT ON kitchen_menu_items BEGIN
+        INSERT INTO kitchen_menu_item_search(rowid, name, category, description)
+        VALUES (new.id, new.name, new.category, new.description);
+        INSERT INTO kitchen_menu_item_trigrams(rowid, name) VALUES (new.id, new.name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS kitchen_menu_item_search_delete
+    AFTER DELETE ON kitchen_menu_items BEGIN
+        INSERT INTO kitchen_menu_item_search(kitchen_menu_item_search, rowid, name, category, description)
+        VALUES ('delete', old.id, old.name, old.category, old.description);
+        INSERT INTO kitchen_menu_item_trigrams(kitchen_menu_item_trigrams, rowid, name)
+        VALUES ('delete', old.id, old.name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS kitchen_menu_item_search_update
+    AFTER UPDATE OF name, category, description ON kitchen_menu_items BEGIN
+        INSERT INTO kitchen_menu_item_search(kitchen_menu_item_search, rowid, name, category, description)
+        VALUES ('delete', old.id, old.name, old.category, old.description);
+        INSERT INTO kitchen_menu_item_trigrams(kitchen_menu_item_trigrams, rowid, name)
+        VALUES ('delete', old.id, old.name);
+        INSERT INTO kitchen_menu_item_search(rowid, name, category, description)
+        VALUES (new.id, new.name, new.category, new.description);
+        INSERT INTO kitchen_menu_item_trigrams(rowid, name) VALUES (new.id, new.name);
+    END
+    """,
+    # Index rows written while the triggers were missing, e.g. when a
+    # migration rebuilt kitchen_menu_items
+    "INSERT INTO kitchen_menu_item_search(kitchen_menu_item_search) VALUES ('rebuild')",
+    "INSERT INTO kitchen_menu_item_trigrams(kitchen_menu_item_trigrams) VALUES ('rebuild')",
+]
+
+SQLITE_UNINSTALL = [
+    'DROP TRIGGER IF EXISTS kitchen_menu_item_search_insert',
+    'DROP TRIGGER IF EXISTS kitchen_menu_item_search_delete',
+    'DROP TRIGGER IF EXISTS kitchen_menu_item_search_update',
+    'DROP TABLE IF EXISTS kitchen_menu_item_search',
+    'DROP TABLE IF EXISTS kitchen_menu_item_trigrams',
+]
+
+POSTGRES_INSTALL = [
+    # Stored so ranking reads the vector instead of parsing every match again
+    f'ALTER TABLE kitchen_menu_items ADD COLUMN IF NOT EXISTS search_document tsvector '
+    f'GENERATED ALWAYS AS ({POSTGRES_DOCUMENT}) STORED',
+    'CREATE INDEX IF NOT EXISTS kitchen_menu_item_search_idx ON kitchen_menu_items USING gin (search_document)',
+]
+
+POSTGRES_TRIGRAM_INSTALL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS kitchen_menu_item_trigram_idx ON kitchen_menu_items USING gin (name gin_trgm_ops)',
+]
+
+POSTGRES_UNINSTALL = [
+    'DROP INDEX IF EXISTS kitchen_menu_item_trigram_idx',
+    'ALTER TABLE kitchen_menu_items DROP COLUMN IF EXISTS search_document',
+]
+
+
+def install_search(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            for statement in SQLITE_INSTALL:
+                cursor.execute(statement)
+        elif connection.vendor == "postgresql":
+            for statement in POSTGRES_INSTALL:
+                cursor.execute(statement)
+            cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+            if cursor.fetchone():
+                for statement in POSTGRES_TRIGRAM_INSTALL:
+                    cursor.execute(statement)
+
+
+def uninstall_search(apps, schema_editor):
+    connection = schema_editor.connection
+    statements = {"sqlite": SQLITE_UNINSTALL, "postgresql": POSTGRES_UNINSTALL}.get(connection.vendor, [])
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("kitchen", "0003_menu_item_availability"),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search, uninstall_search),
+    ]
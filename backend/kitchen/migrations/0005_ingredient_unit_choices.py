@@ -0,0 +1,41 @@
+# Generated by Django 4.2.3 on 2026-10-17 08:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("kitchen", "0004_menu_item_search"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="ingredient",
+            name="unit",
+            field=models.CharField(
+                choices=[
+                    ("kg", "Kilograms"),
+                    ("g", "Grams"),
+                    ("lb", "Pounds"),
+                    ("oz", "Ounces"),
+                    ("l", "Liters"),
+                    ("ml", "Milliliters"),
+                    ("cup", "Cups"),
+                    ("tbsp", "Tablespoons"),
+                    ("tsp", "Teaspoons"),
+                    ("fl_oz", "Fluid Ounces"),
+                    ("gal", "Gallons"),
+                    ("pcs", "Pieces"),
+                    ("bunch", "Bunch"),
+                    ("slice", "Slice"),
+                    ("pack", "Pack"),
+                    ("can", "Can"),
+                    ("bottle", "Bottle"),
+                    ("box", "Box"),
+                ],
+                default="pcs",
+                max_length=20,
+            ),
+        ),
+    ]
@@ -11,6 +11,13 @@ class MenuItem(models.Model):
     is_available = models.BooleanField(default=True)
     is_vegetarian = models.BooleanField(default=False)
     preparation_time = models.IntegerField(help_text='Preparation time in minutes')
+
+    # Maintained by kitchen.availability whenever stock or the recipe changes
+    ingredient_availability = models.BooleanField(default=True)
+    portions_available = models.PositiveIntegerField(
+        null=True, blank=True,
+        help_text='Portions current stock allows; empty when the item has no ingredients'
+    )
     
     class Meta:
         db_table = 'kitchen_menu_items'
@@ -134,6 +141,10 @@ class InventoryTransaction(models.Model):
     class Meta:
         db_table = 'inventory_transactions'
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['timestamp', 'id']),
+            models.Index(fields=['ingredient', 'timestamp']),
+        ]
     
     def __str__(self):
         return f"{self.ingredient.name} - {self.transaction_type}"
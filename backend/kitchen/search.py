@@ -0,0 +1,271 @@
+"""
+Full-text search over menu items.
+
+Queries are split into words and matched as prefixes of indexed words, so
+results narrow as the user types, ranked name first, then category, then
+description. When nothing matches, a trigram index on the name finds items
+the query misspells.
+
+The index lives in the database and is kept current there, so every write
+path (save, bulk_create, update, raw SQL) stays in sync:
+
+  SQLite      FTS5 tables over kitchen_menu_items maintained by triggers,
+              plus an FTS5 trigram table for misspellings (SQLite 3.34+)
+  PostgreSQL  a generated tsvector column (search_document, not on the
+              model) with a GIN index, plus a pg_trgm GIN index on the name
+              when pg_trgm is available
+
+Other databases fall back to case-insensitive substring matching.
+"""
+import re
+from django.conf import settings
+from django.db import connections
+from django.db.models import IntegerField, Q
+from django.db.models.expressions import RawSQL
+
+# Words of a query that are searched
+MAX_TERMS = 8
+
+# Items fetched from the trigram index before scoring them
+TRIGRAM_CANDIDATES = 200
+
+# Share of the query's trigrams an item name must contain
+TRIGRAM_THRESHOLD = 0.5
+
+POSTGRES_DOCUMENT = (
+    "setweight(to_tsvector('simple'::regconfig, name), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, category), 'B') || "
+    "setweight(to_tsvector('simple'::regconfig, description), 'C')"
+)
+
+SQLITE_INSTALL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS kitchen_menu_item_search USING fts5(
+        name, category, description,
+        content='kitchen_menu_items', content_rowid='id', prefix='2 3'
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS kitchen_menu_item_trigrams USING fts5(
+        name, content='kitchen_menu_items', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS kitchen_menu_item_search_insert
+    AFTER INSERT ON kitchen_menu_items BEGIN
+        INSERT INTO kitchen_menu_item_search(rowid, name, category, description)
+        VALUES (new.id, new.name, new.category, new.description);
+        INSERT INTO kitchen_menu_item_trigrams(rowid, name) VALUES (new.id, new.name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS kitchen_menu_item_search_delete
+    AFTER DELETE ON kitchen_menu_items BEGIN
+        INSERT INTO kitchen_menu_item_search(kitchen_menu_item_search, rowid, name, category, description)
+        VALUES ('delete', old.id, old.name, old.category, old.description);
+        INSERT INTO kitchen_menu_item_trigrams(kitchen_menu_item_trigrams, rowid, name)
+        VALUES ('delete', old.id, old.name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS kitchen_menu_item_search_update
+    AFTER UPDATE OF name, category, description ON kitchen_menu_items BEGIN
+        INSERT INTO kitchen_menu_item_search(kitchen_menu_item_search, rowid, name, category, description)
+        VALUES ('delete', old.id, old.name, old.category, old.description);
+        INSERT INTO kitchen_menu_item_trigrams(kitchen_menu_item_trigrams, rowid, name)
+        VALUES ('delete', old.id, old.name);
+        INSERT INTO kitchen_menu_item_search(rowid, name, category, description)
+        VALUES (new.id, new.name, new.category, new.description);
+        INSERT INTO kitchen_menu_item_trigrams(rowid, name) VALUES (new.id, new.name);
+    END
+    """,
+    # Index rows written while the triggers were missing, e.g. when a
+    # migration rebuilt kitchen_menu_items
+    "INSERT INTO kitchen_menu_item_search(kitchen_menu_item_search) VALUES ('rebuild')",
+    "INSERT INTO kitchen_menu_item_trigrams(kitchen_menu_item_trigrams) VALUES ('rebuild')",
+]
+
+SQLITE_UNINSTALL = [
+    'DROP TRIGGER IF EXISTS kitchen_menu_item_search_insert',
+    'DROP TRIGGER IF EXISTS kitchen_menu_item_search_delete',
+    'DROP TRIGGER IF EXISTS kitchen_menu_item_search_update',
+    'DROP TABLE IF EXISTS kitchen_menu_item_search',
+    'DROP TABLE IF EXISTS kitchen_menu_item_trigrams',
+]
+
+POSTGRES_INSTALL = [
+    # Stored so ranking reads the vector instead of parsing every match again
+    f'ALTER TABLE kitchen_menu_items ADD COLUMN IF NOT EXISTS search_document tsvector '
+    f'GENERATED ALWAYS AS ({POSTGRES_DOCUMENT}) STORED',
+    'CREATE INDEX IF NOT EXISTS kitchen_menu_item_search_idx ON kitchen_menu_items USING gin (search_document)',
+]
+
+POSTGRES_TRIGRAM_INSTALL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS kitchen_menu_item_trigram_idx ON kitchen_menu_items USING gin (name gin_trgm_ops)',
+]
+
+POSTGRES_UNINSTALL = [
+    'DROP INDEX IF EXISTS kitchen_menu_item_trigram_idx',
+    'ALTER TABLE kitchen_menu_items DROP COLUMN IF EXISTS search_document',
+]
+
+# Whether pg_trgm is installed, by connection alias
+trigram_support = {}
+
+def install(connection):
+    """
+    Create the search index on `connection`, or repair it; safe to repeat
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            for statement in SQLITE_INSTALL:
+                cursor.execute(statement)
+        elif connection.vendor == 'postgresql':
+            for statement in POSTGRES_INSTALL:
+                cursor.execute(statement)
+            cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+            if cursor.fetchone():
+                for statement in POSTGRES_TRIGRAM_INSTALL:
+                    cursor.execute(statement)
+    trigram_support.pop(connection.alias, None)
+
+def uninstall(connection):
+    statements = {'sqlite': SQLITE_UNINSTALL, 'postgresql': POSTGRES_UNINSTALL}.get(connection.vendor, [])
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+def terms(query):
+    """
+    Lower-cased words of `query`; punctuation and search syntax are dropped
+    """
+    return re.findall(r'[^\W_]+', query.lower())[:MAX_TERMS]
+
+def trigrams(text):
+    """
+    Trigrams of each word in `text`, as FTS5's trigram tokenizer splits them
+    """
+    return {
+        word[index:index + 3]
+        for word in terms(text)
+        for index in range(len(word) - 2)
+    }
+
+def within(column, candidates):
+    """
+    SQL and params restricting `column` to the ids `candidates` selects
+    """
+    if candidates is None:
+        return '', []
+    sql, params = candidates
+    return f' AND {column} IN ({sql})', list(params)
+
+def sqlite_ranked(cursor, words, limit, candidates=None):
+    match = ' '.join(f'"{word}"*' for word in words)
+    restriction, params = within('rowid', candidates)
+    cursor.execute(
+        'SELECT rowid FROM kitchen_menu_item_search WHERE kitchen_menu_item_search MATCH %s'
+        f'{restriction} ORDER BY bm25(kitchen_menu_item_search, 10.0, 5.0, 1.0), rowid LIMIT %s',
+        [match, *params, limit]
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+def sqlite_similar(cursor, query, limit, candidates=None):
+    wanted = trigrams(query)
+    if not wanted:
+        return []
+    restriction, params = within('rowid', candidates)
+    cursor.execute(
+        'SELECT rowid, name FROM kitchen_menu_item_trigrams WHERE kitchen_menu_item_trigrams MATCH %s'
+        f'{restriction} ORDER BY rank LIMIT %s',
+        [' OR '.join(f'"{trigram}"' for trigram in sorted(wanted)), *params, TRIGRAM_CANDIDATES]
+    )
+    scored = []
+    for pk, name in cursor.fetchall():
+        similarity = len(wanted & trigrams(name)) / len(wanted)
+        if similarity >= TRIGRAM_THRESHOLD:
+            scored.append((-similarity, pk))
+    return [pk for _, pk in sorted(scored)[:limit]]
+
+def postgres_ranked(cursor, words, limit, candidates=None):
+    restriction, params = within('id', candidates)
+    cursor.execute(
+        "SELECT id FROM kitchen_menu_items, to_tsquery('simple'::regconfig, %s) query "
+        f'WHERE search_document @@ query{restriction} '
+        'ORDER BY ts_rank(search_document, query) DESC, id LIMIT %s',
+        [' & '.join(f'{word}:*' for word in words), *params, limit]
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+def postgres_similar(cursor, query, limit, candidates=None):
+    alias = cursor.db.alias
+    if alias not in trigram_support:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        trigram_support[alias] = cursor.fetchone() is not None
+    if not trigram_support[alias]:
+        return []
+    restriction, params = within('id', candidates)
+    cursor.execute(
+        f'SELECT id FROM kitchen_menu_items WHERE %s <%% name{restriction} '
+        'ORDER BY word_similarity(%s, name) DESC, id LIMIT %s',
+        [query, *params, query, limit]
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+BACKENDS = {
+    'sqlite': (sqlite_ranked, sqlite_similar),
+    'postgresql': (postgres_ranked, postgres_similar),
+}
+
+def ranked_ids(query, limit=None, using='default', queryset=None):
+    """
+    Ids of the best matches for `query`, best first, among the items of
+    `queryset` when given; misspelled queries are matched by trigram
+    similarity when no word matches
+    """
+    if queryset is not None:
+        using = queryset.db
+    connection = connections[using]
+    ranked, similar = BACKENDS[connection.vendor]
+    words = terms(query)
+    if not words:
+        return []
+    limit = limit or getattr(settings, 'MENU_SEARCH_LIMIT', 50)
+
+    # Filters apply inside the index query, before the limit
+    candidates = None
+    if queryset is not None and queryset.query.is_empty():
+        return []
+    if queryset is not None and queryset.query.where:
+        candidates = queryset.order_by().values('pk').query.sql_with_params()
+
+    with connection.cursor() as cursor:
+        return ranked(cursor, words, limit, candidates) or similar(cursor, query, limit, candidates)
+
+def search(queryset, query, limit=None):
+    """
+    Narrow a MenuItem queryset to the best matches for `query`, ordered by rank
+    """
+    if not terms(query):
+        return queryset
+    if connections[queryset.db].vendor not in BACKENDS:
+        return queryset.filter(
+            Q(name__icontains=query) |
+            Q(description__icontains=query) |
+            Q(category__icontains=query)
+        )
+
+    ids = ranked_ids(query, limit, queryset=queryset)
+    if not ids:
+        return queryset.none()
+    # One raw CASE is far cheaper to build than a When() per id
+    quote = connections[queryset.db].ops.quote_name
+    meta = queryset.model._meta
+    column = f'{quote(meta.db_table)}.{quote(meta.pk.column)}'
+    rank = RawSQL(
+        f"CASE {column} {' '.join('WHEN %s THEN %s' for _ in ids)} END",
+        [value for position, pk in enumerate(ids) for value in (pk, position)],
+        output_field=IntegerField()
+    )
+    return queryset.filter(pk__in=ids).order_by(rank)
@@ -96,25 +96,27 @@ class MenuItemIngredientSerializer(serializers.ModelSerializer):
         model = MenuItemIngredient
         fields = ('id', 'ingredient', 'ingredient_name', 'ingredient_details', 'quantity')
 
+class MenuItemSummarySerializer(serializers.ModelSerializer):
+    """
+    A menu item without its recipe, e.g. on order lines
+    """
+    class Meta:
+        model = MenuItem
+        fields = ('id', 'name', 'description', 'price', 'category',
+                  'image', 'is_available', 'preparation_time',
+                  'ingredient_availability', 'portions_available')
+        read_only_fields = ('ingredient_availability', 'portions_available')
+
 class MenuItemSerializer(serializers.ModelSerializer):
     ingredients = MenuItemIngredientSerializer(source='menuitemingredient_set', many=True, required=False)
-    ingredient_availability = serializers.SerializerMethodField()
     
     class Meta:
         model = MenuItem
         fields = ('id', 'name', 'description', 'price', 'category', 
                  'image', 'is_available', 'preparation_time', 
-                 'ingredients', 'ingredient_availability')
-
-    def get_ingredient_availability(self, obj):
-        """
-        Check if all ingredients for a menu item are available
-        """
-        for menu_item_ingredient in obj.menuitemingredient_set.all():
-            ingredient = menu_item_ingredient.ingredient
-            if ingredient.quantity < menu_item_ingredient.quantity:
-                return False
-        return True
+                 'ingredients', 'ingredient_availability', 'portions_available')
+        # Maintained by kitchen.availability
+        read_only_fields = ('ingredient_availability', 'portions_available')
 
     def create(self, validated_data):
         ingredients_data = self.context.get('request').data.getlist('ingredients', [])
@@ -0,0 +1,30 @@
+from django.db.models.signals import post_save, post_delete, post_migrate
+from django.db import connections
+from django.dispatch import receiver
+from .models import Ingredient, MenuItemIngredient
+from . import availability, search
+
+@receiver(post_save, sender=Ingredient)
+def refresh_ingredient_users(sender, instance, update_fields=None, **kwargs):
+    """
+    Recompute availability of the menu items using an ingredient whose stock changed
+    """
+    if update_fields is not None and 'quantity' not in update_fields:
+        return
+    availability.refresh(ingredient_ids=[instance.pk])
+
+@receiver(post_save, sender=MenuItemIngredient)
+@receiver(post_delete, sender=MenuItemIngredient)
+def refresh_recipe(sender, instance, **kwargs):
+    """
+    Recompute availability of a menu item whose recipe changed
+    """
+    availability.refresh(menu_item_ids=[instance.menu_item_id])
+
+@receiver(post_migrate)
+def repair_search_index(sender, app_config=None, using='default', **kwargs):
+    """
+    Restore the search triggers if a later migration rebuilt the menu items table
+    """
+    if app_config is not None and app_config.name == 'kitchen':
+        search.install(connections[using])
@@ -2,10 +2,13 @@ from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters import rest_framework as filters
-from django.db.models import Q, Sum, Avg, Min, Max, Count
+from django.db.models import Sum, Avg, Min, Max, Count, Prefetch
 from django.utils import timezone
+from core.pagination import TimestampCursorPagination
+from menu import catalog
 
 from .models import MenuItem, Ingredient, MenuItemIngredient, InventoryTransaction
+from . import search
 from .serializers import (
     MenuItemSerializer, 
     IngredientSerializer, 
@@ -59,6 +62,14 @@ class MenuItemViewSet(viewsets.ModelViewSet):
         context = super().get_serializer_context()
         context['request'] = self.request
         return context
+
+    def list(self, request, *args, **kwargs):
+        """
+        The unfiltered menu is served from the versioned catalog
+        """
+        if request.query_params:
+            return super().list(request, *args, **kwargs)
+        return catalog.respond(catalog.KITCHEN, request)
     
     @action(detail=True, methods=['post'])
     def toggle_availability(self, request, pk=None):
@@ -68,20 +79,19 @@ class MenuItemViewSet(viewsets.ModelViewSet):
         return Response({'status': 'success', 'is_available': menu_item.is_available})
 
     def get_queryset(self):
-        queryset = MenuItem.objects.all()
+        # The nested recipe in one query; availability is a stored column
+        queryset = MenuItem.objects.prefetch_related(
+            Prefetch('menuitemingredient_set', queryset=MenuItemIngredient.objects.select_related('ingredient'))
+        )
         search_query = self.request.query_params.get('search', None)
         category = self.request.query_params.get('category', None)
         
-        if search_query:
-            queryset = queryset.filter(
-                Q(name__icontains=search_query) | 
-                Q(description__icontains=search_query) | 
-                Q(category__icontains=search_query)
-            )
-        
         if category:
             queryset = queryset.filter(category=category)
         
+        if search_query:
+            queryset = search.search(queryset, search_query)
+        
         return queryset
 
     @action(detail=False, methods=['POST'])
@@ -100,6 +110,7 @@ class MenuItemViewSet(viewsets.ModelViewSet):
             )
         
         updated_count = MenuItem.objects.filter(id__in=menu_item_ids).update(is_available=is_available)
+        catalog.invalidate()
         
         return Response({
             'updated_count': updated_count,
@@ -214,10 +225,14 @@ class IngredientViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(ingredient)
         return Response(serializer.data)
 
+class InventoryTransactionPagination(TimestampCursorPagination):
+    ordering = ('-timestamp', '-id')
+
 class InventoryTransactionViewSet(viewsets.ModelViewSet):
-    queryset = InventoryTransaction.objects.all()
+    queryset = InventoryTransaction.objects.all().select_related('ingredient')
     serializer_class = InventoryTransactionSerializer
     permission_classes = [IsAdminOrReadOnly]
+    pagination_class = InventoryTransactionPagination
     
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -0,0 +1,135 @@
+"""
+Versioned snapshots of the menu catalog.
+
+Each catalog (the waiter-facing menu and the kitchen's menu with recipes)
+is serialized once per version and served from an in-process LRU, backed
+by the shared cache so workers share one serialization. The version is a
+random token in the shared cache, replaced after any transaction that
+changes what the catalog shows commits (see menu.signals), and doubles as
+the ETag: a client sending If-None-Match with the current version gets a
+304 for the price of one cache read.
+"""
+import logging
+import uuid
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+MENU = 'menu'
+KITCHEN = 'kitchen'
+
+# Snapshots kept per process
+LOCAL_SIZE = 32
+
+logger = logging.getLogger(__name__)
+
+def version_key(name):
+    return f'menu:catalog:{name}:version'
+
+def snapshot_key(name, version, base_url):
+    return f'menu:catalog:{name}:{version}:{base_url}'
+
+def build_menu(request):
+    from kitchen.models import MenuItem
+    from .serializers import MenuItemSerializer
+
+    queryset = MenuItem.objects.filter(is_available=True).select_related('menu_proxy')
+    return list(MenuItemSerializer(queryset, many=True, context={'request': request}).data)
+
+def build_kitchen(request):
+    from django.db.models import Prefetch
+    from kitchen.models import MenuItem, MenuItemIngredient
+    from kitchen.serializers import MenuItemSerializer
+
+    queryset = MenuItem.objects.prefetch_related(
+        Prefetch('menuitemingredient_set', queryset=MenuItemIngredient.objects.select_related('ingredient'))
+    )
+    return list(MenuItemSerializer(queryset, many=True, context={'request': request}).data)
+
+BUILDERS = {
+    MENU: build_menu,
+    KITCHEN: build_kitchen,
+}
+
+class SnapshotCache:
+    """
+    Least recently used snapshots by (catalog, version, base URL)
+    """
+    def __init__(self, size=LOCAL_SIZE):
+        self.size = size
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        content = self.entries.get(key)
+        if content is not None:
+            self.entries.move_to_end(key)
+        return content
+
+    def put(self, key, content):
+        self.entries[key] = content
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+local_snapshots = SnapshotCache()
+
+def current_version(name):
+    version = cache.get(version_key(name))
+    if version is None:
+        cache.add(version_key(name), uuid.uuid4().hex, timeout=None)
+        version = cache.get(version_key(name))
+    return version
+
+def invalidate(*names):
+    """
+    Start a new version of the named catalogs (default all) once the
+    current transaction commits, so no snapshot is built from data the
+    new version does not include. A cache outage is logged rather than
+    raised, so it never fails the write that changed the menu
+    """
+    def bump():
+        try:
+            cache.set_many({version_key(name): uuid.uuid4().hex for name in names or BUILDERS}, timeout=None)
+        except Exception as e:
+            logger.error(f"Could not start a new catalog version, clients may see a stale menu: {e}")
+    transaction.on_commit(bump)
+
+def snapshot(name, request):
+    """
+    (version, serialized items) of the current catalog
+    """
+    version = current_version(name)
+    # Image URLs are absolute, so snapshots differ per host
+    key = snapshot_key(name, version, request.build_absolute_uri('/'))
+
+    data = local_snapshots.get(key)
+    if data is None:
+        data = cache.get(key)
+        if data is None:
+            data = BUILDERS[name](request)
+            cache.set(key, data, getattr(settings, 'MENU_CATALOG_TTL', 60 * 60 * 24))
+        local_snapshots.put(key, data)
+    return version, data
+
+def respond(name, request):
+    """
+    The catalog as a response, or 304 when the client has the current version
+    """
+    version, data = snapshot(name, request)
+    etag = f'"{version}"'
+
+    known = parse_etags(request.headers.get('If-None-Match', ''))
+    if etag in known or '*' in known:
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(data)
+    response['ETag'] = etag
+    # Clients may keep the catalog but must revalidate it before use
+    response['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.3 on 2026-10-17 07:40
+
+from django.db import migrations, models
+
+
+def record_existing_items(apps, schema_editor):
+    MenuItem = apps.get_model("kitchen", "MenuItem")
+    MenuItemChange = apps.get_model("menu", "MenuItemChange")
+
+    MenuItemChange.objects.bulk_create(
+        [MenuItemChange(menu_item_id=pk) for pk in MenuItem.objects.values_list("pk", flat=True)],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("menu", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MenuItemChange",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("menu_item_id", models.BigIntegerField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "db_table": "menu_item_changes",
+            },
+        ),
+        migrations.AddField(
+            model_name="menuitemproxy",
+            name="image_hash",
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name="menuitemproxy",
+            name="image_name",
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.RunPython(record_existing_items, migrations.RunPython.noop),
+    ]
@@ -16,6 +16,11 @@ class MenuItemProxy(models.Model):
     # Additional fields specific to menu management
     display_priority = models.IntegerField(default=0)
     is_featured = models.BooleanField(default=False)
+
+    # The menu item image last seen by menu.sync and a hash of its content,
+    # so clients re-download an image only when its content changes
+    image_name = models.CharField(max_length=255, blank=True)
+    image_hash = models.CharField(max_length=64, blank=True)
     
     def __str__(self):
         return str(self.menu_item)
@@ -25,5 +30,22 @@ class MenuItemProxy(models.Model):
         verbose_name_plural = 'Menu Item Proxies'
         db_table = 'menu_item_proxies'
 
+class MenuItemChange(models.Model):
+    """
+    A menu item saved since menu.sync last ran.
+
+    Rows are written in the same transaction as the save and consumed in
+    batches by menu.sync, so the sync only visits items that changed and
+    never runs inside a request.
+    """
+    menu_item_id = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'menu_item_changes'
+
+    def __str__(self):
+        return f"Menu item {self.menu_item_id} changed"
+
 # Alias for backwards compatibility
 MenuItem = KitchenMenuItem
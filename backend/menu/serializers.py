@@ -8,6 +8,7 @@ class MenuItemSerializer(serializers.ModelSerializer):
     """
     display_priority = serializers.IntegerField(source='menu_proxy.display_priority', read_only=True)
     is_featured = serializers.BooleanField(source='menu_proxy.is_featured', read_only=True)
+    image_hash = serializers.CharField(source='menu_proxy.image_hash', read_only=True)
 
     class Meta:
         model = MenuItem
@@ -19,11 +20,13 @@ class MenuItemSerializer(serializers.ModelSerializer):
             'category', 
             'is_available', 
             'image', 
+            'image_hash',
             'preparation_time',
             'display_priority',
-            'is_featured'
+            'is_featured',
+            'ingredient_availability'
         ]
-        read_only_fields = ['id']
+        read_only_fields = ['id', 'ingredient_availability']
 
     def to_representation(self, instance):
         """
@@ -35,8 +38,10 @@ class MenuItemSerializer(serializers.ModelSerializer):
             menu_proxy = instance.menu_proxy
             representation['display_priority'] = menu_proxy.display_priority
             representation['is_featured'] = menu_proxy.is_featured
+            representation['image_hash'] = menu_proxy.image_hash
         except MenuItemProxy.DoesNotExist:
             representation['display_priority'] = 0
             representation['is_featured'] = False
+            representation['image_hash'] = ''
         
         return representation
@@ -1,18 +1,32 @@
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from django.core.management import call_command
-from .models import MenuItem
+from kitchen.models import Ingredient, MenuItemIngredient
+from .models import MenuItem, MenuItemProxy
+from . import catalog, sync
 
 @receiver(post_save, sender=MenuItem)
-def sync_menu_item_to_kitchen(sender, instance, created, **kwargs):
+def record_menu_item_change(sender, instance, **kwargs):
     """
-    Synchronize menu item to kitchen when created or updated
+    Queue the saved menu item for menu.sync
     """
-    call_command('sync_menu_items')
+    sync.record([instance.pk])
 
+@receiver(post_save, sender=MenuItem)
 @receiver(post_delete, sender=MenuItem)
-def sync_menu_item_deletion(sender, instance, **kwargs):
+@receiver(post_save, sender=MenuItemIngredient)
+@receiver(post_delete, sender=MenuItemIngredient)
+@receiver(post_save, sender=MenuItemProxy)
+@receiver(post_delete, sender=MenuItemProxy)
+def invalidate_catalogs(sender, **kwargs):
+    """
+    Start new catalog versions when a menu item, its recipe or its menu metadata changes
+    """
+    catalog.invalidate()
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_kitchen_catalog(sender, **kwargs):
     """
-    Synchronize menu item deletion to kitchen
+    The kitchen catalog shows ingredient stock
     """
-    call_command('sync_menu_items')
+    catalog.invalidate(catalog.KITCHEN)
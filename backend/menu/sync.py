@@ -0,0 +1,107 @@
+"""
+Incremental sync of the menu app's per-item state.
+
+Saving a menu item records a MenuItemChange in the same transaction (see
+menu.signals). `sync_pending` claims a batch of changes, visits each
+changed item once and
+  - creates its MenuItemProxy when it has none
+  - hashes its image when the image file changed, so re-uploading the same
+    picture leaves image_hash (and every client's cached copy) alone
+then deletes the claimed changes. It runs from `manage.py sync_menu_items`
+or the periodic Celery task, never inside a request.
+"""
+import hashlib
+import logging
+from django.conf import settings
+from django.db import transaction
+from kitchen.models import MenuItem
+from . import catalog
+from .models import MenuItemChange, MenuItemProxy
+
+logger = logging.getLogger(__name__)
+
+def record(menu_item_ids):
+    """
+    Queue menu items for the next sync, in the caller's transaction
+    """
+    MenuItemChange.objects.bulk_create([MenuItemChange(menu_item_id=pk) for pk in menu_item_ids])
+
+def record_all(batch_size=1000):
+    """
+    Queue every menu item, e.g. for items written with bulk_create
+    """
+    ids = MenuItem.objects.values_list('pk', flat=True).iterator(chunk_size=batch_size)
+    MenuItemChange.objects.bulk_create((MenuItemChange(menu_item_id=pk) for pk in ids), batch_size=batch_size)
+
+def image_hash(image):
+    """
+    SHA-256 of a stored image, read in chunks
+    """
+    digest = hashlib.sha256()
+    with image.open('rb') as file:
+        for chunk in file.chunks():
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def sync_pending(batch_size=None):
+    """
+    Sync one batch of changed menu items; returns how many changes were consumed
+    """
+    batch_size = batch_size or getattr(settings, 'MENU_SYNC_BATCH_SIZE', 500)
+
+    with transaction.atomic():
+        changes = list(
+            MenuItemChange.objects.select_for_update(skip_locked=True)
+            .order_by('id').values_list('id', 'menu_item_id')[:batch_size]
+        )
+        if not changes:
+            return 0
+
+        # Deleted items are gone along with their proxies
+        items = MenuItem.objects.filter(
+            pk__in={menu_item_id for _, menu_item_id in changes}
+        ).select_related('menu_proxy')
+
+        created, updated = [], []
+        images_changed = False
+        for item in items:
+            try:
+                proxy = item.menu_proxy
+            except MenuItemProxy.DoesNotExist:
+                proxy = MenuItemProxy(menu_item=item)
+                created.append(proxy)
+
+            name = item.image.name or ''
+            if name == proxy.image_name:
+                continue
+            try:
+                digest = image_hash(item.image) if name else ''
+            except OSError as e:
+                logger.warning(f"Could not read the image of menu item {item.pk}: {e}")
+                continue
+
+            images_changed = images_changed or digest != proxy.image_hash
+            proxy.image_name = name
+            proxy.image_hash = digest
+            if proxy not in created:
+                updated.append(proxy)
+
+        MenuItemProxy.objects.bulk_create(created, ignore_conflicts=True)
+        MenuItemProxy.objects.bulk_update(updated, ['image_name', 'image_hash'])
+        MenuItemChange.objects.filter(id__in=[change_id for change_id, _ in changes]).delete()
+
+        if images_changed:
+            catalog.invalidate(catalog.MENU)
+
+    return len(changes)
+
+def sync_all_pending(batch_size=None):
+    """
+    Sync batches until no changes are left; returns how many were consumed
+    """
+    synced = 0
+    while True:
+        consumed = sync_pending(batch_size)
+        synced += consumed
+        if not consumed:
+            return synced
@@ -1,10 +1,10 @@
 from celery import shared_task
-from django.core.management import call_command
+from . import sync
 
 @shared_task
 def sync_menu_items_task():
     """
-    Celery task to synchronize menu items between menu and kitchen apps
+    Celery task to sync the menu items changed since the last run
     """
-    call_command('sync_menu_items')
-    return "Menu items synchronized successfully"
+    synced = sync.sync_all_pending()
+    return f"Synced {synced} menu item changes"
@@ -1,6 +1,8 @@
 from rest_framework import viewsets, permissions
+from kitchen import search
 from kitchen.models import MenuItem
 from .serializers import MenuItemSerializer
+from . import catalog
 
 class MenuItemViewSet(viewsets.ReadOnlyModelViewSet):
     """
@@ -21,4 +23,17 @@ class MenuItemViewSet(viewsets.ReadOnlyModelViewSet):
         if category:
             queryset = queryset.filter(category=category)
         
+        # Ranked matches from the menu search index
+        search_query = self.request.query_params.get('search', None)
+        if search_query:
+            queryset = search.search(queryset, search_query)
+        
         return queryset
+
+    def list(self, request, *args, **kwargs):
+        """
+        The unfiltered menu is served from the versioned catalog
+        """
+        if request.query_params:
+            return super().list(request, *args, **kwargs)
+        return catalog.respond(catalog.MENU, request)
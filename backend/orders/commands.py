@@ -0,0 +1,76 @@
+"""
+Order changes shared by the REST views and the WebSocket consumer.
+
+Each command applies its change and records the resulting event in the
+outbox in one transaction, so a change made over either transport is
+validated the same way and broadcast exactly once.
+"""
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from .models import Order, OrderItem
+from .state_machine import apply_transition, changed_fields
+from .events import notify_order_change
+from . import kitchen_queue
+
+def load_order_items(orders):
+    """
+    Load the table and line items (with menu items) of freshly saved orders
+    """
+    prefetch_related_objects(
+        orders,
+        'table',
+        Prefetch('items', queryset=OrderItem.objects.select_related('menu_item'))
+    )
+
+def visible_to(queryset, user):
+    """
+    Narrow an Order queryset to the orders `user` may see: waiters their own
+    orders, chefs everything not yet served or cancelled
+    """
+    if user.role == 'waiter':
+        return queryset.filter(waiter=user)
+    elif user.role == 'chef':
+        return queryset.exclude(status__in=['served', 'cancelled'])
+
+    return queryset
+
+def get_order(order_id, user=None):
+    """
+    An order with what its events need (table, items and menu items) loaded,
+    among those visible to `user` when given
+    """
+    queryset = Order.objects.select_related('table').prefetch_related(
+        Prefetch('items', queryset=OrderItem.objects.select_related('menu_item'))
+    )
+    if user is not None:
+        queryset = visible_to(queryset, user)
+    return queryset.get(pk=order_id)
+
+def create_order(serializer, user):
+    """
+    Save a validated OrderSerializer, served by `user` unless it names a waiter
+    """
+    with transaction.atomic():
+        if not serializer.validated_data.get('waiter'):
+            serializer.save(waiter=user)
+        else:
+            serializer.save()
+
+        load_order_items([serializer.instance])
+        kitchen_queue.sync_tickets([serializer.instance])
+
+        notify_order_change("order.create", serializer.instance)
+    return serializer.instance
+
+def change_order_status(order, new_status, user, expected_status=None, notify=True):
+    """
+    Move `order` to `new_status` (see state_machine.apply_transition) and
+    broadcast only the fields the transition wrote, unless the caller sends
+    its own event (`notify=False`). Raises TransitionError or
+    TransitionConflict.
+    """
+    with transaction.atomic():
+        apply_transition(order, new_status, user=user, expected_status=expected_status)
+        if notify:
+            notify_order_change("order.update", order, fields=changed_fields(new_status))
+    return order
@@ -0,0 +1,111 @@
+"""
+Order events for the WebSocket topic groups (see core.topics).
+
+Events are written to the transactional outbox (orders.outbox) rather than
+sent inline, so call these inside the transaction that makes the change.
+Each event goes only to the groups of the orders it describes. Updates
+that know which fields they changed send only those fields (plus the id);
+clients merge them into the order they already hold.
+"""
+from collections import defaultdict
+from django.db.models import Prefetch, Q
+from core import topics
+from .models import Order, OrderItem
+from .serializers import CompactOrderSerializer
+from . import kitchen_queue, outbox
+
+ORDERS_GROUP = topics.ALL_ORDERS
+
+def order_groups(order):
+    """
+    Groups interested in `order`; expects its table and items' menu items loaded
+    """
+    groups = [
+        ORDERS_GROUP,
+        topics.role_group('chef'),
+        topics.order_group(order.pk),
+        topics.user_group(order.waiter_id),
+    ]
+
+    # Served orders are waiting to be billed
+    if order.status == 'served':
+        groups.append(topics.role_group('cashier'))
+
+    if order.table_id:
+        groups.append(topics.table_group(order.table_id))
+        if order.table.location:
+            groups.append(topics.section_group(order.table.location))
+
+    groups.extend(
+        topics.station_group(item.menu_item.category)
+        for item in order.items.all()
+        if item.menu_item_id
+    )
+
+    # Drop empty keys (no waiter, blank category) and repeats, keeping order
+    return list(dict.fromkeys(group for group in groups if group))
+
+def publish(message, groups=(ORDERS_GROUP,)):
+    outbox.enqueue(groups, message)
+
+def publish_per_group(event_type, orders, key, serialize):
+    """
+    Publish one `event_type` message per group, listing only that group's
+    orders under `key`
+    """
+    grouped = defaultdict(list)
+    for order in orders:
+        data = serialize(order)
+        for group in order_groups(order):
+            grouped[group].append(data)
+
+    outbox.enqueue_many(
+        ([group], {"type": event_type, key: entries})
+        for group, entries in grouped.items()
+    )
+
+def order_data(order, fields=None):
+    """
+    The compact shape of `order`, or only its id and `fields` for a delta
+    """
+    if fields is None:
+        return CompactOrderSerializer(order).data
+    return CompactOrderSerializer(order, fields=['id', *fields]).data
+
+def notify_order_change(event_type, order, fields=None):
+    """
+    Broadcast an order event using the compact shape, limited to `fields`
+    when given
+    """
+    publish({
+        "type": event_type,
+        "order": order_data(order, fields)
+    }, order_groups(order))
+
+def notify_orders_changed(event_type, orders, fields=None):
+    """
+    Broadcast one event per group listing its orders in the compact shape,
+    limited to `fields` when given
+    """
+    publish_per_group(
+        event_type, orders, "orders",
+        lambda order: order_data(order, fields)
+    )
+
+def snapshot(groups):
+    """
+    Open orders visible to any of `groups`, in the compact shape: the
+    active kitchen tickets plus served orders that are not paid yet
+    """
+    groups = set(groups)
+    orders = Order.objects.filter(
+        Q(status__in=kitchen_queue.ACTIVE_STATUSES) | Q(status='served', is_paid=False)
+    ).select_related('table').prefetch_related(
+        Prefetch('items', queryset=OrderItem.objects.select_related('menu_item'))
+    ).order_by('created_at', 'id')
+
+    return [
+        CompactOrderSerializer(order).data
+        for order in orders
+        if groups.intersection(order_groups(order))
+    ]
@@ -0,0 +1,66 @@
+"""
+Ingredient stock consumed by orders.
+
+When orders start preparing, their line items are exploded through the
+menu items' recipes (menu_item_ingredients) into one total per ingredient
+by a single aggregate query. Stock is then decremented with one UPDATE of
+F() expressions, so concurrent orders never overwrite each other's
+decrements, and one usage InventoryTransaction per ingredient is written
+with bulk_create. Availability of the menu items using those ingredients
+is then refreshed (kitchen.availability). The query count does not depend
+on how many orders or ingredients are involved.
+"""
+from django.db import models
+from django.db.models import F, Sum
+from kitchen.models import Ingredient, MenuItemIngredient, InventoryTransaction
+from kitchen import availability
+
+QUANTITY_FIELD = models.DecimalField(max_digits=10, decimal_places=2)
+
+def ingredient_totals(order_ids):
+    """
+    {ingredient_id: quantity} needed for the line items of `order_ids`
+    """
+    usage = MenuItemIngredient.objects.filter(
+        menu_item__orderitem__order_id__in=order_ids
+    ).values('ingredient_id').annotate(
+        total=Sum(F('quantity') * F('menu_item__orderitem__quantity'), output_field=QUANTITY_FIELD)
+    )
+    return {row['ingredient_id']: row['total'] for row in usage if row['total']}
+
+def consume(order_ids, now):
+    """
+    Take the ingredients for `order_ids` out of stock and log the usage.
+    Stock may go below zero: the food is being made either way, and the
+    negative quantity shows what has to be reconciled. Must run inside the
+    transaction that moves the orders to 'preparing'.
+    """
+    order_ids = sorted(order_ids)
+    totals = ingredient_totals(order_ids)
+    if not totals:
+        return {}
+
+    Ingredient.objects.filter(pk__in=totals).update(
+        quantity=F('quantity') - models.Case(
+            *[models.When(pk=pk, then=models.Value(total)) for pk, total in totals.items()],
+            output_field=QUANTITY_FIELD
+        ),
+        last_used_at=now
+    )
+
+    if len(order_ids) == 1:
+        notes = f"Order #{order_ids[0]}"
+    else:
+        notes = 'Orders ' + ', '.join(f"#{order_id}" for order_id in order_ids)
+
+    InventoryTransaction.objects.bulk_create([
+        InventoryTransaction(
+            ingredient_id=ingredient_id,
+            quantity=-total,
+            transaction_type='usage',
+            notes=notes
+        )
+        for ingredient_id, total in totals.items()
+    ])
+    availability.refresh(ingredient_ids=totals)
+    return totals
@@ -0,0 +1,183 @@
+"""
+Maintenance of the KitchenTicket read model and the kitchen summary.
+
+Tickets are written alongside every order change (creation, edits and
+status transitions) with set-based statements, and deleted once an order
+is served or cancelled, so the table only ever holds active tickets.
+The same changes invalidate the cached kitchen summary once they commit.
+"""
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Count, Prefetch, Q
+from django.utils import timezone
+from .models import Order, OrderItem, KitchenTicket
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ['pending', 'preparing', 'ready']
+
+PRIORITY_RANK = {
+    'low': 0,
+    'normal': 1,
+    'high': 2,
+    'urgent': 3,
+}
+
+SUMMARY_CACHE_KEY = 'orders:kitchen_summary'
+
+# Order fields copied onto the ticket when they change
+TICKET_FIELDS = ['status', 'priority', 'started_preparing_at', 'estimated_preparation_time']
+
+def build_ticket(order):
+    """
+    Build an unsaved ticket from an order whose items (and their menu
+    items) are loaded or prefetched
+    """
+    return KitchenTicket(
+        order_id=order.pk,
+        status=order.status,
+        priority=order.priority,
+        priority_rank=PRIORITY_RANK.get(order.priority, 0),
+        table_number=order.table.table_number if order.table_id else None,
+        special_instructions=order.special_instructions,
+        items=[
+            {
+                'menu_item': item.menu_item_id,
+                'name': item.menu_item.name if item.menu_item_id else None,
+                'quantity': item.quantity,
+                'notes': item.notes,
+            }
+            for item in order.items.all()
+        ],
+        created_at=order.created_at,
+        started_preparing_at=order.started_preparing_at,
+        estimated_preparation_time=order.estimated_preparation_time,
+    )
+
+def sync_tickets(orders):
+    """
+    Upsert tickets for the active orders in `orders` and drop the rest
+    """
+    active = [order for order in orders if order.status in ACTIVE_STATUSES]
+    inactive = [order.pk for order in orders if order.status not in ACTIVE_STATUSES]
+
+    if active:
+        KitchenTicket.objects.bulk_create(
+            [build_ticket(order) for order in active],
+            update_conflicts=True,
+            unique_fields=['order'],
+            update_fields=[
+                'status', 'priority', 'priority_rank', 'table_number',
+                'special_instructions', 'items', 'started_preparing_at',
+                'estimated_preparation_time', 'updated_at',
+            ],
+        )
+
+    if inactive:
+        KitchenTicket.objects.filter(order_id__in=inactive).delete()
+
+    invalidate_summary()
+
+def apply_status_change(order_ids, from_status, changes):
+    """
+    Mirror a status transition of `order_ids` onto their tickets
+    """
+    tickets = KitchenTicket.objects.filter(order_id__in=order_ids, status=from_status)
+
+    invalidate_summary()
+
+    if changes['status'] not in ACTIVE_STATUSES:
+        tickets.delete()
+        return
+
+    ticket_changes = {field: value for field, value in changes.items() if field in TICKET_FIELDS}
+    if 'priority' in ticket_changes:
+        ticket_changes['priority_rank'] = PRIORITY_RANK.get(ticket_changes['priority'], 0)
+    if 'updated_at' in changes:
+        ticket_changes['updated_at'] = changes['updated_at']
+    tickets.update(**ticket_changes)
+
+def apply_priority_change(order_ids, priority):
+    """
+    Mirror a priority change of `order_ids` onto their tickets
+    """
+    KitchenTicket.objects.filter(order_id__in=order_ids).update(
+        priority=priority,
+        priority_rank=PRIORITY_RANK.get(priority, 0),
+        updated_at=timezone.now()
+    )
+    invalidate_summary()
+
+def compute_summary():
+    """
+    Kitchen summary statistics in a single conditional-aggregation query.
+
+    Only active orders and orders served within the rolling
+    KITCHEN_SUMMARY_WINDOW (default 3 hours) are scanned, so the average
+    preparation time reflects the current service rather than all history.
+    """
+    window = getattr(settings, 'KITCHEN_SUMMARY_WINDOW', timedelta(hours=3))
+    active = Q(status__in=['pending', 'preparing'])
+    recently_served = Q(
+        status='served',
+        completed_at__gte=timezone.now() - window,
+        actual_preparation_time__isnull=False
+    )
+
+    aggregates = {
+        'total_pending': Count('id', filter=Q(status='pending')),
+        'total_preparing': Count('id', filter=Q(status='preparing')),
+        'avg_preparation_time': Avg('actual_preparation_time', filter=recently_served),
+    }
+    for priority, _ in Order.PRIORITY_CHOICES:
+        aggregates[f'priority_{priority}'] = Count('id', filter=active & Q(priority=priority))
+
+    result = Order.objects.filter(active | recently_served).aggregate(**aggregates)
+
+    return {
+        'total_pending': result['total_pending'],
+        'total_preparing': result['total_preparing'],
+        'avg_preparation_time': result['avg_preparation_time'] or 0,
+        'orders_by_priority': [
+            {'priority': priority, 'count': result[f'priority_{priority}']}
+            for priority, _ in Order.PRIORITY_CHOICES
+            if result[f'priority_{priority}']
+        ],
+    }
+
+def kitchen_summary():
+    """
+    Cached kitchen summary; recomputed at most once per
+    KITCHEN_SUMMARY_CACHE_TTL seconds (default 5) or after an order change
+    """
+    ttl = getattr(settings, 'KITCHEN_SUMMARY_CACHE_TTL', 5)
+    return cache.get_or_set(SUMMARY_CACHE_KEY, compute_summary, ttl)
+
+def drop_summary():
+    try:
+        cache.delete(SUMMARY_CACHE_KEY)
+    except Exception as e:
+        # The summary expires within its TTL anyway
+        logger.warning(f"Could not invalidate the kitchen summary: {e}")
+
+def invalidate_summary():
+    """
+    Drop the cached summary after the current transaction commits; a cache
+    outage never fails the order write
+    """
+    transaction.on_commit(drop_summary)
+
+def rebuild():
+    """
+    Rebuild every ticket from the orders table
+    """
+    KitchenTicket.objects.all().delete()
+
+    orders = Order.objects.filter(status__in=ACTIVE_STATUSES).select_related('table').prefetch_related(
+        Prefetch('items', queryset=OrderItem.objects.select_related('menu_item'))
+    )
+    sync_tickets(list(orders))
+    return len(orders)
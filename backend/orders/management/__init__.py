@@ -0,0 +1 @@
+# Orders management commands package
@@ -0,0 +1,44 @@
+import time
+from django.core.management.base import BaseCommand
+from orders import outbox
+
+# Seconds between pruning published events
+PRUNE_INTERVAL = 60
+
+class Command(BaseCommand):
+    help = 'Publish pending outbox events to the channel layer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0.2,
+                            help='Seconds to sleep when there is nothing to publish')
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Events claimed per batch (default OUTBOX_BATCH_SIZE)')
+        parser.add_argument('--once', action='store_true',
+                            help='Publish what is pending and exit')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        if options['once']:
+            published = 0
+            while True:
+                sent = outbox.dispatch_pending(batch_size)
+                published += sent
+                if not sent:
+                    break
+            self.stdout.write(self.style.SUCCESS(f'Published {published} events'))
+            return
+
+        self.stdout.write('Dispatching outbox events, press Ctrl+C to stop')
+        last_prune = time.monotonic()
+        try:
+            while True:
+                # Keep draining while full batches come back
+                if not outbox.dispatch_pending(batch_size):
+                    time.sleep(options['interval'])
+
+                if time.monotonic() - last_prune >= PRUNE_INTERVAL:
+                    outbox.prune_published()
+                    last_prune = time.monotonic()
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped')
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from orders import kitchen_queue
+
+class Command(BaseCommand):
+    help = 'Rebuild the kitchen ticket read model from the orders table'
+
+    def handle(self, *args, **kwargs):
+        with transaction.atomic():
+            count = kitchen_queue.rebuild()
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} kitchen tickets'))
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.3 on 2026-10-17 06:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0002_alter_orderitem_price"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["created_at", "id"], name="orders_created_f67d2c_idx"
+            ),
+        ),
+    ]
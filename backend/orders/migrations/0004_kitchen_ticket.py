@@ -0,0 +1,114 @@
+# Generated by Django 4.2.3 on 2026-10-17 06:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+ACTIVE_STATUSES = ["pending", "preparing", "ready"]
+PRIORITY_RANK = {"low": 0, "normal": 1, "high": 2, "urgent": 3}
+
+
+def create_tickets(apps, schema_editor):
+    Order = apps.get_model("orders", "Order")
+    KitchenTicket = apps.get_model("orders", "KitchenTicket")
+
+    orders = Order.objects.filter(status__in=ACTIVE_STATUSES).select_related("table").prefetch_related(
+        "items__menu_item"
+    )
+    KitchenTicket.objects.bulk_create(
+        [
+            KitchenTicket(
+                order_id=order.pk,
+                status=order.status,
+                priority=order.priority,
+                priority_rank=PRIORITY_RANK.get(order.priority, 0),
+                table_number=order.table.table_number if order.table_id else None,
+                special_instructions=order.special_instructions,
+                items=[
+                    {
+                        "menu_item": item.menu_item_id,
+                        "name": item.menu_item.name if item.menu_item_id else None,
+                        "quantity": item.quantity,
+                        "notes": item.notes,
+                    }
+                    for item in order.items.all()
+                ],
+                created_at=order.created_at,
+                started_preparing_at=order.started_preparing_at,
+                estimated_preparation_time=order.estimated_preparation_time,
+            )
+            for order in orders.iterator(chunk_size=500)
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0003_order_created_at_id_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="KitchenTicket",
+            fields=[
+                (
+                    "order",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="kitchen_ticket",
+                        serialize=False,
+                        to="orders.order",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("preparing", "Preparing"),
+                            ("ready", "Ready"),
+                            ("served", "Served"),
+                            ("cancelled", "Cancelled"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "priority",
+                    models.CharField(
+                        choices=[
+                            ("low", "Low"),
+                            ("normal", "Normal"),
+                            ("high", "High"),
+                            ("urgent", "Urgent"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("priority_rank", models.SmallIntegerField(default=0)),
+                ("table_number", models.IntegerField(blank=True, null=True)),
+                ("special_instructions", models.TextField(blank=True)),
+                ("items", models.JSONField(default=list)),
+                ("created_at", models.DateTimeField()),
+                ("started_preparing_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "estimated_preparation_time",
+                    models.IntegerField(blank=True, null=True),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "db_table": "kitchen_tickets",
+                "indexes": [
+                    models.Index(
+                        fields=["status", "-priority_rank", "created_at"],
+                        name="kitchen_tic_status_7eee0d_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(create_tickets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.3 on 2026-10-17 06:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0004_kitchen_ticket"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PreparationTimeStat",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("menu_item", "Menu Item"),
+                            ("hour", "Hour of Day"),
+                            ("all", "All Orders"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("key", models.IntegerField(default=0)),
+                ("count", models.IntegerField(default=0)),
+                ("mean", models.FloatField(default=0)),
+                ("p50", models.IntegerField(blank=True, null=True)),
+                ("p90", models.IntegerField(blank=True, null=True)),
+                ("histogram", models.JSONField(default=dict)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "db_table": "preparation_time_stats",
+                "unique_together": {("kind", "key")},
+            },
+        ),
+    ]
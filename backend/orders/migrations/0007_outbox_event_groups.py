@@ -0,0 +1,22 @@
+# Generated by Django 4.2.3 on 2026-10-17 06:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0006_outbox_event"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="outboxevent",
+            name="group",
+        ),
+        migrations.AddField(
+            model_name="outboxevent",
+            name="groups",
+            field=models.JSONField(default=list),
+        ),
+    ]
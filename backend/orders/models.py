@@ -42,6 +42,7 @@ class Order(models.Model):
         indexes = [
             models.Index(fields=['status', 'created_at']),
             models.Index(fields=['priority', 'created_at']),
+            models.Index(fields=['created_at', 'id']),
         ]
     
     def __str__(self):
@@ -61,17 +62,10 @@ class Order(models.Model):
         Automatically update order priority based on wait time
         """
         from django.utils import timezone
+        from .priority import priority_for_wait_time
         
         wait_time = (timezone.now() - self.created_at).total_seconds() / 60
-        
-        if wait_time > 45:
-            self.priority = 'urgent'
-        elif wait_time > 30:
-            self.priority = 'high'
-        elif wait_time > 15:
-            self.priority = 'normal'
-        else:
-            self.priority = 'low'
+        self.priority = priority_for_wait_time(wait_time)
         
         self.save(update_fields=['priority'])
 
@@ -95,6 +89,122 @@ class OrderItem(models.Model):
     def __str__(self):
         return f"{self.menu_item} x{self.quantity}"
 
+class KitchenTicket(models.Model):
+    """
+    Denormalized read model of an active order for the kitchen display.
+
+    One row per order that is still pending, preparing or ready, kept in step
+    with the order by orders.kitchen_queue so the kitchen screen reads only
+    active tickets instead of scanning and serializing the whole orders table.
+    """
+    order = models.OneToOneField(Order, on_delete=models.CASCADE, primary_key=True, related_name='kitchen_ticket')
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    priority = models.CharField(max_length=10, choices=Order.PRIORITY_CHOICES)
+    priority_rank = models.SmallIntegerField(default=0)
+    table_number = models.IntegerField(null=True, blank=True)
+    special_instructions = models.TextField(blank=True)
+    items = models.JSONField(default=list)
+    
+    created_at = models.DateTimeField()
+    started_preparing_at = models.DateTimeField(null=True, blank=True)
+    estimated_preparation_time = models.IntegerField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'kitchen_tickets'
+        indexes = [
+            models.Index(fields=['status', '-priority_rank', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"Ticket for Order #{self.order_id} - {self.status}"
+
+class PreparationTimeStat(models.Model):
+    """
+    Running aggregate of order preparation times for one key: a menu item,
+    an hour of the day, or all orders.
+
+    Durations are folded in as they are recorded, so reading count, mean
+    and percentiles never scans order history. Percentiles come from a
+    bounded histogram of whole minutes (one bucket per minute up to
+    HISTOGRAM_MAX_MINUTES, longer durations share the last bucket).
+    """
+    KIND_CHOICES = (
+        ('menu_item', 'Menu Item'),
+        ('hour', 'Hour of Day'),
+        ('all', 'All Orders'),
+    )
+    
+    HISTOGRAM_MAX_MINUTES = 180
+    
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    key = models.IntegerField(default=0)
+    count = models.IntegerField(default=0)
+    mean = models.FloatField(default=0)
+    p50 = models.IntegerField(null=True, blank=True)
+    p90 = models.IntegerField(null=True, blank=True)
+    histogram = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'preparation_time_stats'
+        unique_together = ('kind', 'key')
+    
+    def __str__(self):
+        return f"{self.kind} {self.key}: {self.count} orders, mean {self.mean:.1f} min"
+    
+    def add(self, minutes):
+        """
+        Fold one preparation time (in minutes) into the aggregate
+        """
+        minutes = max(0, min(int(minutes), self.HISTOGRAM_MAX_MINUTES))
+        self.count += 1
+        self.mean += (minutes - self.mean) / self.count
+        
+        bucket = str(minutes)
+        self.histogram[bucket] = self.histogram.get(bucket, 0) + 1
+        self.p50 = self.quantile(0.5)
+        self.p90 = self.quantile(0.9)
+    
+    def quantile(self, q):
+        if not self.count:
+            return None
+        
+        rank = q * self.count
+        seen = 0
+        for minutes in sorted(int(bucket) for bucket in self.histogram):
+            seen += self.histogram[str(minutes)]
+            if seen >= rank:
+                return minutes
+        return self.HISTOGRAM_MAX_MINUTES
+
+class OutboxEvent(models.Model):
+    """
+    Channel-layer message waiting to be published.
+
+    Rows are written in the same transaction as the change they describe and
+    published afterwards by the outbox dispatcher (see orders.outbox), so a
+    committed change is never left without its event and requests never
+    wait on the channel layer.
+    """
+    groups = models.JSONField(default=list)
+    payload = models.JSONField()
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    published_at = models.DateTimeField(null=True, blank=True)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    
+    class Meta:
+        db_table = 'outbox_events'
+        indexes = [
+            models.Index(fields=['published_at', 'id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.payload.get('type')} to {', '.join(self.groups)}"
+
 class Payment(models.Model):
     PAYMENT_METHOD_CHOICES = (
         ('cash', 'Cash'),
@@ -0,0 +1,114 @@
+"""
+Transactional outbox for channel-layer events.
+
+`enqueue` stores a message in the caller's transaction. The dispatcher
+(`manage.py dispatch_outbox`, or the periodic Celery task) claims
+unpublished events in id order, sends a whole batch to the channel layer
+in one event-loop hop and marks them published with one UPDATE. Sent
+events are stamped with stream sequence numbers and copied to the replay
+buffer (core.replay). When the channel layer is unavailable the batch is
+retried with exponential backoff, and later events wait behind it, so
+events committed during an outage are delivered afterwards, in order.
+"""
+import logging
+from datetime import timedelta
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from core import replay
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+MAX_BACKOFF_SECONDS = 60
+
+def enqueue(groups, message):
+    return OutboxEvent.objects.create(groups=list(groups), payload=message)
+
+def enqueue_many(entries):
+    """
+    Store several (groups, message) pairs with one INSERT
+    """
+    return OutboxEvent.objects.bulk_create([
+        OutboxEvent(groups=list(groups), payload=message) for groups, message in entries
+    ])
+
+def stamp(event, seq):
+    """
+    The message for `event` as sent: its outbox id as `event_id`, so a
+    consumer in several of the event's groups (or receiving a retried event)
+    can drop the repeats, and its stream sequence number as `seq`
+    """
+    return {**event.payload, 'event_id': event.id, 'seq': seq}
+
+async def send_batch(channel_layer, events, first_seq=None):
+    """
+    Send events in order; returns the ids sent and the first error, if any
+    """
+    sent = []
+    for index, event in enumerate(events):
+        message = stamp(event, first_seq + index if first_seq is not None else None)
+        try:
+            for group in event.groups:
+                await channel_layer.group_send(group, message)
+        except Exception as e:
+            return sent, e
+        sent.append(event.id)
+    return sent, None
+
+def dispatch_pending(batch_size=None):
+    """
+    Publish one batch of pending events; returns how many were published
+    """
+    batch_size = batch_size or getattr(settings, 'OUTBOX_BATCH_SIZE', 100)
+    now = timezone.now()
+
+    with transaction.atomic():
+        pending = OutboxEvent.objects.filter(published_at__isnull=True)
+        # Events behind one that is backing off wait for it, so delivery
+        # stays in id order across retries
+        blocked = pending.filter(next_attempt_at__gt=now).order_by('id').values_list('id', flat=True).first()
+        if blocked is not None:
+            pending = pending.filter(id__lt=blocked)
+        events = list(pending.select_for_update(skip_locked=True).order_by('id')[:batch_size])
+        if not events:
+            return 0
+
+        first_seq = replay.reserve(len(events))
+        sent, error = async_to_sync(send_batch)(get_channel_layer(), events, first_seq)
+
+        replay.record([
+            (first_seq + index, event.groups, stamp(event, first_seq + index))
+            if index < len(sent) else (first_seq + index, [], None)
+            for index, event in enumerate(events)
+        ])
+
+        if sent:
+            OutboxEvent.objects.filter(id__in=sent).update(published_at=timezone.now())
+
+        if error is not None:
+            # Everything from the first failure on is retried later, in order
+            failed = events[len(sent)]
+            backoff = min(2 ** failed.attempts, MAX_BACKOFF_SECONDS)
+            logger.warning(f"Outbox publish failed, retrying in {backoff}s: {error}")
+            OutboxEvent.objects.filter(id=failed.id).update(
+                attempts=failed.attempts + 1,
+                last_error=str(error)
+            )
+            OutboxEvent.objects.filter(
+                id__in=[event.id for event in events[len(sent):]]
+            ).update(next_attempt_at=now + timedelta(seconds=backoff))
+
+    return len(sent)
+
+def prune_published(older_than=None):
+    """
+    Delete events published before `older_than` (default OUTBOX_RETENTION, 1 day)
+    """
+    older_than = older_than or getattr(settings, 'OUTBOX_RETENTION', timedelta(days=1))
+    deleted, _ = OutboxEvent.objects.filter(
+        published_at__lt=timezone.now() - older_than
+    ).delete()
+    return deleted
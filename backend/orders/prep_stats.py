@@ -0,0 +1,112 @@
+"""
+Incremental preparation-time statistics.
+
+Completed preparations are recorded at the 'ready' transition into
+PreparationTimeStat rows per menu item, per hour of the day and overall.
+Estimates for new tickets are read back from those rows in O(items).
+"""
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+from django.db.models import Q
+from django.utils import timezone
+from .models import PreparationTimeStat
+
+# Samples needed before a statistic is trusted over the menu's default
+MIN_SAMPLES = 5
+
+# Lower bound for any estimate, in minutes
+MIN_ESTIMATE = 5
+
+def stat_keys(menu_item_ids, hour):
+    keys = [('menu_item', menu_item_id) for menu_item_id in set(menu_item_ids) if menu_item_id]
+    keys.append(('hour', hour))
+    keys.append(('all', 0))
+    return keys
+
+def load_stats(keys, for_update=False):
+    if not keys:
+        return {}
+
+    queryset = PreparationTimeStat.objects.filter(
+        reduce(or_, (Q(kind=kind, key=key) for kind, key in keys))
+    )
+    if for_update:
+        queryset = queryset.select_for_update()
+    return {(stat.kind, stat.key): stat for stat in queryset}
+
+def preparation_minutes(started_at, finished_at):
+    return round((finished_at - started_at).total_seconds() / 60)
+
+def record_completions(completions):
+    """
+    Fold completed preparations into the running statistics.
+
+    `completions` is a list of (minutes, started_at, menu_item_ids). Rows
+    for keys seen for the first time are inserted empty (skipping any a
+    concurrent transaction inserted first), then every affected statistic
+    is read once (locked) and written back with one bulk_update.
+    Must run inside a transaction.
+    """
+    samples = defaultdict(list)
+    for minutes, started_at, menu_item_ids in completions:
+        hour = timezone.localtime(started_at).hour
+        for key in stat_keys(menu_item_ids, hour):
+            samples[key].append(minutes)
+
+    if not samples:
+        return
+
+    existing = load_stats(list(samples), for_update=True)
+    missing = [key for key in samples if key not in existing]
+    if missing:
+        PreparationTimeStat.objects.bulk_create(
+            [PreparationTimeStat(kind=kind, key=key, histogram={}) for kind, key in missing],
+            ignore_conflicts=True
+        )
+        existing = load_stats(list(samples), for_update=True)
+
+    now = timezone.now()
+    for (kind, key), values in samples.items():
+        stat = existing[(kind, key)]
+        for minutes in values:
+            stat.add(minutes)
+        stat.updated_at = now
+
+    PreparationTimeStat.objects.bulk_update(
+        existing.values(), ['count', 'mean', 'p50', 'p90', 'histogram', 'updated_at']
+    )
+
+def estimate_minutes(order_items, now=None):
+    """
+    Estimate preparation time for several orders with one statistics query.
+
+    `order_items` maps an order id to a list of (menu_item_id,
+    default_preparation_time) pairs. Items are prepared in parallel, so an
+    order takes as long as its slowest item: the item's median once it has
+    MIN_SAMPLES completions, otherwise the menu's preparation time. The
+    result is scaled by how the current hour compares with the overall mean.
+    """
+    now = now or timezone.now()
+    hour = timezone.localtime(now).hour
+    menu_item_ids = [menu_item_id for items in order_items.values() for menu_item_id, _ in items]
+    stats = load_stats(stat_keys(menu_item_ids, hour))
+
+    factor = 1
+    hour_stat = stats.get(('hour', hour))
+    all_stat = stats.get(('all', 0))
+    if hour_stat and all_stat and hour_stat.count >= MIN_SAMPLES and all_stat.mean:
+        factor = hour_stat.mean / all_stat.mean
+
+    estimates = {}
+    for order_id, items in order_items.items():
+        item_minutes = [MIN_ESTIMATE]
+        for menu_item_id, default_minutes in items:
+            stat = stats.get(('menu_item', menu_item_id))
+            if stat and stat.count >= MIN_SAMPLES:
+                item_minutes.append(stat.p50)
+            elif default_minutes:
+                item_minutes.append(default_minutes)
+        estimates[order_id] = max(MIN_ESTIMATE, round(max(item_minutes) * factor))
+
+    return estimates
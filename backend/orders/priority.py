@@ -0,0 +1,55 @@
+"""
+Wait-time based order priorities
+"""
+from datetime import timedelta
+from django.db import transaction
+from django.utils import timezone
+from .models import Order
+from . import kitchen_queue
+
+OPEN_STATUSES = ['pending', 'preparing', 'ready']
+
+# (minutes waited, priority), most urgent first
+PRIORITY_THRESHOLDS = [
+    (45, 'urgent'),
+    (30, 'high'),
+    (15, 'normal'),
+]
+
+PRIORITY_ORDER = [priority for priority, _ in Order.PRIORITY_CHOICES]
+
+def priority_for_wait_time(wait_minutes):
+    for threshold, priority in PRIORITY_THRESHOLDS:
+        if wait_minutes > threshold:
+            return priority
+    return 'low'
+
+def escalate_priorities(now=None):
+    """
+    Raise the priority of every open order that has waited past a threshold.
+
+    Each tier is one SELECT of ids plus one UPDATE over the
+    (priority, created_at) index, restricted to orders whose current
+    priority is lower, so priorities only ever go up and manual bumps are
+    kept. Returns a mapping of escalated order id to its new priority.
+    """
+    now = now or timezone.now()
+    escalated = {}
+
+    with transaction.atomic():
+        for threshold, priority in PRIORITY_THRESHOLDS:
+            lower = PRIORITY_ORDER[:PRIORITY_ORDER.index(priority)]
+            candidates = Order.objects.filter(
+                priority__in=lower,
+                created_at__lt=now - timedelta(minutes=threshold),
+                status__in=OPEN_STATUSES
+            )
+            ids = list(candidates.values_list('pk', flat=True))
+            if not ids:
+                continue
+
+            candidates.filter(pk__in=ids).update(priority=priority, updated_at=now)
+            kitchen_queue.apply_priority_change(ids, priority)
+            escalated.update(dict.fromkeys(ids, priority))
+
+    return escalated
@@ -1,11 +1,26 @@
 from rest_framework import serializers
-from .models import Order, OrderItem, Payment
-from kitchen.serializers import MenuItemSerializer
+from .models import Order, OrderItem, Payment, KitchenTicket
+from .state_machine import can_transition
+from kitchen.serializers import MenuItemSummarySerializer
 from kitchen.models import MenuItem
-from django.utils import timezone
+from tables.models import Table
+from authentication.models import User
+from django.db import transaction
+
+class DynamicFieldsMixin:
+    """
+    Accept an optional `fields` argument restricting which fields are serialized
+    """
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
 
 class OrderItemSerializer(serializers.ModelSerializer):
-    menu_item_details = MenuItemSerializer(source='menu_item', read_only=True)
+    menu_item_details = MenuItemSummarySerializer(source='menu_item', read_only=True)
     
     class Meta:
         model = OrderItem
@@ -33,7 +48,41 @@ class PaymentSerializer(serializers.ModelSerializer):
         fields = ('id', 'order', 'amount', 'payment_method', 'transaction_id', 'payment_date')
         read_only_fields = ('payment_date',)
 
-class OrderSerializer(serializers.ModelSerializer):
+class CompactOrderItemSerializer(serializers.ModelSerializer):
+    name = serializers.CharField(source='menu_item.name', read_only=True, default=None)
+
+    class Meta:
+        model = OrderItem
+        fields = ('menu_item', 'name', 'quantity')
+        read_only_fields = fields
+
+class CompactOrderSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """
+    Read-only order shape for lists and WebSocket broadcasts: line items carry
+    only the menu item id, name and quantity instead of the full menu item.
+    """
+    items = CompactOrderItemSerializer(many=True, read_only=True)
+    table_number = serializers.IntegerField(source='table.table_number', read_only=True)
+
+    class Meta:
+        model = Order
+        fields = ('id', 'table', 'table_number', 'waiter', 'chef', 'status', 'priority',
+                 'created_at', 'updated_at', 'started_preparing_at', 'completed_at',
+                 'special_instructions', 'is_paid', 'total_amount',
+                 'estimated_preparation_time', 'actual_preparation_time', 'items')
+        read_only_fields = fields
+
+class KitchenTicketSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='order_id', read_only=True)
+
+    class Meta:
+        model = KitchenTicket
+        fields = ('id', 'table_number', 'status', 'priority', 'special_instructions',
+                 'items', 'created_at', 'started_preparing_at',
+                 'estimated_preparation_time', 'updated_at')
+        read_only_fields = fields
+
+class OrderSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, required=False)
     payment = PaymentSerializer(read_only=True)
     waiter_name = serializers.CharField(source='waiter.get_full_name', read_only=True)
@@ -60,66 +109,31 @@ class OrderSerializer(serializers.ModelSerializer):
 
     def validate_status(self, value):
         # Validate status transitions
-        if not self.instance:
+        if not self.instance or value == self.instance.status:
             return value
 
         current_status = self.instance.status
-        valid_transitions = {
-            'pending': ['preparing', 'cancelled'],
-            'preparing': ['ready', 'cancelled'],
-            'ready': ['served', 'cancelled'],
-            'served': [],
-            'cancelled': []
-        }
-
-        if value not in valid_transitions.get(current_status, []):
+        if not can_transition(current_status, value):
             raise serializers.ValidationError(
                 f"Cannot transition from {current_status} to {value}"
             )
         
         return value
 
-    def validate(self, data):
-        # Additional validation logic
-        if 'status' in data:
-            # Ensure consistent status transitions
-            current_status = self.instance.status if self.instance else None
-            new_status = data['status']
-            
-            # Validate status transition
-            valid_transitions = {
-                'pending': ['preparing', 'cancelled'],
-                'preparing': ['ready', 'cancelled'],
-                'ready': ['served', 'cancelled'],
-                'served': [],
-                'cancelled': []
-            }
-            
-            if current_status and new_status not in valid_transitions.get(current_status, []):
-                raise serializers.ValidationError(
-                    f"Invalid status transition from {current_status} to {new_status}"
-                )
-        
-        return data
-
     def update(self, instance, validated_data):
         # Remove items from validated data if present
         validated_data.pop('items', None)
         
-        # Update status with additional logic
-        if 'status' in validated_data:
-            new_status = validated_data['status']
-            
-            # Set chef for preparing orders
-            if new_status == 'preparing':
-                validated_data['chef'] = self.context['request'].user
-                validated_data['started_preparing_at'] = timezone.now()
-            
-            # Add timestamp for completed or cancelled orders
-            if new_status in ['served', 'cancelled']:
-                validated_data['completed_at'] = timezone.now()
+        # Status only changes through the state machine (see OrderViewSet.perform_update)
+        validated_data.pop('status', None)
         
-        return super().update(instance, validated_data)
+        # Write only the fields sent, so a stale status is never saved back
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        if validated_data:
+            instance.save(update_fields=[*validated_data, 'updated_at'])
+        
+        return instance
 
     def create(self, validated_data):
         # Extract items data from context
@@ -192,3 +206,103 @@ class OrderSerializer(serializers.ModelSerializer):
             order.save()
         
         return order
+
+class BulkOrderItemSerializer(serializers.Serializer):
+    menu_item = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1, default=1)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, allow_null=True)
+    notes = serializers.CharField(required=False, allow_blank=True, default='')
+
+class BulkOrderEntrySerializer(serializers.Serializer):
+    table = serializers.IntegerField(required=False, allow_null=True)
+    waiter = serializers.IntegerField(required=False, allow_null=True)
+    priority = serializers.ChoiceField(choices=Order.PRIORITY_CHOICES, default='normal')
+    special_instructions = serializers.CharField(required=False, allow_blank=True, default='')
+    items = BulkOrderItemSerializer(many=True, allow_empty=False)
+
+class BulkOrderCreateSerializer(serializers.Serializer):
+    """
+    Create many orders in one request.
+
+    Menu items, tables and waiters referenced anywhere in the payload are
+    resolved with one `in_bulk` query each, totals are computed in memory and
+    orders and items are inserted with `bulk_create` inside one transaction.
+    """
+    MAX_ORDERS = 500
+
+    orders = BulkOrderEntrySerializer(many=True, allow_empty=False)
+
+    def validate_orders(self, value):
+        if len(value) > self.MAX_ORDERS:
+            raise serializers.ValidationError(
+                f"Cannot create more than {self.MAX_ORDERS} orders in one request"
+            )
+        return value
+
+    def validate(self, data):
+        orders = data['orders']
+
+        menu_item_ids = {item['menu_item'] for order in orders for item in order['items']}
+        table_ids = {order['table'] for order in orders if order.get('table')}
+        waiter_ids = {order['waiter'] for order in orders if order.get('waiter')}
+
+        menu_items = MenuItem.objects.in_bulk(menu_item_ids)
+        tables = Table.objects.in_bulk(table_ids)
+        waiters = User.objects.in_bulk(waiter_ids)
+
+        errors = {}
+        for index, order in enumerate(orders):
+            order_errors = {}
+            if order.get('table') and order['table'] not in tables:
+                order_errors['table'] = [f"Table {order['table']} does not exist"]
+            if order.get('waiter') and order['waiter'] not in waiters:
+                order_errors['waiter'] = [f"User {order['waiter']} does not exist"]
+            missing = [item['menu_item'] for item in order['items'] if item['menu_item'] not in menu_items]
+            if missing:
+                order_errors['items'] = [f"Menu items do not exist: {missing}"]
+            if order_errors:
+                errors[index] = order_errors
+
+        if errors:
+            raise serializers.ValidationError({'orders': errors})
+
+        data['menu_items'] = menu_items
+        return data
+
+    def create(self, validated_data):
+        menu_items = validated_data['menu_items']
+        default_waiter = self.context['request'].user
+
+        orders = []
+        order_items = []
+        for order_data in validated_data['orders']:
+            order = Order(
+                table_id=order_data.get('table'),
+                waiter_id=order_data.get('waiter') or default_waiter.id,
+                priority=order_data['priority'],
+                special_instructions=order_data['special_instructions'],
+                total_amount=0
+            )
+            items = []
+            for item_data in order_data['items']:
+                price = item_data.get('price')
+                if price is None:
+                    price = menu_items[item_data['menu_item']].price
+                items.append(OrderItem(
+                    menu_item_id=item_data['menu_item'],
+                    quantity=item_data['quantity'],
+                    price=price,
+                    notes=item_data['notes']
+                ))
+                order.total_amount += price * item_data['quantity']
+            orders.append(order)
+            order_items.append(items)
+
+        with transaction.atomic():
+            Order.objects.bulk_create(orders)
+            for order, items in zip(orders, order_items):
+                for item in items:
+                    item.order = order
+            OrderItem.objects.bulk_create([item for items in order_items for item in items])
+
+        return orders
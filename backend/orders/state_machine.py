@@ -0,0 +1,207 @@
+from collections import defaultdict
+from django.db import models, transaction
+from django.utils import timezone
+from .models import Order, OrderItem
+from . import inventory, kitchen_queue, prep_stats
+
+# Allowed status changes, keyed by the current status
+VALID_TRANSITIONS = {
+    'pending': ['preparing', 'cancelled'],
+    'preparing': ['ready', 'cancelled'],
+    'ready': ['served', 'cancelled'],
+    'served': [],
+    'cancelled': []
+}
+
+class TransitionError(Exception):
+    """
+    Raised when a status change is not allowed by VALID_TRANSITIONS
+    """
+
+class TransitionConflict(TransitionError):
+    """
+    Raised when the order left the expected status before the update ran
+    """
+
+def can_transition(current_status, new_status):
+    return new_status in VALID_TRANSITIONS.get(current_status, [])
+
+def validate_transition(current_status, new_status):
+    if new_status not in dict(Order.STATUS_CHOICES):
+        raise TransitionError(f"Invalid status: {new_status}")
+
+    if not can_transition(current_status, new_status):
+        raise TransitionError(f"Cannot transition from {current_status} to {new_status}")
+
+def transition_fields(new_status, user=None, now=None):
+    """
+    Fields that change alongside the status: the chef and start time when
+    preparation begins, and the completion time for served/cancelled orders
+    """
+    now = now or timezone.now()
+    fields = {'status': new_status}
+
+    if new_status == 'preparing':
+        fields['chef'] = user
+        fields['started_preparing_at'] = now
+
+    if new_status in ['served', 'cancelled']:
+        fields['completed_at'] = now
+
+    return fields
+
+def changed_fields(new_status):
+    """
+    Order fields written by a transition to `new_status`
+    """
+    fields = list(transition_fields(new_status)) + ['updated_at']
+
+    if new_status == 'preparing':
+        fields.append('estimated_preparation_time')
+
+    if new_status == 'ready':
+        fields.append('actual_preparation_time')
+
+    return fields
+
+def per_order_value(values, output_field):
+    """
+    CASE expression giving each order its own value in one UPDATE
+    """
+    return models.Case(
+        *[models.When(pk=pk, then=models.Value(value)) for pk, value in values.items()],
+        output_field=output_field
+    )
+
+def apply_transition(order, new_status, user=None, expected_status=None):
+    """
+    Move `order` to `new_status` with a single conditional
+    UPDATE ... WHERE id=<id> AND status=<expected_status>.
+
+    If another request changed the status first, no row matches and
+    TransitionConflict is raised, so concurrent taps on the same ticket
+    cannot both succeed. On success the written values are copied onto
+    `order`, which then reflects the new row without re-reading it.
+    Starting preparation takes the order's ingredients out of stock in the
+    same transaction (see inventory.consume).
+    """
+    expected_status = expected_status or order.status
+    validate_transition(expected_status, new_status)
+
+    now = timezone.now()
+    changes = transition_fields(new_status, user, now)
+    changes['updated_at'] = now
+
+    menu_items = []
+    if new_status in ['preparing', 'ready']:
+        menu_items = [
+            (item.menu_item_id, item.menu_item.preparation_time if item.menu_item_id else None)
+            for item in order.items.all()
+        ]
+
+    if new_status == 'preparing':
+        changes['estimated_preparation_time'] = prep_stats.estimate_minutes({order.pk: menu_items}, now)[order.pk]
+
+    completion = None
+    if new_status == 'ready' and order.started_preparing_at:
+        minutes = prep_stats.preparation_minutes(order.started_preparing_at, now)
+        changes['actual_preparation_time'] = minutes
+        completion = (minutes, order.started_preparing_at, [menu_item_id for menu_item_id, _ in menu_items])
+
+    with transaction.atomic():
+        updated = Order.objects.filter(pk=order.pk, status=expected_status).update(**changes)
+        if not updated:
+            raise TransitionConflict(
+                f"Order #{order.pk} is no longer {expected_status}"
+            )
+        kitchen_queue.apply_status_change([order.pk], expected_status, changes)
+        if new_status == 'preparing':
+            inventory.consume([order.pk], now)
+        if completion:
+            prep_stats.record_completions([completion])
+
+    for field, value in changes.items():
+        setattr(order, field, value)
+
+    return order
+
+def apply_bulk_transition(order_ids, new_status, user=None):
+    """
+    Move many orders to `new_status` at once.
+
+    Every transition is validated in memory from a single read, then applied
+    with one conditional UPDATE per source status, setting the same fields
+    as apply_transition (per-order estimates and preparation times go in as
+    CASE expressions) and consuming ingredients for every order that starts
+    preparing in one go. Returns the ids that were updated and a mapping of
+    rejected ids to the reason they were skipped.
+    """
+    if new_status not in dict(Order.STATUS_CHOICES):
+        raise TransitionError(f"Invalid status: {new_status}")
+
+    order_ids = set(order_ids)
+    current = Order.objects.filter(pk__in=order_ids).values_list('pk', 'status', 'started_preparing_at')
+
+    rejected = {order_id: 'Order not found' for order_id in order_ids}
+    groups = defaultdict(list)
+    started_at = {}
+    for order_id, current_status, started_preparing_at in current:
+        del rejected[order_id]
+        if not can_transition(current_status, new_status):
+            rejected[order_id] = f"Cannot transition from {current_status} to {new_status}"
+            continue
+
+        groups[current_status].append(order_id)
+        started_at[order_id] = started_preparing_at
+
+    now = timezone.now()
+    changes = transition_fields(new_status, user, now)
+    changes['updated_at'] = now
+
+    menu_items = defaultdict(list)
+    if new_status in ['preparing', 'ready'] and started_at:
+        for order_id, menu_item_id, preparation_time in OrderItem.objects.filter(
+            order_id__in=started_at
+        ).values_list('order_id', 'menu_item_id', 'menu_item__preparation_time'):
+            menu_items[order_id].append((menu_item_id, preparation_time))
+
+    if new_status == 'preparing' and started_at:
+        estimates = prep_stats.estimate_minutes({order_id: menu_items[order_id] for order_id in started_at}, now)
+        changes['estimated_preparation_time'] = per_order_value(estimates, models.IntegerField())
+
+    durations = {}
+    if new_status == 'ready':
+        durations = {
+            order_id: prep_stats.preparation_minutes(started_preparing_at, now)
+            for order_id, started_preparing_at in started_at.items()
+            if started_preparing_at
+        }
+        if durations:
+            changes['actual_preparation_time'] = per_order_value(durations, models.IntegerField())
+
+    updated_ids = []
+    with transaction.atomic():
+        for current_status, ids in groups.items():
+            Order.objects.filter(pk__in=ids, status=current_status).update(**changes)
+            kitchen_queue.apply_status_change(ids, current_status, changes)
+            updated_ids.extend(ids)
+
+        # Rows that changed status between the read and the UPDATE were not
+        # matched; only orders stamped with this update count as applied
+        applied = set(Order.objects.filter(
+            pk__in=updated_ids, status=new_status, updated_at=now
+        ).values_list('pk', flat=True))
+
+        if new_status == 'preparing' and applied:
+            inventory.consume(applied, now)
+
+        prep_stats.record_completions([
+            (minutes, started_at[order_id], [menu_item_id for menu_item_id, _ in menu_items[order_id]])
+            for order_id, minutes in durations.items()
+            if order_id in applied
+        ])
+
+    for order_id in set(updated_ids) - applied:
+        rejected[order_id] = 'Order was changed by another request'
+
+    return sorted(applied), rejected
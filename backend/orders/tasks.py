@@ -0,0 +1,43 @@
+from celery import shared_task
+from django.db import transaction
+from django.db.models import Prefetch
+from .events import publish_per_group
+from .models import Order, OrderItem
+from . import outbox
+from .priority import escalate_priorities
+
+@shared_task
+def escalate_order_priorities_task():
+    """
+    Celery task to escalate open order priorities by wait time
+    """
+    with transaction.atomic():
+        escalated = escalate_priorities()
+
+        if escalated:
+            # One message per topic group for the tickets escalated in this run
+            orders = Order.objects.filter(pk__in=escalated).select_related('table').prefetch_related(
+                Prefetch('items', queryset=OrderItem.objects.select_related('menu_item'))
+            )
+            publish_per_group(
+                "order.priority_update", orders, "orders",
+                lambda order: {"id": order.pk, "priority": order.priority}
+            )
+
+    return f"Escalated {len(escalated)} orders"
+
+@shared_task
+def dispatch_outbox_task():
+    """
+    Celery task to publish pending outbox events to the channel layer
+    """
+    published = 0
+    while True:
+        sent = outbox.dispatch_pending()
+        published += sent
+        if not sent:
+            break
+
+    outbox.prune_published()
+
+    return f"Published {published} events"
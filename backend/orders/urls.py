@@ -1,9 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import OrderViewSet
+from .views import OrderViewSet, KitchenQueueViewSet
 
 router = DefaultRouter()
 router.register(r'orders', OrderViewSet, basename='order')
+router.register(r'kitchen-queue', KitchenQueueViewSet, basename='kitchen-queue')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -1,24 +1,34 @@
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
 from django_filters import rest_framework as filters
-from django.utils import timezone
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
-from .models import Order, OrderItem, Payment
-from .serializers import OrderSerializer, PaymentSerializer
+from .models import Order, OrderItem, Payment, KitchenTicket
+from .serializers import (
+    OrderSerializer,
+    CompactOrderSerializer,
+    BulkOrderCreateSerializer,
+    KitchenTicketSerializer,
+    PaymentSerializer
+)
+from .state_machine import (
+    apply_bulk_transition,
+    changed_fields,
+    TransitionError,
+    TransitionConflict
+)
+from .commands import load_order_items, create_order, change_order_status, visible_to
+from . import kitchen_queue
+from .events import notify_order_change, notify_orders_changed
 from tables.models import Table
-from django.db import models
-import traceback
+from core.pagination import TimestampCursorPagination
+from django.db import transaction
+from django.db.models import Prefetch
 import logging
 
 logger = logging.getLogger(__name__)
 
-class OrderPagination(PageNumberPagination):
-    page_size = 10
-    page_size_query_param = 'page_size'
-    max_page_size = 100
+class OrderPagination(TimestampCursorPagination):
+    ordering = ('-created_at', '-id')
 
 class OrderFilter(filters.FilterSet):
     start_date = filters.DateFilter(field_name='created_at', lookup_expr='gte')
@@ -38,14 +48,17 @@ class OrderViewSet(viewsets.ModelViewSet):
     pagination_class = OrderPagination
 
     def get_queryset(self):
-        queryset = Order.objects.all().prefetch_related('items', 'items__menu_item').order_by('-created_at')
-        
-        if self.request.user.role == 'waiter':
-            return queryset.filter(waiter=self.request.user)
-        elif self.request.user.role == 'chef':
-            return queryset.exclude(status__in=['served', 'cancelled'])
-        
-        return queryset
+        # Load everything the serializer touches up front so the number of
+        # queries per page is fixed regardless of page size:
+        # orders (+ table, waiter, chef, payment) and items (+ menu item).
+        # Ingredient availability is stored on the menu item.
+        queryset = Order.objects.select_related(
+            'table', 'waiter', 'chef', 'payment'
+        ).prefetch_related(
+            Prefetch('items', queryset=OrderItem.objects.select_related('menu_item'))
+        ).order_by('-created_at', '-id')
+
+        return visible_to(queryset, self.request.user)
 
     def list(self, request, *args, **kwargs):
         # Support both GET and POST methods for filtering
@@ -95,20 +108,21 @@ class OrderViewSet(viewsets.ModelViewSet):
         return super().create(request, *args, **kwargs)
 
     def perform_create(self, serializer):
-        # Set waiter as current user if not specified
-        if not self.request.data.get('waiter'):
-            serializer.save(waiter=self.request.user)
-        
-        # Notify about new order via WebSocket
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)(
-            "orders",
-            {
-                "type": "order.create",
-                "order": OrderSerializer(serializer.instance).data
-            }
-        )
-        return serializer.instance
+        # Waiter defaults to the current user; notifies via WebSocket
+        return create_order(serializer, self.request.user)
+
+    def get_serializer_class(self):
+        # ?view=compact swaps in the lightweight read-only representation
+        if self.action in ['list', 'retrieve'] and self.request.query_params.get('view') == 'compact':
+            return CompactOrderSerializer
+        return OrderSerializer
+
+    def get_serializer(self, *args, **kwargs):
+        # ?fields=id,status,... restricts the serialized fields on reads
+        fields = self.request.query_params.get('fields')
+        if fields and self.action in ['list', 'retrieve']:
+            kwargs['fields'] = [field.strip() for field in fields.split(',')]
+        return super().get_serializer(*args, **kwargs)
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -116,149 +130,70 @@ class OrderViewSet(viewsets.ModelViewSet):
             context['items'] = self.request.data.get('items', [])
         return context
 
-    @action(detail=True, methods=['post'], url_path='status')
-    def update_order_status(self, request, pk=None):
-        try:
-            order = self.get_object()
-            new_status = request.data.get('status')
-            
-            if not new_status:
-                return Response({'error': 'Status is required'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            order.status = new_status
-            order.save()
-            
-            serializer = self.get_serializer(order)
-            return Response(serializer.data)
-        except Exception as e:
-            logger.error(f"Error updating order status: {str(e)}")
-            logger.error(traceback.format_exc())
-            return Response({'error': 'Failed to update order status'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    @action(detail=False, methods=['post'], url_path='bulk-create')
+    def bulk_create(self, request):
+        """
+        Create many orders in one request
+        Request body should be: {'orders': [{'table': 1, 'items': [{'menu_item': 1, 'quantity': 2}]}]}
+        """
+        serializer = BulkOrderCreateSerializer(data=request.data, context=self.get_serializer_context())
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            orders = serializer.save()
+
+            created_orders = Order.objects.filter(
+                id__in=[order.id for order in orders]
+            ).select_related('table').prefetch_related(
+                Prefetch('items', queryset=OrderItem.objects.select_related('menu_item'))
+            ).order_by('id')
+            kitchen_queue.sync_tickets(list(created_orders))
+
+            # One broadcast for the whole batch
+            notify_orders_changed("order.bulk_create", created_orders)
+
+        return Response(CompactOrderSerializer(created_orders, many=True).data, status=status.HTTP_201_CREATED)
 
     @action(detail=False, methods=['post'], url_path='bulk-update')
     def bulk_update_orders(self, request):
-        try:
-            order_ids = request.data.get('order_ids', [])
-            new_status = request.data.get('status')
-            
-            if not order_ids or not new_status:
-                return Response({'error': 'Order IDs and status are required'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Bulk update orders
-            updated_count = Order.objects.filter(id__in=order_ids).update(status=new_status)
-            
-            return Response({
-                'updated_count': updated_count,
-                'message': f'Successfully updated {updated_count} orders to {new_status} status'
-            })
-        except Exception as e:
-            logger.error(f"Error in bulk order update: {str(e)}")
-            logger.error(traceback.format_exc())
-            return Response({'error': 'Failed to bulk update orders'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return self.bulk_update(request)
 
     @action(detail=True, methods=['post'], url_path='status')
     def update_status(self, request, pk=None):
-        import traceback
-        
-        # Log the incoming request details
-        print("=" * 50)
-        print(f"Update Status Request - Order ID: {pk}")
-        print(f"Request Data: {request.data}")
-        print(f"Current User: {request.user}")
-        print(f"User ID: {request.user.id}")
-        print(f"User Role: {request.user.role}")
-        print("=" * 50)
-        
-        try:
-            order = self.get_object()
-            print(f"Order Found: {order}")
-        except Exception as e:
-            print(f"Error retrieving order: {e}")
-            traceback.print_exc()
-            return Response(
-                {'error': 'Order not found'}, 
-                status=status.HTTP_404_NOT_FOUND
-            )
-        
+        """
+        Move an order to a new status
+        Request body should be: {'status': 'preparing', 'expected_status': 'pending'}
+        `expected_status` is optional and defaults to the status that was read.
+        """
+        order = self.get_object()
         new_status = request.data.get('status')
         
-        # Validate status
         if not new_status:
-            print("No status provided in the request")
             return Response(
                 {'error': 'Status is required'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        if new_status not in dict(Order.STATUS_CHOICES):
-            print(f"Invalid status: {new_status}")
-            return Response(
-                {'error': 'Invalid status'}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Prepare update data
-        update_data = {'status': new_status}
-        
-        # Set chef for preparing orders
-        if new_status == 'preparing':
-            update_data['chef'] = request.user.id
-            update_data['started_preparing_at'] = timezone.now()
-        
-        # Add current timestamp for completed or cancelled orders
-        if new_status in ['served', 'cancelled']:
-            update_data['completed_at'] = timezone.now()
-        
         try:
-            # Validate and save the order
-            print(f"Update Data: {update_data}")
-            serializer = self.get_serializer(order, data=update_data, partial=True)
-            
-            # Detailed serializer validation
-            try:
-                serializer.is_valid(raise_exception=True)
-            except serializers.ValidationError as e:
-                print("Serializer Validation Errors:")
-                print(e.detail)
-                return Response(
-                    {'error': 'Validation failed', 'details': e.detail}, 
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            updated_order = serializer.save()
-            print(f"Order Updated: {updated_order}")
-            
-            # If preparing, calculate estimated preparation time
-            if new_status == 'preparing':
-                # Estimate preparation time based on items
-                total_items = updated_order.items.count()
-                estimated_time = max(5, total_items * 5)  # Minimum 5 mins, 5 mins per item
-                updated_order.estimated_preparation_time = estimated_time
-                updated_order.save(update_fields=['estimated_preparation_time'])
-            
-            # Notify about order status change via WebSocket
-            channel_layer = get_channel_layer()
-            async_to_sync(channel_layer.group_send)(
-                "orders",
-                {
-                    "type": "order.update",
-                    "order": OrderSerializer(updated_order).data
-                }
+            # Notifies via WebSocket with only the fields the transition wrote
+            change_order_status(
+                order,
+                new_status,
+                user=request.user,
+                expected_status=request.data.get('expected_status')
             )
-            
-            print(f"Order {pk} status updated to {new_status}")
-            return Response(OrderSerializer(updated_order).data)
+        except TransitionConflict as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+        except TransitionError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
-        except Exception as e:
-            print(f"Error updating order status: {e}")
-            traceback.print_exc()
-            return Response(
-                {'error': str(e)}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        return Response(self.get_serializer(order).data)
 
     @action(detail=False, methods=['post'])
     def bulk_update(self, request):
+        """
+        Move many orders to one status
+        Request body should be: {'order_ids': [1, 2, 3], 'status': 'preparing'}
+        """
         order_ids = request.data.get('order_ids', [])
         new_status = request.data.get('status')
         
@@ -267,41 +202,33 @@ class OrderViewSet(viewsets.ModelViewSet):
                 {'error': 'No orders specified'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
-            
-        if new_status not in dict(Order.STATUS_CHOICES):
+        
+        try:
+            order_ids = [int(order_id) for order_id in order_ids]
+        except (TypeError, ValueError):
             return Response(
-                {'error': 'Invalid status'}, 
+                {'error': 'Order IDs must be integers'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
-            
-        # Prepare data for bulk update
-        update_data = {
-            'status': new_status,
-            'chef': request.user.id if new_status == 'preparing' else None
-        }
-        
-        orders = Order.objects.filter(id__in=order_ids)
-        updated_count = 0
         
-        # Send WebSocket updates for each updated order
-        channel_layer = get_channel_layer()
-        for order in orders:
-            serializer = self.get_serializer(order, data=update_data, partial=True)
-            if serializer.is_valid():
-                serializer.save()
-                updated_count += 1
+        try:
+            with transaction.atomic():
+                updated_ids, rejected = apply_bulk_transition(order_ids, new_status, user=request.user)
                 
-                async_to_sync(channel_layer.group_send)(
-                    "orders",
-                    {
-                        "type": "order.update",
-                        "order": serializer.data
-                    }
-                )
+                # One WebSocket message for the whole batch
+                if updated_ids:
+                    orders = Order.objects.filter(id__in=updated_ids).select_related('table').prefetch_related(
+                        Prefetch('items', queryset=OrderItem.objects.select_related('menu_item'))
+                    )
+                    notify_orders_changed("order.bulk_update", orders, fields=changed_fields(new_status))
+        except TransitionError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
         return Response({
-            'message': f'Successfully updated {updated_count} orders',
-            'updated_count': updated_count
+            'message': f'Successfully updated {len(updated_ids)} orders',
+            'updated_count': len(updated_ids),
+            'updated_ids': updated_ids,
+            'rejected': rejected
         })
 
     @action(detail=False, methods=['get'])
@@ -309,17 +236,7 @@ class OrderViewSet(viewsets.ModelViewSet):
         """
         Provide summary statistics for kitchen staff
         """
-        summary = {
-            'total_pending': Order.objects.filter(status='pending').count(),
-            'total_preparing': Order.objects.filter(status='preparing').count(),
-            'avg_preparation_time': Order.objects.filter(
-                status='served', 
-                actual_preparation_time__isnull=False
-            ).aggregate(models.Avg('actual_preparation_time'))['actual_preparation_time__avg'] or 0,
-            'orders_by_priority': Order.objects.filter(
-                status__in=['pending', 'preparing']
-            ).values('priority').annotate(count=models.Count('id'))
-        }
+        summary = kitchen_queue.kitchen_summary()
         
         return Response(summary)
 
@@ -356,14 +273,46 @@ class OrderViewSet(viewsets.ModelViewSet):
             return Response(payment_serializer.data)
         return Response(payment_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def update(self, request, *args, **kwargs):
+        try:
+            return super().update(request, *args, **kwargs)
+        except TransitionConflict as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+        except TransitionError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
     def perform_update(self, serializer):
-        instance = serializer.save()
-        # Send WebSocket update
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)(
-            "orders",
-            {
-                "type": "order.update",
-                "order": OrderSerializer(instance).data
-            }
-        )
+        # A status sent with PUT/PATCH is applied like POST .../status/
+        new_status = serializer.validated_data.pop('status', None)
+        with transaction.atomic():
+            instance = serializer.save()
+            # One event per request: the whole order when other fields
+            # changed too, otherwise the transition's delta
+            other_changes = any(field != 'items' for field in serializer.validated_data)
+            if new_status is not None and new_status != instance.status:
+                change_order_status(instance, new_status, user=self.request.user, notify=not other_changes)
+
+            if other_changes:
+                load_order_items([instance])
+                kitchen_queue.sync_tickets([instance])
+                # Send WebSocket update
+                notify_order_change("order.update", instance)
+
+class KitchenQueueViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Active tickets for the kitchen display, read from the KitchenTicket
+    read model: pending, preparing and ready orders ordered by status,
+    highest priority first, then oldest first.
+    """
+    serializer_class = KitchenTicketSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = None
+
+    def get_queryset(self):
+        queryset = KitchenTicket.objects.order_by('status', '-priority_rank', 'created_at')
+
+        statuses = self.request.query_params.get('status')
+        if statuses:
+            queryset = queryset.filter(status__in=statuses.split(','))
+
+        return queryset
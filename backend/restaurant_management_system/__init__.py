@@ -1 +0,0 @@
-# Restaurant Management System Django Project
@@ -0,0 +1,21 @@
+"""
+Table changes shared by the REST views and the WebSocket consumer
+"""
+from django.db import transaction
+from .models import Table
+from .events import notify_table_change
+
+class TableStatusError(Exception):
+    """
+    Raised for a status that is not in Table.STATUS_CHOICES
+    """
+
+def change_table_status(table, new_status):
+    if new_status not in dict(Table.STATUS_CHOICES):
+        raise TableStatusError('Invalid status')
+
+    with transaction.atomic():
+        table.status = new_status
+        table.save(update_fields=['status'])
+        notify_table_change(table)
+    return table
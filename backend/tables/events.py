@@ -0,0 +1,26 @@
+"""
+Table and reservation events for the floor group (see core.topics).
+
+Like order events they are written to the transactional outbox, so call
+these inside the transaction that makes the change.
+"""
+from core import topics
+from orders import outbox
+from .serializers import TableSerializer
+
+def notify_table_change(table):
+    outbox.enqueue([topics.FLOOR], {
+        'type': 'table_status_update',
+        'payload': TableSerializer(table).data
+    })
+
+def notify_reservation_change(reservation):
+    outbox.enqueue([topics.FLOOR], {
+        'type': 'reservation_update',
+        'payload': {
+            'id': reservation.id,
+            'table_id': reservation.table_id,
+            'status': reservation.status,
+            'affects_status': reservation.table.status == 'reserved'
+        }
+    })
@@ -5,6 +5,9 @@ from django_filters import rest_framework as filters
 from datetime import datetime, timedelta
 from .models import Table, Reservation
 from .serializers import TableSerializer, ReservationSerializer
+from .commands import change_table_status, TableStatusError
+from .events import notify_table_change, notify_reservation_change
+from django.db import transaction
 
 class TableFilter(filters.FilterSet):
     min_capacity = filters.NumberFilter(field_name="capacity", lookup_expr='gte')
@@ -30,19 +33,23 @@ class TableViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def change_status(self, request, pk=None):
         table = self.get_object()
-        new_status = request.data.get('status')
         
-        if new_status not in dict(Table.STATUS_CHOICES):
+        try:
+            change_table_status(table, request.data.get('status'))
+        except TableStatusError as e:
             return Response(
-                {'error': 'Invalid status'}, 
+                {'error': str(e)}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
             
-        table.status = new_status
-        table.save()
         serializer = self.get_serializer(table)
         return Response(serializer.data)
 
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            serializer.save()
+            notify_table_change(serializer.instance)
+
 class ReservationFilter(filters.FilterSet):
     date = filters.DateFilter(field_name='reservation_date')
     start_time = filters.TimeFilter(field_name='reservation_time', lookup_expr='gte')
@@ -75,13 +82,17 @@ class ReservationViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
             
-        reservation.status = 'confirmed'
-        reservation.save()
-        
-        # Update table status for the reservation time
-        if reservation.reservation_date == datetime.now().date():
-            reservation.table.status = 'reserved'
-            reservation.table.save()
+        with transaction.atomic():
+            reservation.status = 'confirmed'
+            reservation.save()
+            
+            # Update table status for the reservation time
+            if reservation.reservation_date == datetime.now().date():
+                reservation.table.status = 'reserved'
+                reservation.table.save()
+                notify_table_change(reservation.table)
+            
+            notify_reservation_change(reservation)
             
         serializer = self.get_serializer(reservation)
         return Response(serializer.data)
@@ -95,14 +106,18 @@ class ReservationViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
             
-        reservation.status = 'cancelled'
-        reservation.save()
-        
-        # Update table status if it was reserved for this reservation
-        if (reservation.table.status == 'reserved' and 
-            reservation.reservation_date == datetime.now().date()):
-            reservation.table.status = 'available'
-            reservation.table.save()
+        with transaction.atomic():
+            reservation.status = 'cancelled'
+            reservation.save()
+            
+            # Update table status if it was reserved for this reservation
+            if (reservation.table.status == 'reserved' and 
+                reservation.reservation_date == datetime.now().date()):
+                reservation.table.status = 'available'
+                reservation.table.save()
+                notify_table_change(reservation.table)
+            
+            notify_reservation_change(reservation)
             
         serializer = self.get_serializer(reservation)
         return Response(serializer.data)
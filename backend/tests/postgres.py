@@ -0,0 +1,65 @@
+"""
+Run the test suite against a throwaway PostgreSQL cluster:
+
+    python -m tests.postgres [pytest arguments]
+
+initdb and pg_ctl are taken from PG_BIN or PATH, and must run as a user
+other than root. The cluster lives in a temporary directory, listens only
+on a Unix socket there and is removed when the run ends. It runs without
+fsync since nothing in it needs to survive a crash.
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from contextlib import contextmanager
+
+def pg_binary(name):
+    directory = os.environ.get('PG_BIN')
+    path = os.path.join(directory, name) if directory else shutil.which(name)
+    if not path or not os.path.exists(path):
+        raise SystemExit(f'{name} not found; install PostgreSQL or set PG_BIN')
+    return path
+
+@contextmanager
+def cluster(port=5432):
+    """
+    Start a cluster; yields the environment that points the settings at it
+    """
+    root = tempfile.mkdtemp(prefix='restaurant-postgres-')
+    data = os.path.join(root, 'data')
+    pg_ctl = pg_binary('pg_ctl')
+    try:
+        subprocess.run(
+            [pg_binary('initdb'), '-D', data, '-U', 'postgres', '-A', 'trust', '-E', 'UTF8', '--no-sync'],
+            check=True, stdout=subprocess.DEVNULL
+        )
+        options = f"-p {port} -k {root} -c listen_addresses='' -c fsync=off -c synchronous_commit=off -c full_page_writes=off"
+        subprocess.run(
+            [pg_ctl, '-D', data, '-l', os.path.join(root, 'postgres.log'), '-o', options, '-w', 'start'],
+            check=True, stdout=subprocess.DEVNULL
+        )
+        try:
+            yield {
+                'DB_ENGINE': 'postgres',
+                'DB_NAME': 'postgres',
+                'DB_USER': 'postgres',
+                'DB_PASSWORD': '',
+                'DB_HOST': root,
+                'DB_PORT': str(port),
+            }
+        finally:
+            subprocess.run([pg_ctl, '-D', data, '-m', 'fast', '-w', 'stop'], stdout=subprocess.DEVNULL)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+def main(args):
+    import pytest
+
+    with cluster() as environment:
+        os.environ.update(environment)
+        return pytest.main(['--create-db', *args])
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,368 @@
+import asyncio
+import msgpack
+from unittest import mock
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from decimal import Decimal
+from django.core.cache import cache
+from django.test import TransactionTestCase, override_settings
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.tokens import AccessToken
+from core.consumers import RestaurantConsumer
+from core.frames import encode, frame_cache
+from core.middleware import JWTAuthMiddleware, JWTAuthMiddlewareStack, load_user, user_cache
+from orders import outbox
+from orders.events import notify_order_change
+from orders.models import Order, OutboxEvent
+from tables.models import Table
+
+User = get_user_model()
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class RestaurantConsumerTestCase(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        user_cache.clear()
+        self.chef = User.objects.create_user(username='chef', password='chefpassword123', role='chef')
+        self.waiter = User.objects.create_user(username='waiter', password='waiterpassword123', role='waiter')
+
+    async def connect(self, user, query=''):
+        communicator = WebsocketCommunicator(
+            JWTAuthMiddleware(RestaurantConsumer.as_asgi()),
+            f'/ws/restaurant/?token={AccessToken.for_user(user)}{query}'
+        )
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def connect_fresh(self, user):
+        communicator = await self.connect(user)
+        message = await communicator.receive_json_from()
+        self.assertEqual(message['type'], 'connected')
+        return communicator
+
+    def test_role_topics_and_subscriptions(self):
+        """Test that connections only receive events for their topics"""
+        async def scenario():
+            channel_layer = get_channel_layer()
+            chef = await self.connect_fresh(self.chef)
+            waiter = await self.connect_fresh(self.waiter)
+
+            await channel_layer.group_send('role.chef', {'type': 'order.update', 'order': {'id': 1}, 'event_id': 1})
+            message = await chef.receive_json_from()
+            self.assertEqual(message, {'type': 'order.update', 'seq': None, 'payload': {'order': {'id': 1}}})
+            self.assertTrue(await waiter.receive_nothing())
+
+            # Waiters may follow a floor section but not the kitchen
+            await waiter.send_json_to({
+                'type': 'subscribe',
+                'payload': {'topics': ['section.main-floor', 'role.chef']}
+            })
+            message = await waiter.receive_json_from()
+            self.assertEqual(message['payload']['joined'], ['section.main-floor'])
+            self.assertEqual(message['payload']['rejected'], ['role.chef'])
+
+            await channel_layer.group_send('section.main-floor', {'type': 'order.create', 'order': {'id': 2}, 'event_id': 2})
+            message = await waiter.receive_json_from()
+            self.assertEqual(message['payload']['order']['id'], 2)
+            self.assertTrue(await chef.receive_nothing())
+
+            await chef.disconnect()
+            await waiter.disconnect()
+
+        async_to_sync(scenario)()
+
+    def test_event_in_several_groups_is_sent_once(self):
+        """Test that an event reaching a connection through two groups is sent once"""
+        async def scenario():
+            channel_layer = get_channel_layer()
+            chef = await self.connect_fresh(self.chef)
+            await chef.send_json_to({'type': 'subscribe', 'payload': {'topics': ['station.pizza']}})
+            await chef.receive_json_from()
+
+            message = {'type': 'order.update', 'order': {'id': 3}, 'event_id': 7}
+            await channel_layer.group_send('role.chef', message)
+            await channel_layer.group_send('station.pizza', message)
+
+            self.assertEqual((await chef.receive_json_from())['payload']['order']['id'], 3)
+            self.assertTrue(await chef.receive_nothing())
+
+            await chef.disconnect()
+
+        async_to_sync(scenario)()
+
+    def test_resume_replays_missed_events(self):
+        """Test that a reconnecting client gets only the events it missed"""
+        table = Table.objects.create(table_number=1, capacity=4)
+        orders = Order.objects.bulk_create([
+            Order(table=table, waiter=self.waiter, total_amount=Decimal('10.00')) for _ in range(3)
+        ])
+        for order in orders:
+            notify_order_change('order.update', order, fields=['status'])
+        notify_order_change('order.update', orders[0], fields=['priority'])
+        outbox.dispatch_pending()
+
+        # Only the first order is still the waiter's when the snapshot is taken
+        Order.objects.filter(pk__in=[orders[1].pk, orders[2].pk]).update(waiter=self.chef)
+
+        async def scenario():
+            waiter = await self.connect(self.waiter, '&resume_from=2')
+            replayed = [await waiter.receive_json_from(), await waiter.receive_json_from()]
+            # Replayed events are flushed together; the last frame carries the sequence
+            self.assertEqual([message['seq'] for message in replayed], [None, 4])
+            self.assertEqual(replayed[1]['payload']['order'], {'id': orders[0].pk, 'priority': 'normal'})
+            self.assertTrue(await waiter.receive_nothing())
+            await waiter.disconnect()
+
+            # Too far behind the buffer: a snapshot of the open orders instead
+            with self.settings(WEBSOCKET_REPLAY_BUFFER=1):
+                waiter = await self.connect(self.waiter, '&resume_from=1')
+                message = await waiter.receive_json_from()
+            self.assertEqual(message['type'], 'snapshot')
+            self.assertEqual(message['seq'], 4)
+            self.assertEqual([order['id'] for order in message['payload']['orders']], [orders[0].pk])
+            await waiter.disconnect()
+
+        async_to_sync(scenario)()
+
+    def test_updates_to_one_order_are_coalesced(self):
+        """Test that several updates to an order within the window become one frame"""
+        async def scenario():
+            channel_layer = get_channel_layer()
+            chef = await self.connect_fresh(self.chef)
+
+            await channel_layer.group_send('role.chef', {
+                'type': 'order.create', 'order': {'id': 5, 'status': 'pending', 'priority': 'low'},
+                'event_id': 1, 'seq': 1
+            })
+            await channel_layer.group_send('role.chef', {
+                'type': 'order.update', 'order': {'id': 5, 'status': 'preparing'}, 'event_id': 2, 'seq': 2
+            })
+            await channel_layer.group_send('role.chef', {
+                'type': 'order.priority_update', 'orders': [{'id': 5, 'priority': 'high'}, {'id': 6, 'priority': 'urgent'}],
+                'event_id': 3, 'seq': 3
+            })
+
+            first = await chef.receive_json_from()
+            second = await chef.receive_json_from()
+            self.assertTrue(await chef.receive_nothing())
+            self.assertEqual(first, {
+                'type': 'order.create', 'seq': None,
+                'payload': {'order': {'id': 5, 'status': 'preparing', 'priority': 'high'}}
+            })
+            self.assertEqual(second, {
+                'type': 'order.priority_update', 'seq': 3,
+                'payload': {'orders': [{'id': 6, 'priority': 'urgent'}]}
+            })
+            await chef.disconnect()
+
+        async_to_sync(scenario)()
+
+    def test_merged_updates_keep_a_general_type(self):
+        """Test that an update merged with an escalation is sent as an order update"""
+        async def scenario():
+            channel_layer = get_channel_layer()
+            chef = await self.connect_fresh(self.chef)
+
+            await channel_layer.group_send('role.chef', {
+                'type': 'order.update', 'order': {'id': 5, 'status': 'preparing'}, 'event_id': 1, 'seq': 1
+            })
+            await channel_layer.group_send('role.chef', {
+                'type': 'order.priority_update', 'orders': [{'id': 5, 'priority': 'high'}],
+                'event_id': 2, 'seq': 2
+            })
+
+            message = await chef.receive_json_from()
+            self.assertTrue(await chef.receive_nothing())
+            self.assertEqual(message, {
+                'type': 'order.update', 'seq': 2,
+                'payload': {'order': {'id': 5, 'status': 'preparing', 'priority': 'high'}}
+            })
+            await chef.disconnect()
+
+        async_to_sync(scenario)()
+
+    @override_settings(WEBSOCKET_MAX_PENDING=2)
+    def test_overflowing_queue_sends_snapshot(self):
+        """Test that a connection that falls too far behind is resynchronised with a snapshot"""
+        async def scenario():
+            channel_layer = get_channel_layer()
+            chef = await self.connect_fresh(self.chef)
+
+            await channel_layer.group_send('role.chef', {
+                'type': 'order.bulk_update',
+                'orders': [{'id': order_id, 'status': 'cancelled'} for order_id in range(1, 4)],
+                'event_id': 1, 'seq': 1
+            })
+
+            message = await chef.receive_json_from()
+            self.assertEqual(message['type'], 'snapshot')
+            self.assertEqual(message['payload']['orders'], [])
+            self.assertTrue(await chef.receive_nothing())
+            await chef.disconnect()
+
+        async_to_sync(scenario)()
+
+    def test_reconnect_storm_loads_each_user_once(self):
+        """Test that concurrent and repeated connects share one user lookup"""
+        async def scenario():
+            with mock.patch('core.middleware.load_user', wraps=load_user) as loader:
+                first = await asyncio.gather(*[self.connect_fresh(self.chef) for _ in range(5)])
+                second = await asyncio.gather(*[self.connect_fresh(self.chef) for _ in range(5)])
+                self.assertEqual(loader.call_count, 1)
+
+            for communicator in first + second:
+                await communicator.disconnect()
+
+        async_to_sync(scenario)()
+
+    def test_invalid_token_is_rejected(self):
+        """Test that a bad or missing token (with other query parameters around it) is refused"""
+        self.client.force_login(self.waiter)
+        session = self.client.cookies['sessionid'].value
+
+        async def scenario():
+            for query in ['?resume_from=3&token=not-a-token', '?resume_from=3', '']:
+                communicator = WebsocketCommunicator(
+                    JWTAuthMiddlewareStack(RestaurantConsumer.as_asgi()),
+                    f'/ws/restaurant/{query}'
+                )
+                connected, _ = await communicator.connect()
+                self.assertFalse(connected)
+
+            # A logged-in session does not stand in for the token
+            communicator = WebsocketCommunicator(
+                JWTAuthMiddlewareStack(RestaurantConsumer.as_asgi()),
+                '/ws/restaurant/',
+                headers=[(b'cookie', f'sessionid={session}'.encode())]
+            )
+            connected, _ = await communicator.connect()
+            self.assertFalse(connected)
+
+        async_to_sync(scenario)()
+
+    def test_commands_are_applied_not_relayed(self):
+        """Test that client commands go through the REST services and record one event"""
+        table = Table.objects.create(table_number=1, capacity=4)
+        order = Order.objects.create(table=table, waiter=self.waiter, total_amount=Decimal('10.00'))
+
+        async def scenario():
+            chef = await self.connect_fresh(self.chef)
+            waiter = await self.connect_fresh(self.waiter)
+
+            await chef.send_json_to({
+                'type': 'order_status_update', 'request_id': 'a1',
+                'payload': {'order_id': order.pk, 'status': 'preparing'}
+            })
+            message = await chef.receive_json_from()
+            self.assertEqual(message['type'], 'command_result')
+            self.assertEqual(message['payload']['request_id'], 'a1')
+            self.assertEqual(message['payload']['result'], {'id': order.pk, 'status': 'preparing'})
+
+            await chef.send_json_to({
+                'type': 'order_status_update',
+                'payload': {'order_id': order.pk, 'status': 'served'}
+            })
+            message = await chef.receive_json_from()
+            self.assertFalse(message['payload']['ok'])
+            self.assertEqual(message['payload']['error'], 'Cannot transition from preparing to served')
+
+            await waiter.send_json_to({'type': 'table_status_update', 'payload': {'id': table.pk, 'status': 'occupied'}})
+            self.assertTrue((await waiter.receive_json_from())['payload']['ok'])
+
+            # Nothing reaches the other socket until the outbox is dispatched
+            self.assertTrue(await waiter.receive_nothing())
+            await database_sync_to_async(outbox.dispatch_pending)()
+            for communicator in [chef, waiter]:
+                messages = {}
+                for _ in range(2):
+                    message = await communicator.receive_json_from()
+                    messages[message['type']] = message['payload']
+                self.assertEqual(messages['order.update']['order']['status'], 'preparing')
+                self.assertEqual(messages['table_status_update']['status'], 'occupied')
+
+            await chef.disconnect()
+            await waiter.disconnect()
+
+        async_to_sync(scenario)()
+        self.assertEqual(OutboxEvent.objects.count(), 2)
+
+    def test_commands_only_reach_visible_orders(self):
+        """Test that commands cannot change orders the user may not see"""
+        other_waiter = User.objects.create_user(username='other', password='otherpassword123', role='waiter')
+        order = Order.objects.create(waiter=other_waiter, total_amount=Decimal('10.00'))
+        served = Order.objects.create(waiter=self.waiter, status='served', total_amount=Decimal('10.00'))
+
+        async def scenario():
+            for user, order_id in [(self.waiter, order.pk), (self.chef, served.pk)]:
+                communicator = await self.connect_fresh(user)
+                await communicator.send_json_to({
+                    'type': 'order_status_update',
+                    'payload': {'order_id': order_id, 'status': 'cancelled'}
+                })
+                message = await communicator.receive_json_from()
+                self.assertFalse(message['payload']['ok'])
+                self.assertEqual(message['payload']['error'], 'Order not found')
+                await communicator.disconnect()
+
+        async_to_sync(scenario)()
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'pending')
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    @override_settings(WEBSOCKET_RATE_LIMIT=0.001, WEBSOCKET_RATE_BURST=2)
+    def test_client_messages_are_rate_limited(self):
+        """Test that messages over the limit are dropped with one error"""
+        async def scenario():
+            waiter = await self.connect_fresh(self.waiter)
+            for _ in range(4):
+                await waiter.send_json_to({'type': 'unsubscribe', 'payload': {'topics': []}})
+
+            replies = [await waiter.receive_json_from() for _ in range(3)]
+            self.assertEqual([reply['type'] for reply in replies], ['subscribed', 'subscribed', 'error'])
+            self.assertTrue(await waiter.receive_nothing())
+            await waiter.disconnect()
+
+        async_to_sync(scenario)()
+
+    def test_msgpack_frames_are_encoded_once_per_encoding(self):
+        """Test the msgpack subprotocol and that an event is encoded once per encoding"""
+        frame_cache.clear()
+
+        async def scenario():
+            channel_layer = get_channel_layer()
+            binary = []
+            for _ in range(2):
+                communicator = WebsocketCommunicator(
+                    JWTAuthMiddleware(RestaurantConsumer.as_asgi()),
+                    f'/ws/restaurant/?token={AccessToken.for_user(self.chef)}',
+                    subprotocols=['msgpack']
+                )
+                connected, subprotocol = await communicator.connect()
+                self.assertTrue(connected)
+                self.assertEqual(subprotocol, 'msgpack')
+                self.assertEqual(msgpack.unpackb(await communicator.receive_from())['type'], 'connected')
+                binary.append(communicator)
+            text = await self.connect_fresh(self.chef)
+
+            with mock.patch('core.frames.encode', wraps=encode) as encoder:
+                await channel_layer.group_send('role.chef', {
+                    'type': 'order.update', 'order': {'id': 9, 'status': 'ready'}, 'event_id': 11, 'seq': 5
+                })
+                for communicator in binary:
+                    message = msgpack.unpackb(await communicator.receive_from())
+                    self.assertEqual(message['payload']['order'], {'id': 9, 'status': 'ready'})
+                    self.assertEqual(message['seq'], 5)
+                self.assertEqual((await text.receive_json_from())['seq'], 5)
+                self.assertEqual(sorted(call.args[1] for call in encoder.call_args_list), ['json', 'msgpack'])
+
+            # Commands may be sent as binary frames too
+            await binary[0].send_to(bytes_data=msgpack.packb({'type': 'unsubscribe', 'payload': {'topics': []}}))
+            self.assertEqual(msgpack.unpackb(await binary[0].receive_from())['type'], 'subscribed')
+
+            for communicator in binary + [text]:
+                await communicator.disconnect()
+
+        async_to_sync(scenario)()
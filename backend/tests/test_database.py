@@ -0,0 +1,167 @@
+import threading
+from io import StringIO
+from unittest import mock
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.migrations.loader import MigrationLoader
+from django.test import TransactionTestCase, skipUnlessDBFeature
+from django.utils import timezone
+from kitchen.models import MenuItem, Ingredient, MenuItemIngredient, InventoryTransaction
+from orders.models import Order, OrderItem, OutboxEvent, PreparationTimeStat
+from orders import outbox, prep_stats
+from orders.commands import get_order, change_order_status
+from orders.state_machine import TransitionConflict
+from tables.models import Table
+
+User = get_user_model()
+
+PROJECT_APPS = ['authentication', 'kitchen', 'orders', 'tables', 'menu']
+
+def run_concurrently(*functions):
+    """
+    Start every function at once in its own thread (and database
+    connection); returns their results or exceptions in order
+    """
+    barrier = threading.Barrier(len(functions))
+    results = [None] * len(functions)
+
+    def run(index, function):
+        try:
+            barrier.wait()
+            results[index] = function()
+        except Exception as e:
+            results[index] = e
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=run, args=(index, function)) for index, function in enumerate(functions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+class MigrationParityTestCase(TransactionTestCase):
+    def test_models_match_migrations(self):
+        """Test that every model change has a migration"""
+        try:
+            call_command('makemigrations', '--check', '--dry-run', stdout=StringIO())
+        except SystemExit:
+            self.fail('Models have changes without a migration; run makemigrations')
+
+    def test_migrations_render_on_this_backend(self):
+        """Test that every project migration produces SQL for the database under test"""
+        loader = MigrationLoader(connection)
+        migrations = [key for key in loader.disk_migrations if key[0] in PROJECT_APPS]
+        self.assertTrue(migrations)
+
+        for app_label, name in sorted(migrations):
+            with self.subTest(migration=f'{app_label}.{name}'):
+                call_command('sqlmigrate', app_label, name, stdout=StringIO())
+
+@skipUnlessDBFeature('has_select_for_update_skip_locked')
+class ConcurrentWriteTestCase(TransactionTestCase):
+    """
+    Row locking and concurrent writes; these need a database that runs
+    transactions in parallel, e.g. `python -m tests.postgres`
+    """
+    def setUp(self):
+        cache.clear()
+        self.chef = User.objects.create_user(username='chef', password='chefpassword123', role='chef')
+        self.table = Table.objects.create(table_number=1, capacity=4)
+        self.pizza = MenuItem.objects.bulk_create([
+            MenuItem(name='Margherita Pizza', description='', price=Decimal('12.99'),
+                     category='Pizza', preparation_time=15)
+        ])[0]
+
+    def create_order(self, **kwargs):
+        order = Order.objects.create(table=self.table, total_amount=Decimal('25.98'), **kwargs)
+        OrderItem.objects.create(order=order, menu_item=self.pizza, quantity=2)
+        return order
+
+    def test_concurrent_transitions_of_one_order(self):
+        """Test that only one of two simultaneous status changes succeeds"""
+        order = self.create_order()
+
+        results = run_concurrently(
+            lambda: change_order_status(get_order(order.pk), 'preparing', self.chef),
+            lambda: change_order_status(get_order(order.pk), 'preparing', self.chef),
+        )
+
+        conflicts = [result for result in results if isinstance(result, TransitionConflict)]
+        self.assertEqual(len(conflicts), 1)
+        self.assertEqual(OutboxEvent.objects.count(), 1)
+        self.assertEqual(Order.objects.get(pk=order.pk).status, 'preparing')
+
+    def test_concurrent_orders_consume_stock(self):
+        """Test that orders starting at the same time all take their ingredients"""
+        cheese = Ingredient.objects.create(name='Mozzarella', quantity=100)
+        MenuItemIngredient.objects.create(menu_item=self.pizza, ingredient=cheese, quantity=2)
+        orders = [self.create_order() for _ in range(4)]
+
+        results = run_concurrently(*[
+            lambda order=order: change_order_status(get_order(order.pk), 'preparing', self.chef)
+            for order in orders
+        ])
+
+        self.assertFalse([result for result in results if isinstance(result, Exception)])
+        cheese.refresh_from_db()
+        # Four orders of two pizzas with 2 mozzarella each
+        self.assertEqual(cheese.quantity, Decimal('84'))
+        self.assertEqual(InventoryTransaction.objects.filter(ingredient=cheese).count(), 4)
+
+    def test_concurrent_completions_are_all_counted(self):
+        """Test that locked statistics rows do not lose concurrent updates"""
+        started_at = timezone.now()
+
+        def record(minutes):
+            with transaction.atomic():
+                prep_stats.record_completions([(minutes, started_at, [self.pizza.pk])])
+
+        record(10)
+        results = run_concurrently(*[lambda: record(12) for _ in range(4)])
+
+        self.assertEqual(results, [None] * 4)
+        stat = PreparationTimeStat.objects.get(kind='menu_item', key=self.pizza.pk)
+        self.assertEqual(stat.count, 5)
+        self.assertEqual(PreparationTimeStat.objects.get(kind='all').count, 5)
+
+    def test_concurrent_first_completions_are_all_counted(self):
+        """Test that completions racing to create a statistics row both count"""
+        started_at = timezone.now()
+
+        def record(minutes):
+            with transaction.atomic():
+                prep_stats.record_completions([(minutes, started_at, [self.pizza.pk])])
+
+        results = run_concurrently(*[lambda: record(12) for _ in range(4)])
+
+        self.assertEqual(results, [None] * 4)
+        stat = PreparationTimeStat.objects.get(kind='menu_item', key=self.pizza.pk)
+        self.assertEqual(stat.count, 4)
+        self.assertEqual(PreparationTimeStat.objects.get(kind='all').count, 4)
+
+    def test_concurrent_dispatchers_publish_each_event_once(self):
+        """Test that dispatchers skip rows another dispatcher has locked"""
+        outbox.enqueue_many([
+            (['orders'], {'type': 'order.update', 'order': {'id': index}}) for index in range(60)
+        ])
+        sent = []
+
+        class RecordingLayer:
+            async def group_send(self, group, message):
+                sent.append(message['order']['id'])
+
+        def drain():
+            while outbox.dispatch_pending(batch_size=5):
+                pass
+
+        with mock.patch('orders.outbox.get_channel_layer', return_value=RecordingLayer()):
+            results = run_concurrently(drain, drain, drain)
+
+        self.assertEqual(results, [None] * 3)
+        self.assertEqual(sorted(sent), list(range(60)))
+        self.assertFalse(OutboxEvent.objects.filter(published_at__isnull=True).exists())
@@ -1,7 +1,8 @@
 from django.test import TestCase
+from django.db import connection
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
-from kitchen.models import MenuItem, Order, OrderItem
+from kitchen.models import MenuItem, Order, OrderItem, Ingredient, InventoryTransaction
 from authentication.models import User as CustomUser
 
 class KitchenTestCase(TestCase):
@@ -156,3 +157,102 @@ class KitchenTestCase(TestCase):
         pizza_item = order_items.get(menu_item=self.menu_item1)
         self.assertEqual(pizza_item.quantity, 2)
         self.assertEqual(pizza_item.menu_item.name, 'Margherita Pizza')
+
+class InventoryTransactionTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.manager = CustomUser.objects.create_user(
+            username='manager',
+            email='manager@example.com',
+            password='managerpassword123',
+            role='manager'
+        )
+        self.client.force_authenticate(user=self.manager)
+
+        self.ingredient = Ingredient.objects.create(name='Flour', quantity=100)
+        InventoryTransaction.objects.bulk_create([
+            InventoryTransaction(ingredient=self.ingredient, quantity=1, transaction_type='usage')
+            for _ in range(15)
+        ])
+
+    def test_inventory_transaction_cursor_pagination(self):
+        """Test that inventory transactions are paginated by cursor"""
+        response = self.client.get('/api/kitchen/inventory-transactions/?page_size=10')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertNotIn('count', response.data)
+        self.assertEqual(response.data['results'][0]['ingredient_name'], 'Flour')
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNone(response.data['next'])
+
+class MenuSearchTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.manager = CustomUser.objects.create_user(
+            username='manager',
+            email='manager@example.com',
+            password='managerpassword123',
+            role='manager'
+        )
+        self.client.force_authenticate(user=self.manager)
+
+        # Written without save() so the index is shown to follow every write path
+        self.alfredo, self.salad, self.pizza = MenuItem.objects.bulk_create([
+            MenuItem(name='Chicken Alfredo', description='Creamy pasta with grilled chicken',
+                     price=15.99, category='Pasta', preparation_time=20),
+            MenuItem(name='Caesar Salad', description='Romaine with grilled chicken and croutons',
+                     price=9.99, category='Salads', preparation_time=10),
+            MenuItem(name='Margherita Pizza', description='Classic tomato and mozzarella pizza',
+                     price=12.99, category='Pizza', preparation_time=15),
+        ])
+
+    def search(self, query):
+        response = self.client.get('/api/kitchen/menuitems/', {'search': query})
+        self.assertEqual(response.status_code, 200)
+        return [item['name'] for item in response.data]
+
+    def test_prefix_search_is_ranked(self):
+        """Test that partial words match and name matches rank first"""
+        self.assertEqual(self.search('chick'), ['Chicken Alfredo', 'Caesar Salad'])
+        self.assertEqual(self.search('cream'), ['Chicken Alfredo'])
+        self.assertEqual(self.search('grilled sal'), ['Caesar Salad'])
+        self.assertEqual(self.search('pizz'), ['Margherita Pizza'])
+        self.assertEqual(self.search('sushi'), [])
+
+    def test_search_combines_with_filters(self):
+        """Test that search narrows the filtered queryset"""
+        response = self.client.get('/api/kitchen/menuitems/', {'search': 'chicken', 'category': 'Salads'})
+        self.assertEqual([item['name'] for item in response.data], ['Caesar Salad'])
+
+    def test_filters_apply_before_the_limit(self):
+        """Test that a filtered match is found behind more than a page of others"""
+        MenuItem.objects.bulk_create([
+            MenuItem(name=f'Chicken Wrap {index}', description='Chicken in a wrap',
+                     price=8.99, category='Wraps', preparation_time=10)
+            for index in range(60)
+        ])
+        response = self.client.get('/api/kitchen/menuitems/', {'search': 'chicken', 'category': 'Salads'})
+        self.assertEqual([item['name'] for item in response.data], ['Caesar Salad'])
+
+    def test_index_follows_writes(self):
+        """Test that updates and deletes are reflected in the index"""
+        MenuItem.objects.filter(pk=self.pizza.pk).update(name='Quattro Formaggi')
+        self.assertEqual(self.search('margh'), [])
+        self.assertEqual(self.search('quattro'), ['Quattro Formaggi'])
+
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM kitchen_menu_items WHERE id = %s', [self.salad.pk])
+        self.assertEqual(self.search('chicken'), ['Chicken Alfredo'])
+
+    def test_misspelled_search(self):
+        """Test that a misspelled name falls back to trigram similarity"""
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+                if cursor.fetchone() is None:
+                    self.skipTest('pg_trgm is not installed')
+
+        self.assertEqual(self.search('alfedo'), ['Chicken Alfredo'])
+        self.assertEqual(self.search('xyzzy'), [])
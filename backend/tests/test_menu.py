@@ -1,8 +1,15 @@
-from django.test import TestCase
+import hashlib
+import tempfile
+from unittest import mock
+from decimal import Decimal
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from rest_framework.test import APIClient
-from menu.models import MenuItem
-from kitchen.models import MenuItem as KitchenMenuItem
+from menu.models import MenuItem, MenuItemChange, MenuItemProxy
+from menu import catalog, sync
+from kitchen.models import MenuItem as KitchenMenuItem, Ingredient, MenuItemIngredient
 
 User = get_user_model()
 
@@ -83,3 +90,176 @@ class MenuItemTestCase(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(len(response.data), 1)
         self.assertEqual(response.data[0]['name'], 'Chicken Alfredo')
+
+class MenuCatalogTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        catalog.local_snapshots.clear()
+
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='waiter',
+            email='waiter@example.com',
+            password='waiterpassword123',
+            role='waiter'
+        )
+        self.client.force_authenticate(user=self.user)
+
+        # bulk_create skips the menu sync signals, which are not under test here
+        self.pizza, self.pasta = KitchenMenuItem.objects.bulk_create([
+            KitchenMenuItem(name='Margherita Pizza', description='Classic tomato and mozzarella pizza',
+                            price=Decimal('12.99'), category='Pizza', preparation_time=15),
+            KitchenMenuItem(name='Chicken Alfredo', description='Creamy pasta with grilled chicken',
+                            price=Decimal('15.99'), category='Pasta', preparation_time=20),
+        ])
+        self.cheese = Ingredient.objects.create(name='Mozzarella', quantity=10)
+        with self.captureOnCommitCallbacks(execute=True):
+            MenuItemIngredient.objects.create(menu_item=self.pizza, ingredient=self.cheese, quantity=2)
+
+    def test_unchanged_catalog_is_not_modified(self):
+        """Test that a client holding the current version gets a 304 without queries"""
+        response = self.client.get('/api/menu-items/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 2)
+        etag = response['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/menu-items/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        # Another process finds the snapshot in the shared cache
+        catalog.local_snapshots.clear()
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/menu-items/')
+        self.assertEqual(len(response.data), 2)
+
+    def test_menu_changes_start_a_new_version(self):
+        """Test that menu metadata changes replace the snapshot"""
+        etag = self.client.get('/api/menu-items/')['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            MenuItemProxy.objects.create(menu_item=self.pasta, is_featured=True)
+
+        response = self.client.get('/api/menu-items/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        pasta = next(item for item in response.data if item['id'] == self.pasta.id)
+        self.assertTrue(pasta['is_featured'])
+
+    def test_stock_changes_only_replace_the_menu_when_availability_flips(self):
+        """Test that the waiter menu survives stock changes that do not change availability"""
+        menu_etag = self.client.get('/api/menu-items/')['ETag']
+        kitchen_etag = self.client.get('/api/kitchen/menuitems/')['ETag']
+
+        self.cheese.quantity = Decimal('6')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cheese.save()
+        self.assertEqual(self.client.get('/api/menu-items/')['ETag'], menu_etag)
+        response = self.client.get('/api/kitchen/menuitems/')
+        self.assertNotEqual(response['ETag'], kitchen_etag)
+        pizza = next(item for item in response.data if item['id'] == self.pizza.id)
+        self.assertEqual(pizza['portions_available'], 3)
+
+        self.cheese.quantity = Decimal('1')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cheese.save()
+        response = self.client.get('/api/menu-items/')
+        self.assertNotEqual(response['ETag'], menu_etag)
+        pizza = next(item for item in response.data if item['id'] == self.pizza.id)
+        self.assertFalse(pizza['ingredient_availability'])
+
+    def test_cache_outage_does_not_fail_menu_writes(self):
+        """Test that a failed version bump is logged, not raised"""
+        self.cheese.quantity = Decimal('1')
+        with mock.patch('menu.catalog.cache.set_many', side_effect=ConnectionError('Redis is down')):
+            with self.assertLogs('menu.catalog', level='ERROR'):
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.cheese.save()
+        self.cheese.refresh_from_db()
+        self.assertEqual(self.cheese.quantity, Decimal('1'))
+
+    def test_filtered_list_bypasses_the_catalog(self):
+        """Test that filtered requests are answered from the database"""
+        response = self.client.get('/api/menu-items/?category=Pasta')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+        self.assertEqual([item['name'] for item in response.data], ['Chicken Alfredo'])
+
+class MenuSyncTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        catalog.local_snapshots.clear()
+
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.item = KitchenMenuItem.objects.create(
+            name='Margherita Pizza',
+            description='Classic tomato and mozzarella pizza',
+            price=Decimal('12.99'),
+            category='Pizza',
+            preparation_time=15
+        )
+
+    def set_image(self, content):
+        self.item.image = SimpleUploadedFile('pizza.jpg', content, content_type='image/jpeg')
+        self.item.save()
+
+    def test_save_queues_the_item(self):
+        """Test that saving records a change instead of syncing in the request"""
+        self.assertEqual(list(MenuItemChange.objects.values_list('menu_item_id', flat=True)), [self.item.pk])
+        self.assertFalse(MenuItemProxy.objects.exists())
+
+        self.assertEqual(sync.sync_all_pending(), 1)
+        self.assertFalse(MenuItemChange.objects.exists())
+        self.assertTrue(MenuItemProxy.objects.filter(menu_item=self.item).exists())
+
+    def test_batch_queries_do_not_grow_with_the_batch(self):
+        """Test that a batch of changes is synced with a fixed number of queries"""
+        items = KitchenMenuItem.objects.bulk_create([
+            KitchenMenuItem(name=f'Special {index}', description='', price=Decimal('9.99'),
+                            category='Specials', preparation_time=10)
+            for index in range(20)
+        ])
+        sync.record([item.pk for item in items] * 2)
+
+        # Claim, load the items, create the proxies and delete the changes, in a savepoint
+        with self.assertNumQueries(6):
+            self.assertEqual(sync.sync_pending(), 41)
+        self.assertEqual(MenuItemProxy.objects.count(), 21)
+
+    def test_deleted_items_are_skipped(self):
+        """Test that changes for deleted items are consumed"""
+        sync.record([self.item.pk + 1000])
+        self.assertEqual(sync.sync_all_pending(), 2)
+        self.assertEqual(MenuItemProxy.objects.count(), 1)
+
+    def test_unchanged_images_are_not_republished(self):
+        """Test that the image hash only changes with the image content"""
+        self.set_image(b'first picture')
+        sync.sync_all_pending()
+        first_hash = MenuItemProxy.objects.get(menu_item=self.item).image_hash
+        self.assertEqual(first_hash, hashlib.sha256(b'first picture').hexdigest())
+
+        # The same picture uploaded again is stored under a new name
+        version = catalog.current_version(catalog.MENU)
+        self.set_image(b'first picture')
+        with self.captureOnCommitCallbacks(execute=True):
+            sync.sync_all_pending()
+        proxy = MenuItemProxy.objects.get(menu_item=self.item)
+        self.assertEqual(proxy.image_name, self.item.image.name)
+        self.assertEqual(proxy.image_hash, first_hash)
+        self.assertEqual(catalog.current_version(catalog.MENU), version)
+
+        self.set_image(b'second picture')
+        with self.captureOnCommitCallbacks(execute=True):
+            sync.sync_all_pending()
+        self.assertEqual(
+            MenuItemProxy.objects.get(menu_item=self.item).image_hash,
+            hashlib.sha256(b'second picture').hexdigest()
+        )
+        self.assertNotEqual(catalog.current_version(catalog.MENU), version)
@@ -0,0 +1,755 @@
+import json
+from unittest import mock
+from decimal import Decimal
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.test import TestCase, override_settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+from datetime import timedelta
+from rest_framework.test import APIClient
+from kitchen.models import MenuItem, Ingredient, MenuItemIngredient, InventoryTransaction
+from orders.models import Order, OrderItem, Payment, KitchenTicket, PreparationTimeStat, OutboxEvent
+from orders import kitchen_queue, outbox
+from orders.commands import get_order
+from orders.tasks import escalate_order_priorities_task
+from orders.serializers import OrderSerializer, CompactOrderSerializer
+from orders.state_machine import apply_transition, changed_fields, TransitionConflict
+from tables.models import Table
+
+User = get_user_model()
+
+class OrderTestCase(TestCase):
+    def setUp(self):
+        # Create a test client
+        self.client = APIClient()
+        cache.clear()
+
+        # Create test users
+        self.manager = User.objects.create_user(
+            username='manager',
+            email='manager@example.com',
+            password='managerpassword123',
+            role='manager'
+        )
+        self.waiter = User.objects.create_user(
+            username='waiter',
+            email='waiter@example.com',
+            password='waiterpassword123',
+            role='waiter'
+        )
+        self.chef = User.objects.create_user(
+            username='chef',
+            email='chef@example.com',
+            password='chefpassword123',
+            role='chef'
+        )
+        self.client.force_authenticate(user=self.manager)
+
+        self.table = Table.objects.create(table_number=1, capacity=4)
+
+        # bulk_create skips the menu sync signals, which are not under test here
+        MenuItem.objects.bulk_create([
+            MenuItem(
+                name='Margherita Pizza',
+                description='Classic tomato and mozzarella pizza',
+                price=Decimal('12.99'),
+                category='Pizza',
+                preparation_time=15
+            ),
+            MenuItem(
+                name='Chicken Alfredo',
+                description='Creamy pasta with grilled chicken',
+                price=Decimal('15.99'),
+                category='Pasta',
+                preparation_time=20
+            ),
+        ])
+        self.pizza = MenuItem.objects.get(name='Margherita Pizza')
+        self.pasta = MenuItem.objects.get(name='Chicken Alfredo')
+
+        self.cheese = Ingredient.objects.create(name='Mozzarella', quantity=50)
+        self.cream = Ingredient.objects.create(name='Cream', quantity=20)
+        MenuItemIngredient.objects.create(menu_item=self.pizza, ingredient=self.cheese, quantity=2)
+        MenuItemIngredient.objects.create(menu_item=self.pasta, ingredient=self.cream, quantity=1)
+
+    def create_orders(self, count, **kwargs):
+        """Create `count` orders with two line items and a payment each"""
+        orders = []
+        for _ in range(count):
+            order = Order.objects.create(
+                table=self.table,
+                waiter=self.waiter,
+                chef=self.chef,
+                total_amount=Decimal('41.97'),
+                **kwargs
+            )
+            OrderItem.objects.create(order=order, menu_item=self.pizza, quantity=2)
+            OrderItem.objects.create(order=order, menu_item=self.pasta, quantity=1)
+            Payment.objects.create(order=order, amount=order.total_amount, payment_method='cash')
+            orders.append(order)
+        return orders
+
+    def count_list_queries(self, page_size):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(f'/api/orders/orders/?page_size={page_size}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), page_size)
+        return len(context.captured_queries)
+
+    def test_order_list_query_count_is_constant(self):
+        """Test that the order list query count does not grow with page size"""
+        self.create_orders(20)
+
+        small_page = self.count_list_queries(2)
+        large_page = self.count_list_queries(20)
+
+        self.assertEqual(small_page, large_page)
+        # orders (+ joins), items (+ menu items); availability is stored on the menu item
+        self.assertEqual(large_page, 2)
+
+    def test_order_list_payload(self):
+        """Test that the prefetched list still renders the nested details"""
+        self.create_orders(1)
+
+        response = self.client.get('/api/orders/orders/')
+        self.assertEqual(response.status_code, 200)
+
+        order = response.data['results'][0]
+        self.assertEqual(order['table_number'], 1)
+        self.assertEqual(order['payment']['payment_method'], 'cash')
+        self.assertEqual(len(order['items']), 2)
+        self.assertTrue(order['items'][0]['menu_item_details']['ingredient_availability'])
+
+    def test_order_retrieve_query_count(self):
+        """Test that retrieving a single order uses the same prefetching"""
+        order = self.create_orders(1)[0]
+
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/orders/orders/{order.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['waiter_name'], self.waiter.get_full_name())
+
+    def test_compact_order_list(self):
+        """Test the compact representation selected with ?view=compact"""
+        self.create_orders(5)
+
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/orders/orders/?view=compact')
+        self.assertEqual(response.status_code, 200)
+
+        item = response.data['results'][0]['items'][0]
+        self.assertEqual(set(item), {'menu_item', 'name', 'quantity'})
+        self.assertEqual(item['name'], 'Margherita Pizza')
+
+    def test_order_list_cursor_pagination(self):
+        """Test walking the order list with keyset cursors"""
+        orders = self.create_orders(25)
+        # Several orders share a timestamp to exercise the id tie-breaker
+        Order.objects.filter(id__in=[order.id for order in orders[:6]]).update(
+            created_at=orders[0].created_at
+        )
+
+        seen = []
+        url = '/api/orders/orders/?view=compact&page_size=10'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            seen.extend(order['id'] for order in response.data['results'])
+            url = response.data['next']
+
+        expected = list(Order.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_order_list_fields_param(self):
+        """Test restricting serialized fields with ?fields="""
+        self.create_orders(1)
+
+        response = self.client.get('/api/orders/orders/?fields=id,status')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'status'})
+
+    def test_compact_payload_is_smaller(self):
+        """Test that the compact shape is much smaller than the full one"""
+        order = self.create_orders(1)[0]
+
+        full = json.dumps(OrderSerializer(order).data, default=str)
+        compact = json.dumps(CompactOrderSerializer(order).data, default=str)
+        self.assertLess(len(compact) * 2, len(full))
+
+    @override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+    def test_order_create_broadcasts_compact_order(self):
+        """Test that order creation broadcasts the compact shape"""
+        channel_layer = get_channel_layer()
+        channel_name = async_to_sync(channel_layer.new_channel)()
+        async_to_sync(channel_layer.group_add)('orders', channel_name)
+
+        self.client.force_authenticate(user=self.waiter)
+        response = self.client.post('/api/orders/orders/', {
+            'table': self.table.id,
+            'items': [{'menu_item': self.pizza.id, 'quantity': 2}],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        self.assertEqual(outbox.dispatch_pending(), 1)
+        message = async_to_sync(channel_layer.receive)(channel_name)
+        self.assertEqual(message['type'], 'order.create')
+        self.assertEqual(message['order']['id'], response.data['id'])
+        self.assertEqual(message['order']['items'], [
+            {'menu_item': self.pizza.id, 'name': 'Margherita Pizza', 'quantity': 2}
+        ])
+
+    @override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+    def test_bulk_create_orders(self):
+        """Test creating several orders in one request"""
+        self.client.force_authenticate(user=self.waiter)
+        payload = {
+            'orders': [
+                {
+                    'table': self.table.id,
+                    'items': [
+                        {'menu_item': self.pizza.id, 'quantity': 2},
+                        {'menu_item': self.pasta.id, 'quantity': 1, 'notes': 'No parsley'},
+                    ]
+                }
+                for _ in range(10)
+            ]
+        }
+
+        # savepoint, menu items, tables, savepoint, order insert, item insert,
+        # release, the re-read of orders and items, the kitchen ticket upsert,
+        # the outbox insert and the final release
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post('/api/orders/orders/bulk-create/', payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(context.captured_queries), 12)
+
+        self.assertEqual(len(response.data), 10)
+        self.assertEqual(Order.objects.count(), 10)
+        self.assertEqual(OrderItem.objects.count(), 20)
+
+        order = Order.objects.first()
+        self.assertEqual(order.total_amount, Decimal('41.97'))
+        self.assertEqual(order.waiter, self.waiter)
+        self.assertEqual(order.items.get(menu_item=self.pasta).notes, 'No parsley')
+
+    def test_bulk_create_orders_is_atomic(self):
+        """Test that one invalid order rejects the whole batch"""
+        payload = {
+            'orders': [
+                {'table': self.table.id, 'items': [{'menu_item': self.pizza.id, 'quantity': 1}]},
+                {'table': self.table.id, 'items': [{'menu_item': 9999, 'quantity': 1}]},
+            ]
+        }
+
+        response = self.client.post('/api/orders/orders/bulk-create/', payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(1, response.data['orders'])
+        self.assertEqual(Order.objects.count(), 0)
+
+    @override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+    def test_update_status(self):
+        """Test moving an order through the kitchen workflow"""
+        order = self.create_orders(1)[0]
+        self.client.force_authenticate(user=self.chef)
+
+        response = self.client.post(f'/api/orders/orders/{order.id}/status/', {'status': 'preparing'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'preparing')
+        # No history yet: the slowest item's menu preparation time
+        self.assertEqual(response.data['estimated_preparation_time'], 20)
+
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'preparing')
+        self.assertEqual(order.chef, self.chef)
+        self.assertIsNotNone(order.started_preparing_at)
+
+        response = self.client.post(f'/api/orders/orders/{order.id}/status/', {'status': 'served'})
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+    def test_patch_status_uses_the_state_machine(self):
+        """Test that a status sent with PATCH is applied as a transition"""
+        order = self.create_orders(1)[0]
+        self.client.force_authenticate(user=self.chef)
+
+        response = self.client.patch(f'/api/orders/orders/{order.id}/', {
+            'status': 'preparing',
+            'special_instructions': 'No basil'
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['estimated_preparation_time'], 20)
+
+        order.refresh_from_db()
+        self.cheese.refresh_from_db()
+        self.assertEqual(order.status, 'preparing')
+        self.assertEqual(order.chef, self.chef)
+        self.assertEqual(order.special_instructions, 'No basil')
+        self.assertEqual(self.cheese.quantity, Decimal('46'))
+        # One event with the whole order, not a delta followed by it
+        event = OutboxEvent.objects.get()
+        self.assertEqual(event.payload['order']['status'], 'preparing')
+        self.assertEqual(event.payload['order']['special_instructions'], 'No basil')
+
+        OutboxEvent.objects.all().delete()
+        response = self.client.patch(f'/api/orders/orders/{order.id}/', {'status': 'ready'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        order.refresh_from_db()
+        self.assertIsNotNone(order.actual_preparation_time)
+        # A status alone is sent as the transition's delta
+        event = OutboxEvent.objects.get()
+        self.assertEqual(set(event.payload['order']), {'id', *changed_fields('ready')})
+
+        response = self.client.patch(f'/api/orders/orders/{order.id}/', {'status': 'pending'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+    def test_update_status_conflict(self):
+        """Test that a stale expected status is rejected without writing"""
+        order = self.create_orders(1)[0]
+        Order.objects.filter(pk=order.pk).update(status='preparing')
+
+        response = self.client.post(f'/api/orders/orders/{order.id}/status/', {
+            'status': 'preparing',
+            'expected_status': 'pending'
+        })
+        self.assertEqual(response.status_code, 409)
+
+        order.refresh_from_db()
+        self.assertIsNone(order.started_preparing_at)
+
+    def test_concurrent_transitions(self):
+        """Test that only one of two racing transitions is applied"""
+        order = self.create_orders(1)[0]
+        first = Order.objects.get(pk=order.pk)
+        second = Order.objects.get(pk=order.pk)
+
+        apply_transition(first, 'preparing', user=self.chef)
+        with self.assertRaises(TransitionConflict):
+            apply_transition(second, 'cancelled', user=self.chef)
+
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'preparing')
+
+    @override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+    def test_bulk_update_status(self):
+        """Test moving many orders with grouped updates and one broadcast"""
+        pending = self.create_orders(3)
+        preparing = self.create_orders(2, status='preparing')
+        served = self.create_orders(1, status='served')
+
+        channel_layer = get_channel_layer()
+        channel_name = async_to_sync(channel_layer.new_channel)()
+        async_to_sync(channel_layer.group_add)('orders', channel_name)
+
+        self.client.force_authenticate(user=self.chef)
+        order_ids = [order.id for order in pending + preparing + served]
+        response = self.client.post('/api/orders/orders/bulk_update/', {
+            'order_ids': order_ids + [9999],
+            'status': 'cancelled'
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated_count'], 5)
+        self.assertEqual(set(response.data['rejected']), {served[0].id, 9999})
+
+        cancelled = Order.objects.filter(status='cancelled')
+        self.assertEqual(cancelled.count(), 5)
+        self.assertFalse(cancelled.filter(completed_at__isnull=True).exists())
+
+        outbox.dispatch_pending()
+        message = async_to_sync(channel_layer.receive)(channel_name)
+        self.assertEqual(message['type'], 'order.bulk_update')
+        self.assertEqual(len(message['orders']), 5)
+
+    @override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+    def test_bulk_update_to_preparing_sets_chef(self):
+        """Test that bulk transitions set the same fields as single ones"""
+        orders = self.create_orders(4)
+        
+        response = self.client.post('/api/orders/orders/bulk-update/', {
+            'order_ids': [order.id for order in orders],
+            'status': 'preparing'
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated_count'], 4)
+
+        for order in Order.objects.all():
+            self.assertEqual(order.chef, self.manager)
+            self.assertIsNotNone(order.started_preparing_at)
+            self.assertEqual(order.estimated_preparation_time, 20)
+
+    @override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+    def test_kitchen_ticket_lifecycle(self):
+        """Test that the kitchen ticket follows the order through its transitions"""
+        self.client.force_authenticate(user=self.waiter)
+        response = self.client.post('/api/orders/orders/', {
+            'table': self.table.id,
+            'items': [{'menu_item': self.pizza.id, 'quantity': 2, 'notes': 'Extra basil'}],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        order_id = response.data['id']
+
+        ticket = KitchenTicket.objects.get(order_id=order_id)
+        self.assertEqual(ticket.status, 'pending')
+        self.assertEqual(ticket.table_number, 1)
+        self.assertEqual(ticket.items[0]['name'], 'Margherita Pizza')
+        self.assertEqual(ticket.items[0]['notes'], 'Extra basil')
+
+        self.client.force_authenticate(user=self.chef)
+        self.client.post(f'/api/orders/orders/{order_id}/status/', {'status': 'preparing'})
+        ticket.refresh_from_db()
+        self.assertEqual(ticket.status, 'preparing')
+        self.assertIsNotNone(ticket.started_preparing_at)
+
+        self.client.post('/api/orders/orders/bulk_update/', {'order_ids': [order_id], 'status': 'ready'}, format='json')
+        ticket.refresh_from_db()
+        self.assertEqual(ticket.status, 'ready')
+
+        self.client.post(f'/api/orders/orders/{order_id}/status/', {'status': 'served'})
+        self.assertFalse(KitchenTicket.objects.filter(order_id=order_id).exists())
+
+    def test_kitchen_queue_endpoint(self):
+        """Test that the kitchen queue reads only active tickets in one query"""
+        self.create_orders(3)
+        self.create_orders(2, status='preparing', priority='urgent')
+        self.create_orders(5, status='served')
+        self.assertEqual(kitchen_queue.rebuild(), 5)
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/orders/kitchen-queue/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 5)
+        self.assertEqual(response.data[0]['status'], 'pending')
+
+        response = self.client.get('/api/orders/kitchen-queue/?status=preparing')
+        self.assertEqual(len(response.data), 2)
+        self.assertEqual(response.data[0]['priority'], 'urgent')
+        self.assertEqual(len(response.data[0]['items']), 2)
+
+    @override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+    def test_kitchen_summary(self):
+        """Test the single-query, cached kitchen summary"""
+        pending = self.create_orders(2, priority='high')
+        self.create_orders(1, status='preparing')
+        now = timezone.now()
+        self.create_orders(1, status='served', completed_at=now, actual_preparation_time=10)
+        self.create_orders(1, status='served', completed_at=now, actual_preparation_time=20)
+        # Served outside the rolling window, so not part of the average
+        self.create_orders(1, status='served', completed_at=now - timedelta(days=2), actual_preparation_time=90)
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/orders/orders/kitchen_summary/')
+        self.assertEqual(response.data['total_pending'], 2)
+        self.assertEqual(response.data['total_preparing'], 1)
+        self.assertEqual(response.data['avg_preparation_time'], 15)
+        self.assertEqual(response.data['orders_by_priority'], [
+            {'priority': 'normal', 'count': 1},
+            {'priority': 'high', 'count': 2},
+        ])
+
+        # Served from the cache until an order changes
+        with self.assertNumQueries(0):
+            self.client.get('/api/orders/orders/kitchen_summary/')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/orders/orders/{pending[0].id}/status/', {'status': 'preparing'})
+        response = self.client.get('/api/orders/orders/kitchen_summary/')
+        self.assertEqual(response.data['total_pending'], 1)
+        self.assertEqual(response.data['total_preparing'], 2)
+
+        # An unreachable cache does not fail the transition
+        with mock.patch('orders.kitchen_queue.cache.delete', side_effect=ConnectionError('Redis is down')):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(f'/api/orders/orders/{pending[1].id}/status/', {'status': 'preparing'})
+        self.assertEqual(response.status_code, 200)
+        pending[1].refresh_from_db()
+        self.assertEqual(pending[1].status, 'preparing')
+
+    @override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+    def test_escalate_order_priorities(self):
+        """Test set-based priority escalation with one batched broadcast"""
+        now = timezone.now()
+        fresh, waiting, late, very_late, bumped, served = self.create_orders(6, priority='low')
+        Order.objects.filter(pk=waiting.pk).update(created_at=now - timedelta(minutes=20))
+        Order.objects.filter(pk=late.pk).update(created_at=now - timedelta(minutes=35))
+        Order.objects.filter(pk=very_late.pk).update(created_at=now - timedelta(minutes=50))
+        # Manually raised priorities are never lowered
+        Order.objects.filter(pk=bumped.pk).update(created_at=now - timedelta(minutes=20), priority='urgent')
+        Order.objects.filter(pk=served.pk).update(created_at=now - timedelta(minutes=50), status='served')
+        kitchen_queue.rebuild()
+
+        channel_layer = get_channel_layer()
+        channel_name = async_to_sync(channel_layer.new_channel)()
+        async_to_sync(channel_layer.group_add)('orders', channel_name)
+
+        escalate_order_priorities_task()
+
+        priorities = dict(Order.objects.values_list('pk', 'priority'))
+        self.assertEqual(priorities[fresh.pk], 'low')
+        self.assertEqual(priorities[waiting.pk], 'normal')
+        self.assertEqual(priorities[late.pk], 'high')
+        self.assertEqual(priorities[very_late.pk], 'urgent')
+        self.assertEqual(priorities[bumped.pk], 'urgent')
+        self.assertEqual(priorities[served.pk], 'low')
+        self.assertEqual(KitchenTicket.objects.get(order_id=very_late.pk).priority_rank, 3)
+
+        outbox.dispatch_pending()
+        message = async_to_sync(channel_layer.receive)(channel_name)
+        self.assertEqual(message['type'], 'order.priority_update')
+        self.assertEqual(
+            {order['id']: order['priority'] for order in message['orders']},
+            {waiting.pk: 'normal', late.pk: 'high', very_late.pk: 'urgent'}
+        )
+
+    @override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+    def test_preparation_time_stats(self):
+        """Test that ready transitions feed the statistics used for estimates"""
+        # Keep every sample in the same hour of the day as the estimate
+        now = timezone.now().replace(minute=45, second=0, microsecond=0)
+        clock = mock.patch('django.utils.timezone.now', return_value=now)
+        clock.start()
+        self.addCleanup(clock.stop)
+
+        orders = self.create_orders(6, status='preparing')
+        for minutes, order in zip([8, 9, 10, 10, 12, 30], orders):
+            Order.objects.filter(pk=order.pk).update(started_preparing_at=now - timedelta(minutes=minutes))
+
+        self.client.force_authenticate(user=self.chef)
+        response = self.client.post(f'/api/orders/orders/{orders[0].id}/status/', {'status': 'ready'})
+        self.assertEqual(response.data['actual_preparation_time'], 8)
+        self.client.post('/api/orders/orders/bulk_update/', {
+            'order_ids': [order.id for order in orders[1:]],
+            'status': 'ready'
+        }, format='json')
+
+        self.assertEqual(
+            sorted(Order.objects.values_list('actual_preparation_time', flat=True)),
+            [8, 9, 10, 10, 12, 30]
+        )
+
+        stat = PreparationTimeStat.objects.get(kind='menu_item', key=self.pizza.id)
+        self.assertEqual(stat.count, 6)
+        self.assertAlmostEqual(stat.mean, 79 / 6)
+        self.assertEqual(stat.p50, 10)
+        self.assertEqual(stat.p90, 30)
+        self.assertEqual(PreparationTimeStat.objects.get(kind='all').count, 6)
+
+        # Both menu items now have enough history: the median replaces the menu default
+        order = self.create_orders(1)[0]
+        response = self.client.post(f'/api/orders/orders/{order.id}/status/', {'status': 'preparing'})
+        self.assertEqual(response.data['estimated_preparation_time'], 10)
+
+    def test_menu_item_availability_is_maintained(self):
+        """Test that stock and recipe changes update the stored availability"""
+        self.pizza.refresh_from_db()
+        # 50 mozzarella, 2 per pizza
+        self.assertEqual(self.pizza.portions_available, 25)
+        self.assertTrue(self.pizza.ingredient_availability)
+
+        self.cheese.quantity = Decimal('3')
+        self.cheese.save()
+        self.pizza.refresh_from_db()
+        self.assertEqual(self.pizza.portions_available, 1)
+
+        # Orders starting to cook use the stock up
+        order = self.create_orders(1)[0]
+        apply_transition(order, 'preparing', user=self.chef)
+        self.pizza.refresh_from_db()
+        self.pasta.refresh_from_db()
+        self.assertEqual(self.pizza.portions_available, 0)
+        self.assertFalse(self.pizza.ingredient_availability)
+        self.assertEqual(self.pasta.portions_available, 19)
+
+        # The scarcest ingredient decides; without a recipe there is no limit
+        basil = Ingredient.objects.create(name='Basil', quantity=4)
+        MenuItemIngredient.objects.create(menu_item=self.pasta, ingredient=basil, quantity=Decimal('0.5'))
+        self.pasta.refresh_from_db()
+        self.assertEqual(self.pasta.portions_available, 8)
+
+        self.pasta.menuitemingredient_set.all().delete()
+        self.pasta.refresh_from_db()
+        self.assertIsNone(self.pasta.portions_available)
+        self.assertTrue(self.pasta.ingredient_availability)
+
+        response = self.client.get('/api/orders/orders/')
+        details = response.data['results'][0]['items'][0]['menu_item_details']
+        self.assertFalse(details['ingredient_availability'])
+        self.assertEqual(details['portions_available'], 0)
+
+    def count_transition_queries(self, order):
+        with CaptureQueriesContext(connection) as context:
+            apply_transition(order, 'preparing', user=self.chef)
+        return len(context.captured_queries)
+
+    def test_preparing_consumes_ingredients(self):
+        """Test that starting preparation takes the recipe quantities out of stock"""
+        first, second, third = self.create_orders(3)
+
+        apply_transition(first, 'preparing', user=self.chef)
+        self.cheese.refresh_from_db()
+        self.cream.refresh_from_db()
+        # Two pizzas with 2 mozzarella each, one pasta with 1 cream
+        self.assertEqual(self.cheese.quantity, Decimal('46'))
+        self.assertEqual(self.cream.quantity, Decimal('19'))
+        self.assertIsNotNone(self.cheese.last_used_at)
+
+        usage = InventoryTransaction.objects.filter(transaction_type='usage', ingredient=self.cheese)
+        self.assertEqual(usage.get().quantity, Decimal('-4'))
+        self.assertEqual(usage.get().notes, f"Order #{first.id}")
+
+        # A transition that loses the race consumes nothing
+        with self.assertRaises(TransitionConflict):
+            apply_transition(first, 'preparing', user=self.chef, expected_status='pending')
+        self.cheese.refresh_from_db()
+        self.assertEqual(self.cheese.quantity, Decimal('46'))
+
+        self.client.force_authenticate(user=self.chef)
+        self.client.post('/api/orders/orders/bulk_update/', {
+            'order_ids': [second.id, third.id],
+            'status': 'preparing'
+        }, format='json')
+        self.cheese.refresh_from_db()
+        self.cream.refresh_from_db()
+        self.assertEqual(self.cheese.quantity, Decimal('38'))
+        self.assertEqual(self.cream.quantity, Decimal('17'))
+        self.assertEqual(
+            InventoryTransaction.objects.get(ingredient=self.cream, notes__startswith='Orders').notes,
+            f"Orders #{second.id}, #{third.id}"
+        )
+
+    def test_ingredient_consumption_query_count(self):
+        """Test that consuming ingredients costs the same queries however many a recipe has"""
+        first, second = self.create_orders(2)
+        few = self.count_transition_queries(get_order(first.id))
+
+        for name in ['Basil', 'Tomato', 'Olive Oil', 'Flour']:
+            MenuItemIngredient.objects.create(
+                menu_item=self.pizza,
+                ingredient=Ingredient.objects.create(name=name, quantity=100),
+                quantity=1
+            )
+        many = self.count_transition_queries(get_order(second.id))
+
+        self.assertEqual(few, many)
+        self.assertEqual(InventoryTransaction.objects.filter(notes=f"Order #{second.id}").count(), 6)
+
+    def test_status_deltas_carry_every_written_field(self):
+        """Test that each transition's event includes all the fields it wrote"""
+        served, cancelled = self.create_orders(2)
+        self.client.force_authenticate(user=self.chef)
+
+        for order, new_status in [(served, 'preparing'), (served, 'ready'), (served, 'served'),
+                                  (cancelled, 'cancelled')]:
+            OutboxEvent.objects.all().delete()
+            response = self.client.post(f'/api/orders/orders/{order.id}/status/', {'status': new_status})
+            self.assertEqual(response.status_code, 200)
+            payload = OutboxEvent.objects.filter(payload__type='order.update').first().payload['order']
+            self.assertEqual(set(payload), {'id', *changed_fields(new_status)})
+
+    @override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+    def test_outbox_event_is_written_with_the_change(self):
+        """Test that events are stored with the change and published by the dispatcher"""
+        order = self.create_orders(1)[0]
+        self.client.force_authenticate(user=self.chef)
+
+        # A rejected transition writes no event
+        response = self.client.post(f'/api/orders/orders/{order.id}/status/', {'status': 'served'})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(OutboxEvent.objects.exists())
+
+        response = self.client.post(f'/api/orders/orders/{order.id}/status/', {'status': 'preparing'})
+        self.assertEqual(response.status_code, 200)
+        event = OutboxEvent.objects.get()
+        self.assertIn('orders', event.groups)
+        self.assertEqual(event.payload['type'], 'order.update')
+        self.assertEqual(event.payload['order']['status'], 'preparing')
+        # Status updates carry only the fields the transition wrote
+        self.assertEqual(
+            set(event.payload['order']),
+            {'id', 'status', 'chef', 'started_preparing_at', 'updated_at', 'estimated_preparation_time'}
+        )
+        self.assertIsNone(event.published_at)
+
+        channel_layer = get_channel_layer()
+        channel_name = async_to_sync(channel_layer.new_channel)()
+        async_to_sync(channel_layer.group_add)('orders', channel_name)
+
+        self.assertEqual(outbox.dispatch_pending(), 1)
+        self.assertEqual(outbox.dispatch_pending(), 0)
+        message = async_to_sync(channel_layer.receive)(channel_name)
+        self.assertEqual(message['order']['id'], order.id)
+        event.refresh_from_db()
+        self.assertIsNotNone(event.published_at)
+
+    def test_outbox_retries_after_channel_layer_failure(self):
+        """Test that events survive a channel layer outage and keep their order"""
+        first = outbox.enqueue(['orders'], {'type': 'order.update', 'order': {'id': 1}})
+        second = outbox.enqueue(['orders'], {'type': 'order.update', 'order': {'id': 2}})
+
+        class BrokenLayer:
+            async def group_send(self, group, message):
+                raise ConnectionError('Redis is down')
+
+        with mock.patch('orders.outbox.get_channel_layer', return_value=BrokenLayer()):
+            self.assertEqual(outbox.dispatch_pending(), 0)
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.attempts, 1)
+        self.assertEqual(first.last_error, 'Redis is down')
+        self.assertIsNone(first.published_at)
+        self.assertIsNotNone(second.next_attempt_at)
+
+        # Nothing is retried before the backoff expires, and events enqueued
+        # since then wait behind the failed ones
+        outbox.enqueue(['orders'], {'type': 'order.update', 'order': {'id': 3}})
+        sent = []
+
+        class WorkingLayer:
+            async def group_send(self, group, message):
+                sent.append(message['order']['id'])
+
+        with mock.patch('orders.outbox.get_channel_layer', return_value=WorkingLayer()):
+            self.assertEqual(outbox.dispatch_pending(), 0)
+            OutboxEvent.objects.update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+            self.assertEqual(outbox.dispatch_pending(), 3)
+
+        self.assertEqual(sent, [1, 2, 3])
+        self.assertFalse(OutboxEvent.objects.filter(published_at__isnull=True).exists())
+
+    def test_events_target_topic_groups(self):
+        """Test that order events are published only to the order's topic groups"""
+        self.table.location = 'Main Floor'
+        self.table.save()
+        other_table = Table.objects.create(table_number=2, capacity=2, location='Patio')
+        order = self.create_orders(1)[0]
+        patio_order = self.create_orders(1)[0]
+        Order.objects.filter(pk=patio_order.pk).update(table=other_table)
+        OrderItem.objects.filter(order=patio_order, menu_item=self.pasta).delete()
+
+        self.client.force_authenticate(user=self.chef)
+        response = self.client.post(f'/api/orders/orders/{order.id}/status/', {'status': 'preparing'})
+        self.assertEqual(response.status_code, 200)
+
+        event = OutboxEvent.objects.get()
+        self.assertEqual(set(event.groups), {
+            'orders', 'role.chef', f'order.{order.id}', f'user.{self.waiter.id}',
+            f'table.{self.table.id}', 'section.main-floor', 'station.pizza', 'station.pasta'
+        })
+
+        # Batches are split so each group only hears about its own orders
+        OutboxEvent.objects.all().delete()
+        response = self.client.post('/api/orders/orders/bulk_update/', {
+            'order_ids': [order.id, patio_order.id],
+            'status': 'cancelled'
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        events = {tuple(event.groups): event.payload for event in OutboxEvent.objects.all()}
+        self.assertEqual(len(events[('orders',)]['orders']), 2)
+        self.assertEqual([o['id'] for o in events[('section.patio',)]['orders']], [patio_order.id])
+        self.assertEqual([o['id'] for o in events[('station.pasta',)]['orders']], [order.id])
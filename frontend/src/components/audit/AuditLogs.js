@@ -23,6 +23,7 @@ import { AdapterDateFns } from '@mui/x-date-pickers/AdapterDateFns';
 import RefreshIcon from '@mui/icons-material/Refresh';
 import InfoIcon from '@mui/icons-material/Info';
 import api from '../../services/api';
+import { cursorFrom } from '../../services/apiService';
 import { format } from 'date-fns';
 
 const ACTION_TYPES = [
@@ -40,6 +41,9 @@ function AuditLogs() {
   const [loading, setLoading] = useState(false);
   const [page, setPage] = useState(0);
   const [rowsPerPage, setRowsPerPage] = useState(10);
+  // Logs are paginated by cursor: the page shown and the cursors of its neighbours
+  const [cursor, setCursor] = useState(null);
+  const [cursors, setCursors] = useState({ next: null, previous: null });
   const [filters, setFilters] = useState({
     action: '',
     startDate: null,
@@ -57,13 +61,19 @@ function AuditLogs() {
       if (filters.startDate) params.append('start_date', filters.startDate.toISOString());
       if (filters.endDate) params.append('end_date', filters.endDate.toISOString());
       if (filters.search) params.append('search', filters.search);
+      params.append('page_size', rowsPerPage);
+      if (cursor) params.append('cursor', cursor);
 
       if (params.toString()) {
         url += `?${params.toString()}`;
       }
 
       const response = await api.get(url);
-      setLogs(response.data);
+      setLogs(response.data.results);
+      setCursors({
+        next: cursorFrom(response.data.next),
+        previous: cursorFrom(response.data.previous),
+      });
     } catch (error) {
       console.error('Error fetching audit logs:', error);
     } finally {
@@ -73,15 +83,21 @@ function AuditLogs() {
 
   useEffect(() => {
     fetchLogs();
-  }, [filters]);
+  }, [filters, cursor, rowsPerPage]);
+
+  const resetPagination = () => {
+    setPage(0);
+    setCursor(null);
+  };
 
   const handleChangePage = (event, newPage) => {
+    setCursor(newPage > page ? cursors.next : cursors.previous);
     setPage(newPage);
   };
 
   const handleChangeRowsPerPage = (event) => {
     setRowsPerPage(parseInt(event.target.value, 10));
-    setPage(0);
+    resetPagination();
   };
 
   const handleFilterChange = (field) => (event) => {
@@ -89,7 +105,7 @@ function AuditLogs() {
       ...prev,
       [field]: event.target ? event.target.value : event
     }));
-    setPage(0);
+    resetPagination();
   };
 
   const getStatusColor = (status) => {
@@ -131,6 +147,7 @@ function AuditLogs() {
                 value={filters.startDate}
                 onChange={(newValue) => {
                   setFilters(prev => ({ ...prev, startDate: newValue }));
+                  resetPagination();
                 }}
                 slotProps={{ textField: { fullWidth: true } }}
               />
@@ -143,6 +160,7 @@ function AuditLogs() {
                 value={filters.endDate}
                 onChange={(newValue) => {
                   setFilters(prev => ({ ...prev, endDate: newValue }));
+                  resetPagination();
                 }}
                 slotProps={{ textField: { fullWidth: true } }}
               />
@@ -175,7 +193,6 @@ function AuditLogs() {
           </TableHead>
           <TableBody>
             {(loading ? [] : logs)
-              .slice(page * rowsPerPage, page * rowsPerPage + rowsPerPage)
               .map((log) => (
                 <TableRow key={log.id}>
                   <TableCell>{format(new Date(log.timestamp), 'PPpp')}</TableCell>
@@ -224,7 +241,7 @@ function AuditLogs() {
         <TablePagination
           rowsPerPageOptions={[5, 10, 25, 50]}
           component="div"
-          count={logs.length}
+          count={cursors.next ? -1 : page * rowsPerPage + logs.length}
           rowsPerPage={rowsPerPage}
           page={page}
           onPageChange={handleChangePage}
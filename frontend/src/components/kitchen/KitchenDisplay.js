@@ -41,28 +41,54 @@ function KitchenDisplay() {
   });
 
   useEffect(() => {
-    const ws = websocketService.connect();
-    ws.onmessage = (event) => {
-      const data = JSON.parse(event.data);
-      if (data.type === 'order_update') {
-        handleOrderUpdate(data.order);
-      }
-    };
+    // Chefs join the kitchen topic on connect; order events arrive as
+    // { order } for single changes and { orders } for batches, and status
+    // updates carry only the id and the fields that changed
+    const unsubscribeCreate = websocketService.subscribe('order.create', (payload) => {
+      handleOrderUpdate(payload.order);
+    });
+    const unsubscribeUpdate = websocketService.subscribe('order.update', (payload) => {
+      handleOrderUpdate(payload.order);
+    });
+    const unsubscribeBulk = websocketService.subscribe('order.bulk_update', (payload) => {
+      payload.orders.forEach(handleOrderUpdate);
+    });
+    const unsubscribeBulkCreate = websocketService.subscribe('order.bulk_create', (payload) => {
+      payload.orders.forEach(handleOrderUpdate);
+    });
+    // Escalations carry only the id and the new priority
+    const unsubscribePriority = websocketService.subscribe('order.priority_update', (payload) => {
+      payload.orders.forEach(handleOrderUpdate);
+    });
+    // Sent on reconnect when too many updates were missed to replay them
+    const unsubscribeSnapshot = websocketService.subscribe('snapshot', () => {
+      fetchOrders();
+    });
 
     fetchOrders();
     const interval = setInterval(updateWaitTimes, 60000); // Update wait times every minute
 
     return () => {
-      websocketService.disconnect();
+      unsubscribeCreate();
+      unsubscribeUpdate();
+      unsubscribeBulk();
+      unsubscribeBulkCreate();
+      unsubscribePriority();
+      unsubscribeSnapshot();
       clearInterval(interval);
     };
   }, []);
 
   const handleOrderUpdate = (updatedOrder) => {
     setOrders(prevOrders => {
-      const newOrders = prevOrders.map(order =>
-        order.id === updatedOrder.id ? updatedOrder : order
-      );
+      const existing = prevOrders.find(order => order.id === updatedOrder.id);
+      const others = prevOrders.filter(order => order.id !== updatedOrder.id);
+      const status = updatedOrder.status ?? existing?.status;
+      const newOrders = ['pending', 'preparing'].includes(status)
+        ? existing
+          ? prevOrders.map(order => order.id === updatedOrder.id ? { ...existing, ...updatedOrder } : order)
+          : updatedOrder.items ? [...others, updatedOrder] : prevOrders
+        : others;
       updateStats(newOrders);
       return newOrders;
     });
@@ -88,10 +114,10 @@ function KitchenDisplay() {
   const fetchOrders = async () => {
     try {
       const token = localStorage.getItem('token');
-      const response = await axios.get(`${API_URL}/orders/`, {
+      const response = await axios.get(`${API_URL}/orders/kitchen-queue/`, {
         headers: { Authorization: `Bearer ${token}` },
         params: {
-          status__in: 'pending,preparing',
+          status: 'pending,preparing',
         },
       });
       setOrders(response.data);
@@ -211,12 +237,12 @@ function KitchenDisplay() {
                           <Box key={index} sx={{ display: 'flex', alignItems: 'center', my: 1 }}>
                             <DiningIcon sx={{ mr: 1 }} />
                             <Typography>
-                              {item.quantity}x {item.menu_item.name}
+                              {item.quantity}x {item.name}
                             </Typography>
-                            {item.special_instructions && (
+                            {item.notes && (
                               <Chip
                                 icon={<InfoIcon />}
-                                label={item.special_instructions}
+                                label={item.notes}
                                 size="small"
                                 sx={{ ml: 1 }}
                               />
@@ -270,12 +296,12 @@ function KitchenDisplay() {
                           <Box key={index} sx={{ display: 'flex', alignItems: 'center', my: 1 }}>
                             <DiningIcon sx={{ mr: 1 }} />
                             <Typography>
-                              {item.quantity}x {item.menu_item.name}
+                              {item.quantity}x {item.name}
                             </Typography>
-                            {item.special_instructions && (
+                            {item.notes && (
                               <Chip
                                 icon={<InfoIcon />}
-                                label={item.special_instructions}
+                                label={item.notes}
                                 size="small"
                                 sx={{ ml: 1 }}
                               />
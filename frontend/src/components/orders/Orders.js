@@ -29,7 +29,7 @@ import {
   LocalDining as DiningIcon,
 } from '@mui/icons-material';
 import format from 'date-fns/format';
-import { apiService } from '../../services/apiService';
+import { apiService, cursorFrom } from '../../services/apiService';
 import { websocketService } from '../../services/websocket';
 
 const API_URL = 'http://localhost:8000/api';
@@ -50,10 +50,14 @@ function Orders() {
   const [filterStatus, setFilterStatus] = useState('');
   const [dateFilter, setDateFilter] = useState('');
   const [selectedOrders, setSelectedOrders] = useState([]);
+  // Orders are paginated by cursor: pages are reached through next/previous
+  // and no total is sent, so the count stays unknown (-1) while there is a next page
   const [pagination, setPagination] = useState({
-    page: 1,
+    page: 0,
     pageSize: 10,
-    total: 0
+    cursor: null,
+    next: null,
+    previous: null
   });
   const [orderMetrics, setOrderMetrics] = useState({
     averagePreparationTime: 0,
@@ -133,9 +137,9 @@ function Orders() {
     try {
       // Prepare query parameters
       const params = {
-        page: pagination.page,
         page_size: pagination.pageSize,
       };
+      if (pagination.cursor) params.cursor = pagination.cursor;
 
       // Add optional filters
       if (filterStatus) params.status = filterStatus;
@@ -147,9 +151,8 @@ function Orders() {
       // Add debugging logs
       console.log('Fetched Orders Response:', response);
       
-      // Ensure we have results and total count
+      // Ensure we have results and the links to the neighbouring pages
       const ordersData = response.results || [];
-      const totalCount = response.count || 0;
       
       // Update state with fetched orders
       setOrders(ordersData);
@@ -157,7 +160,8 @@ function Orders() {
       // Update pagination state
       setPagination(prevState => ({
         ...prevState,
-        total: totalCount
+        next: cursorFrom(response.next),
+        previous: cursorFrom(response.previous)
       }));
 
       // Calculate metrics after fetching orders
@@ -181,13 +185,21 @@ function Orders() {
   const handlePageChange = (event, newPage) => {
     setPagination(prevState => ({
       ...prevState,
-      page: newPage + 1
+      page: newPage,
+      cursor: newPage > prevState.page ? prevState.next : prevState.previous
     }));
   };
 
+  // Filters change the result set, so start again from the first page
+  const resetPagination = () => {
+    setPagination(prevState => ({ ...prevState, page: 0, cursor: null }));
+  };
+
   const handlePageSizeChange = (event) => {
     setPagination(prevState => ({
       ...prevState,
+      page: 0,
+      cursor: null,
       pageSize: parseInt(event.target.value, 10)
     }));
   };
@@ -195,7 +207,7 @@ function Orders() {
   // Trigger fetch when pagination changes
   useEffect(() => {
     fetchOrders();
-  }, [pagination.page, pagination.pageSize, filterStatus, dateFilter]);
+  }, [pagination.cursor, pagination.pageSize, filterStatus, dateFilter]);
 
   const handleStatusChange = async (orderId, newStatus) => {
     try {
@@ -278,7 +290,10 @@ function Orders() {
             <Select
               value={filterStatus}
               label="Status"
-              onChange={(e) => setFilterStatus(e.target.value)}
+              onChange={(e) => {
+                setFilterStatus(e.target.value);
+                resetPagination();
+              }}
             >
               <MenuItem value="">All</MenuItem>
               <MenuItem value="pending">Pending</MenuItem>
@@ -295,7 +310,10 @@ function Orders() {
             type="date"
             label="Date"
             value={dateFilter}
-            onChange={(e) => setDateFilter(e.target.value)}
+            onChange={(e) => {
+              setDateFilter(e.target.value);
+              resetPagination();
+            }}
             InputLabelProps={{ shrink: true }}
           />
         </Grid>
@@ -472,8 +490,8 @@ function Orders() {
           </TableContainer>
           <TablePagination
             component="div"
-            count={pagination.total}
-            page={pagination.page - 1}
+            count={pagination.next ? -1 : pagination.page * pagination.pageSize + orders.length}
+            page={pagination.page}
             onPageChange={handlePageChange}
             rowsPerPage={pagination.pageSize}
             onRowsPerPageChange={handlePageSizeChange}
@@ -178,11 +178,7 @@ function Tables() {
           )
         );
 
-        // Send WebSocket update
-        websocketService.send('table_status_update', {
-          id: selectedTable.id,
-          ...response
-        });
+        // The server broadcasts the change to other screens
 
         toast.success('Table updated successfully');
       } else {
@@ -158,6 +158,11 @@ const apiService = {
     }
 };
 
+// The `cursor` query value of a next/previous link from a cursor-paginated list
+const cursorFrom = (url) => {
+    return url ? new URL(url).searchParams.get('cursor') : null;
+};
+
 // Utility function to format currency
 const formatCurrency = (value) => {
     return new Intl.NumberFormat('en-US', {
@@ -166,4 +171,4 @@ const formatCurrency = (value) => {
     }).format(value);
 };
 
-export { apiService, formatCurrency };
+export { apiService, formatCurrency, cursorFrom };
@@ -1,5 +1,6 @@
 import axios from 'axios';
 import { apiClient } from './apiClient';
+import { cursorFrom } from './apiService';
 
 export const ingredientService = {
   // Get all ingredients with optional filtering
@@ -78,13 +79,18 @@ export const ingredientService = {
     }
   },
 
-  // Get inventory transactions for an ingredient
+  // Get one page of inventory transactions for an ingredient, newest first.
+  // Pass a cursor from a previous call as params.cursor to get the next or previous page.
   getInventoryTransactions: async (ingredientId, params = {}) => {
     try {
       const response = await apiClient.get(`/kitchen/inventory-transactions/`, {
         params: { ...params, ingredient_id: ingredientId }
       });
-      return response.data;
+      return {
+        transactions: response.data.results,
+        nextCursor: cursorFrom(response.data.next),
+        previousCursor: cursorFrom(response.data.previous),
+      };
     } catch (error) {
       console.error('Error fetching inventory transactions:', error);
       throw error;
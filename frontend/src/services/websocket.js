@@ -11,6 +11,8 @@ class WebSocketService {
     this.reconnectTimeout = null;
     this.baseUrl = process.env.REACT_APP_WEBSOCKET_URL || 'ws://localhost:8000/ws/restaurant/';
     this.statusSubscribers = new Set();
+    // Last stream sequence number received, sent back as resume_from on reconnect
+    this.lastSeq = null;
     
     // Bind methods to ensure correct context
     this.connect = this.connect.bind(this);
@@ -42,7 +44,10 @@ class WebSocketService {
     }
 
     const encodedToken = encodeURIComponent(token);
-    const wsUrl = `${this.baseUrl}?token=${encodedToken}`;
+    let wsUrl = `${this.baseUrl}?token=${encodedToken}`;
+    if (this.lastSeq !== null) {
+      wsUrl += `&resume_from=${this.lastSeq}`;
+    }
     
     console.log('Generated WebSocket URL:', wsUrl);
     console.groupEnd();
@@ -142,6 +147,9 @@ class WebSocketService {
         try {
           const data = JSON.parse(event.data);
           console.log('WebSocket message received:', data);
+          if (typeof data.seq === 'number') {
+            this.lastSeq = Math.max(this.lastSeq ?? 0, data.seq);
+          }
           this.broadcastMessage(data);
         } catch (error) {
           console.error('Error processing WebSocket message:', error);